@@ -4,12 +4,20 @@ from dotenv import load_dotenv
 load_dotenv(override=False)
 
 # isort: on
+import datetime
+import logging
 import os
+import threading
 
 from app.services.game.views import move_ns
-from app.utils.games import LocalGameManager
+from app.utils import codec, config
+from app.utils.games import GamesManager, LocalGameManager
+from app.utils.lifecycle import Lifecycle
+from app.utils.metrics import GamesCollector, metrics_response
+from app.utils.recaptcha import create_verifier
+from app.utils.timer import DeadlineScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 from flask_restx import Api
 
@@ -24,27 +32,32 @@ api = Api(
 # Configure flask cors 
 cors = CORS()
 
-# Create chess games and start timer
-chess_games = LocalGameManager()
-scheduler = BackgroundScheduler()
-
 SECONDS_IN_HOUR = 3600
 SECONDS_IN_DAY = SECONDS_IN_HOUR * 24
 
-def create_app() -> Flask:
-    """
-    Creates Flask app
+def create_app(chess_games: GamesManager = None) -> Flask:
     """
+    Creates Flask app, storage, warm-up and background jobs are startup phases
+    of app.extensions["lifecycle"], run here or by gunicorn (see config.APP_START)
 
-    # Verify recaptcha secret key
-    recaptcha_secret_key = os.environ.get("RECAPTCHA_SECRET_KEY")
-    if recaptcha_secret_key is None or recaptcha_secret_key == "":
-        raise ValueError("Missing RECAPTCHA_SECRET_KEY in environment, exiting...")
+    :param chess_games: Games manager, defaults to None (a LocalGameManager)
+    """
+    # Checked by the first startup phase, not on import
+    recaptcha_secret_key = os.environ.get("RECAPTCHA_SECRET_KEY", "")
 
     app = Flask(__name__)
 
     app.config["CORS_HEADERS"] = "Content-Type"
 
+    # One games manager (and connection pools) shared by every request of this worker
+    chess_games = chess_games or LocalGameManager()
+    app.extensions["chess_games"] = chess_games
+
+    app.extensions["recaptcha"] = create_verifier(
+        config.RECAPTCHA_BACKEND, config.RECAPTCHA_VERIFY_URL, recaptcha_secret_key,
+        config.RECAPTCHA_TIMEOUT, config.RECAPTCHA_POOL_SIZE, config.RECAPTCHA_ASYNC_WORKERS
+    )
+
     # Add routes
     # Game handler route
     api.add_namespace(move_ns, path="/game")
@@ -52,21 +65,125 @@ def create_app() -> Flask:
     api.init_app(app)
     cors.init_app(app)
 
-    # Create chess games
-    chess_games.add_game("Daily", SECONDS_IN_DAY)
-    # chess_games.add_game("6 Hours", SECONDS_IN_HOUR * 6)
+    if config.METRICS_ENABLED:
+        metrics_collector = GamesCollector(chess_games, app.extensions["recaptcha"])
+        app.add_url_rule(
+            "/metrics", "metrics", lambda: metrics_response(metrics_collector)
+        )
+
+    app.add_url_rule("/ready", "ready", lambda: ready_response(app.extensions["lifecycle"]))
+
+    # Nothing below runs before 'start', see app.utils.lifecycle
+    lifecycle = Lifecycle(config.STARTUP_RETRY_SECONDS)
+    lifecycle.add_phase("config", lambda: check_config(recaptcha_secret_key))
+    lifecycle.add_phase("storage", lambda: prepare_storage(chess_games))
+    lifecycle.add_phase("games", lambda: chess_games.warm_up(config.WARMUP_MAX_GAMES))
+
+    # Web workers only search moves if they commit them
+    if config.WARMUP_ENGINES and chess_games.commit_queue is None:
+        lifecycle.add_phase("engines", lambda: warm_up_engines(chess_games))
+
+    lifecycle.add_phase("background", lambda: start_background(app, lifecycle))
+    app.extensions["lifecycle"] = lifecycle
+
+    # Stopped last, even if a startup phase failed (shutdowns run in reverse order)
+    lifecycle.add_shutdown(chess_games.engine_pool.close)
+    if chess_games.vote_buffer is not None:
+        lifecycle.add_shutdown(chess_games.vote_buffer.close)
+
+    if config.APP_START == "create":
+        lifecycle.start()
+
+    return app
+
+def check_config (recaptcha_secret_key: str) -> None:
+    """
+    :raises ValueError: Raised for missing settings, the worker is not ready until fixed
+    """
+    if config.RECAPTCHA_BACKEND == "siteverify" and recaptcha_secret_key == "":
+        raise ValueError("Missing RECAPTCHA_SECRET_KEY in environment")
+
+def prepare_storage (chess_games: GamesManager) -> None:
+    # Move games from the legacy storage (unsorted name set, single blob)
+    chess_games.migrate_games_index()
+    chess_games.migrate_games_blob()
+
+    # Create chess games, every worker (re)start runs this, existing games are kept
+    try:
+        chess_games.add_game("Daily", SECONDS_IN_DAY, replace=False)
+        # chess_games.add_game("6 Hours", SECONDS_IN_HOUR * 6, replace=False)
 
+    except ValueError:
+        # Created before, by this or another worker
+        ...
+
+def warm_up_engines (chess_games: GamesManager) -> None:
+    try:
+        chess_games.engine_pool.warm_up()
+
+    except Exception as exc:
+        # Not fatal, engines are started again on first use
+        logging.warning("Engines were not started on warm-up: %s", exc)
+
+def start_background (app: Flask, lifecycle: Lifecycle) -> None:
+    """
+    Start the background jobs of a worker: mongo indexes, leader election,
+    move commits, pondering and round keys sweeping
+    """
+    chess_games = app.extensions["chess_games"]
+
+    # Create mongo indexes without holding the startup (or the exit, if mongo is down)
+    threading.Thread(target=chess_games.ensure_indexes, daemon=True).start()
+
+    scheduler = BackgroundScheduler()
+    app.extensions["scheduler"] = scheduler
+
+    # Every worker campaigns, only the leader runs the jobs below
+    scheduler.add_job(
+        chess_games.leader.campaign, "interval",
+        seconds=config.LEADER_LEASE_SECONDS / 3, next_run_time=datetime.datetime.now()
+    )
+
+    # Sleep until the earliest game deadline, game writes wake it up early. With
+    # a commit queue the leader only enqueues, commit workers search the moves
+    commit_due = (
+        chess_games.verify_games_to_update if chess_games.commit_queue is None
+        else chess_games.enqueue_due_games
+    )
+    deadlines = DeadlineScheduler(
+        chess_games.redis_client, chess_games.games_channel,
+        chess_games.next_deadline, commit_due,
+        is_active=chess_games.is_leader, max_sleep=config.LEADER_LEASE_SECONDS / 3
+    )
+    app.extensions["deadlines"] = deadlines
+
+    if config.PONDER_ENABLED and chess_games.commit_queue is None:
+        scheduler.add_job(
+            chess_games.ponder_games, "interval",
+            seconds=config.PONDER_INTERVAL
+        )
+
+    # Reclaim round keys left by crashes, the leader sweeps
     scheduler.add_job(
-        chess_games.verify_games_to_update, "interval",
-        seconds=SECONDS_IN_HOUR
+        chess_games.sweep_voting_keys, "interval",
+        seconds=config.VOTE_SWEEP_INTERVAL, args=( config.VOTE_SWEEP_BATCH, )
     )
 
     scheduler.start()
+    deadlines.start()
 
-    return app
+    lifecycle.add_shutdown(lambda: scheduler.shutdown(wait=False))
+    lifecycle.add_shutdown(deadlines.stop)
+
+def ready_response (lifecycle: Lifecycle) -> Response:
+    # 503 until every startup phase is done, for load balancers and orchestrators
+    return Response(
+        codec.dumps(lifecycle.status()), 200 if lifecycle.is_ready else 503,
+        mimetype="application/json"
+    )
 
 if __name__ == "__main__":
     app = create_app()
     app.run()
 
-    scheduler.shutdown()
+    app.extensions["lifecycle"].stop()
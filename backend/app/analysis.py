@@ -0,0 +1,66 @@
+"""
+Analyse the finished games archive: centipawn loss, best moves and accuracy of
+each move, with summaries by side. Games already analysed at the same depth are
+skipped, so an interrupted run continues where it stopped.
+
+    python -m app.analysis --depth 14 --processes 4
+    python -m app.analysis --max-games 100 --watch 600
+"""
+import argparse
+import logging
+import os
+import time
+
+import pymongo
+from app.utils import config
+from app.utils.analysis import ArchiveAnalyzer
+
+
+def main ():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--depth", type=int, default=config.ANALYSIS_DEPTH)
+    parser.add_argument(
+        "--processes", type=int,
+        default=(
+            config.ANALYSIS_PROCESSES
+            or max(1, ( os.cpu_count() or 1 ) // config.ENGINE_THREADS)
+        ),
+        help="Analysis processes (one engine each), defaults to one per core"
+    )
+    parser.add_argument("--batch", type=int, default=config.ANALYSIS_BATCH, help="Games per batch")
+    parser.add_argument("--max-games", type=int, help="Max games per run, defaults to every game")
+    parser.add_argument(
+        "--watch", type=float, help="Seconds between runs, defaults to a single run"
+    )
+    args = parser.parse_args()
+
+    mongo_client = pymongo.MongoClient(config.MONGO_CONN)
+    analyzer = ArchiveAnalyzer(
+        mongo_client["chess"], config.STOCKFISH_PATH,
+        { "Threads": config.ENGINE_THREADS, "Hash": config.ENGINE_HASH_MB },
+        depth=args.depth, processes=args.processes
+    )
+
+    try:
+        while True:
+            result = analyzer.run(args.batch, args.max_games)
+            logging.info(
+                "Analysed %s games (%s failed), %s positions searched, %s cached",
+                result["games"], result["failed"], result["searched"], result["cached"]
+            )
+
+            if args.watch is None:
+                break
+
+            time.sleep(args.watch)
+
+    except KeyboardInterrupt:
+        logging.info("Stopped, analysed games are kept")
+
+    finally:
+        mongo_client.close()
+
+if __name__ == "__main__":
+    main()
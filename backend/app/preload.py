@@ -0,0 +1,128 @@
+"""
+Preload the engine cache with the positions of an opening book, games replay
+the same openings after every reset.
+
+    python -m app.preload openings.pgn --plies 16 --limit 60
+    python -m app.preload openings.epd --limit 30 --limit 60 --engines 4
+"""
+import argparse
+import logging
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import chess
+import chess.engine
+import chess.pgn
+import redis
+from app.utils import config
+from app.utils.engine import EnginePool
+from app.utils.engine_cache import EngineCache
+
+
+def read_positions (path: str, plies: int) -> Iterator[chess.Board]:
+    """
+    Positions of an EPD file (one per line) or of the first plies of each PGN game
+
+    :param path: EPD or PGN file
+    :param plies: Plies read from each PGN game
+    """
+    with open(path) as book:
+        if path.lower().endswith(".epd"):
+            for line in book:
+                if line.strip():
+                    board = chess.Board()
+                    board.set_epd(line)
+                    yield board
+
+            return
+
+        while ( game := chess.pgn.read_game(book) ) is not None:
+            board = game.board()
+
+            for move in list(game.mainline_moves())[:plies]:
+                yield board.copy(stack=False)
+                board.push(move)
+
+def preload (
+    engine_cache: EngineCache, engine_pool: EnginePool, boards: Iterator[chess.Board],
+    limits: list[float], skill_level: int, engines: int
+) -> dict[str, int | float]:
+    """
+    Search and cache every position not cached yet
+
+    :return: Number of searched positions and engine seconds spent
+    """
+    searches = {}
+    for board in boards:
+        if board.is_game_over():
+            continue
+
+        for limit in limits:
+            entry = engine_cache.entry(board, limit, skill_level)
+
+            if entry not in searches and not engine_cache.contains(board, limit, skill_level):
+                searches[entry] = ( board, limit )
+
+    logging.info("Searching %s positions with %s engines", len(searches), engines)
+
+    def search (board: chess.Board, limit: float) -> float:
+        start = time.perf_counter()
+        result = engine_pool.play(
+            board, chess.engine.Limit(limit), options={ "Skill Level": skill_level }
+        )
+        seconds = time.perf_counter() - start
+
+        if result.move is not None:
+            engine_cache.put(board, limit, skill_level, result.move, seconds)
+
+        return seconds
+
+    with ThreadPoolExecutor(engines) as executor:
+        seconds = sum(executor.map(lambda args: search(*args), searches.values()))
+
+    return { "searched": len(searches), "seconds": seconds }
+
+def main ():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("books", nargs="+", help="PGN or EPD (.epd) files")
+    parser.add_argument("--plies", type=int, default=16, help="Plies read from each PGN game")
+    parser.add_argument(
+        "--limit", type=float, action="append",
+        help="Search seconds, once per game bot_limit (repeatable), defaults to 60"
+    )
+    parser.add_argument("--skill", type=int, default=config.ENGINE_SKILL_LEVEL)
+    parser.add_argument(
+        "--engines", type=int,
+        default=max(1, ( os.cpu_count() or 1 ) // config.ENGINE_THREADS),
+        help="Concurrent engines, defaults to one per core"
+    )
+    args = parser.parse_args()
+
+    redis_client = redis.StrictRedis(
+        host=config.REDIS_CONN, port=config.REDIS_PORT, password=config.REDIS_PASSWORD,
+        db=config.REDIS_DB
+    )
+    engine_cache = EngineCache(redis_client, config.ENGINE_CACHE_MAX_POSITIONS)
+    engine_pool = EnginePool(size=args.engines)
+
+    boards = ( board for book in args.books for board in read_positions(book, args.plies) )
+
+    try:
+        result = preload(
+            engine_cache, engine_pool, boards, args.limit or [ 60 ], args.skill, args.engines
+        )
+
+    finally:
+        engine_pool.close()
+
+    logging.info(
+        "Cached %s positions in %.0f engine seconds, %s positions in the cache",
+        result["searched"], result["seconds"], engine_cache.stats()["positions"]
+    )
+
+if __name__ == "__main__":
+    main()
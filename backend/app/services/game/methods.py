@@ -1,35 +1,92 @@
+import re
 from typing import Any
 
-import requests
 from app.utils import config
 from app.utils.errors import RecaptchaError
-from app.utils.games import LocalGameManager
+from app.utils.games import GamesManager
+from app.utils.recaptcha import RecaptchaVerifier
 
-chess_games = LocalGameManager()
+# Names are used in urls and redis keys ('{name}:{fen}'), no slashes or colons
+GAME_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9 _-]{0,31}$")
 
-def verify_save_vote (user_data: dict[str, Any]):
+
+def verify_save_vote (
+    chess_games: GamesManager, recaptcha: RecaptchaVerifier, user_data: dict[str, Any],
+    voter: str = None
+):
     for key in ( "game", "move" ):
         if key not in user_data:
             raise ValueError(f"Invalid request, missing key: '{key}'")
 
+    game = user_data["game"]
+    move = user_data["move"]
+
     if config.FLASK_ENV != "development":
         recaptcha_token = user_data.get('recaptchaToken')
 
         if recaptcha_token is None:
             raise RecaptchaError("Recaptcha token is required")
 
-        recaptcha_response = requests.post(
-            "https://www.google.com/recaptcha/api/siteverify",
-            data={ "secret": config.RECAPTCHA_SECRET_KEY, "response": recaptcha_token  }
+        if recaptcha.is_async:
+            # Count the vote once the token is verified, without holding the request
+            recaptcha.submit(recaptcha_token, lambda: chess_games.vote(game, move, voter))
+
+            return f"Vote ({move}) queued in game '{game}'"
+
+        if not recaptcha.verify(recaptcha_token):
+            raise RecaptchaError("Invalid reCAPTCHA token")
+
+    chess_games.vote(game, move, voter)
+
+    return f"Vote ({move}) registered in game '{game}'"
+
+def verify_create_game (
+    chess_games: GamesManager, recaptcha: RecaptchaVerifier, user_data: dict[str, Any]
+):
+    for key in ( "name", "base_update" ):
+        if key not in user_data:
+            raise ValueError(f"Invalid request, missing key: '{key}'")
+
+    name = str(user_data["name"])
+    base_update = int(user_data["base_update"])
+    bot_limit = int(user_data.get("bot_limit", config.GAME_MAX_BOT_LIMIT))
+    player_color = user_data.get("player_color", "white")
+
+    if GAME_NAME_PATTERN.match(name) is None:
+        raise ValueError(
+            "Invalid game name, use up to 32 letters, digits, spaces, '_' or '-'"
         )
-        recaptcha_result = recaptcha_response.json()
 
-        if not recaptcha_result.get("success"):
+    if not config.GAME_MIN_BASE_UPDATE <= base_update <= config.GAME_MAX_BASE_UPDATE:
+        raise ValueError(
+            f"Invalid base_update, must be between {config.GAME_MIN_BASE_UPDATE} "
+            f"and {config.GAME_MAX_BASE_UPDATE} seconds"
+        )
+
+    # The commit starts 'bot_limit' seconds before the deadline, keep time to vote
+    if not 1 <= bot_limit <= min(config.GAME_MAX_BOT_LIMIT, base_update // 2):
+        raise ValueError(
+            f"Invalid bot_limit, must be between 1 and "
+            f"{min(config.GAME_MAX_BOT_LIMIT, base_update // 2)} seconds"
+        )
+
+    if player_color not in ( "white", "black" ):
+        raise ValueError("Invalid player_color, must be 'white' or 'black'")
+
+    if config.FLASK_ENV != "development":
+        recaptcha_token = user_data.get('recaptchaToken')
+
+        if recaptcha_token is None:
+            raise RecaptchaError("Recaptcha token is required")
+
+        if not recaptcha.verify(recaptcha_token):
             raise RecaptchaError("Invalid reCAPTCHA token")
 
-    game = user_data["game"]
-    move = user_data["move"]
+    if chess_games.count_games() >= config.GAMES_MAX:
+        raise ValueError(f"Too many games, max is {config.GAMES_MAX}")
 
-    chess_games.vote(game, move)
+    chess_games.add_game(
+        name, base_update, bot_limit=bot_limit, player_color=player_color, replace=False
+    )
 
-    return f"Vote ({move}) registered in game '{game}'"
+    return f"Game '{name}' created"
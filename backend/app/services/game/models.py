@@ -4,7 +4,9 @@ import chess
 import time
 import bson
 
-@dc.dataclass()
+from app.utils import codec, record
+
+@dc.dataclass(slots=True)
 class ChessGame:
     _id: bson.ObjectId | str = dc.field(default=None)
     name: str = dc.field(default=None)
@@ -13,7 +15,8 @@ class ChessGame:
     player_color: Literal["white", "black"] = dc.field(default=None)
     board: str = dc.field(default=None)
     last_moves: list[str] = dc.field(default=None)
-    fen_to_votes: dict[str, list[str, int]] = dc.field(default=None)
+    # Top moves and votes of each round, by ply (see app.utils.record)
+    ply_votes: list[list[str, int]] = dc.field(default=None)
     finished: bool = dc.field(default=None)
     winner: Literal["humanity", "ai"] | None = dc.field(default=None)
     bot_limit: int = dc.field(default=None)
@@ -21,13 +24,28 @@ class ChessGame:
     ctime: int | float = dc.field(default=None)
     mtime: int | float = dc.field(default=None)
 
+    @classmethod
+    def from_dict (cls, game: dict):
+        return cls(**record.upgrade_legacy(game))
+
+    @property
+    def fen_to_votes (self) -> dict[str, list[str, int]]:
+        # Rebuilt by replaying the game, only needed by the API and resets
+        return record.votes_by_fen(self.last_moves or [], self.ply_votes or [])
+
     @property
     def voting_key (self) -> str:
         return f"{self.name}:{self.board}"
 
+    @property
+    def is_player_turn (self) -> bool:
+        # Side to move of the FEN, the AI plays the other color
+        return self.board.split(" ")[1] == self.player_color[0]
+
     def reset (self):
         self.board = chess.Board.starting_fen
         self.last_moves = []
+        self.ply_votes = []
         self.finished = False
         self.winner = None
         self.next_update = None
@@ -43,10 +61,24 @@ class ChessGame:
         # elif self.next_update <= int(time.time() * 1000):
         #     self.next_update = int(time.time() * 1000) + ( self.next_update * 1000 )
 
-    def to_insert (self):
-        # Remove bson support
-        result = self.__dict__
+    def to_response (self, moves: bool = True):
+        result = codec.to_dict(self, exclude=( "ply_votes", ))
+        result["ply"] = len(self.last_moves or [])
+
+        # Clients syncing moves from /history skip them
+        if moves:
+            result["fen_to_votes"] = self.fen_to_votes
+
+        else:
+            result.pop("last_moves")
 
-        result.pop("_id")
+        return result
+
+    def to_insert (self):
+        # Remove bson support, moves and votes are packed
+        result = codec.to_dict(self, exclude=( "_id", ))
+        result["last_moves"] = record.pack_moves(self.last_moves)
+        result["ply_votes"] = record.pack_votes(self.ply_votes)
+        result["ply"] = len(self.last_moves)
 
         return result
@@ -1,17 +1,34 @@
 import json
+import os
 
 import flask
-from app.utils.games import LocalGameManager
-from app.utils.middleware import middleware
-from app.utils.parsers import new_move_vote
+from app.utils import config
+from app.utils.games import GamesManager
+from app.utils.middleware import ResponseCache, conditional_response, middleware
+from app.utils.parsers import new_game, new_move_vote
+from app.utils.recaptcha import RecaptchaVerifier
+from app.utils.voters import voter_id
 from flask_restx import Namespace, Resource
 
-from .methods import verify_save_vote
+from .methods import verify_create_game, verify_save_vote
 
 move_ns = Namespace("Move", description="Flask route to handle users moves")
 
+# Serialized status responses of this worker, by ETag
+status_responses = ResponseCache()
+
+class GameResource(Resource):
+    @property
+    def chess_games (self) -> GamesManager:
+        # One manager per worker, created in 'create_app'
+        return flask.current_app.extensions["chess_games"]
+
+    @property
+    def recaptcha (self) -> RecaptchaVerifier:
+        return flask.current_app.extensions["recaptcha"]
+
 @move_ns.route("/vote")
-class HandleMove(Resource):
+class HandleMove(GameResource):
     @move_ns.doc(expect=[ new_move_vote ])
     @middleware
     def post(self):
@@ -22,39 +39,155 @@ class HandleMove(Resource):
         except:
             ...
 
-        return verify_save_vote(user_data)
+        voter = voter_id(flask.request.headers, flask.request.remote_addr, config.VOTER_ID_HEADER)
+
+        return verify_save_vote(self.chess_games, self.recaptcha, user_data, voter)
+
+@move_ns.route("/create-game")
+class CreateGame(GameResource):
+    @move_ns.doc(expect=[ new_game ])
+    @middleware
+    def post(self):
+        user_data = dict(flask.request.form)
+        try:
+            user_data.update(json.loads(flask.request.data))
+
+        except:
+            ...
+
+        return verify_create_game(self.chess_games, self.recaptcha, user_data)
 
 @move_ns.route("/list-games")
-class GameBoard(Resource):
+class GameBoard(GameResource):
     @middleware
     def get(self):
-        chess_games = LocalGameManager()
-        return { "games": chess_games.get_games() }
+        args = flask.request.args
+        limit = max(
+            1, min(int(args.get("limit", config.LIST_GAMES_MAX_LIMIT)), config.LIST_GAMES_MAX_LIMIT)
+        )
+        games = self.chess_games.get_games(limit, args.get("cursor"))
+
+        return {
+            "games": games,
+            "next_cursor": games[-1] if len(games) == limit else None
+        }
 
 @move_ns.route("/finished-games")
-class GameBoard(Resource):
+class GameBoard(GameResource):
     @middleware
     def get(self):
-        chess_games = LocalGameManager()
-        return { "games": chess_games.get_old_matches() }
+        args = flask.request.args
+        limit = max(1, min(int(args.get("limit", 3)), config.FINISHED_GAMES_MAX_LIMIT))
+
+        return self.chess_games.get_old_matches(
+            limit, args.get("name", "Daily"), args.get("cursor")
+        )
+
+@move_ns.route("/finished-games/<match_id>")
+class GameBoard(GameResource):
+    @middleware
+    def get(self, match_id: str):
+        return { "game": self.chess_games.get_old_match(match_id) }
 
 @move_ns.route("/status/game/<game>")
-class GameBoard(Resource):
+class GameBoard(GameResource):
     @middleware
     def get(self, game: str):
-        chess_games = LocalGameManager()
+        version, current_game = self.chess_games.get_versioned_game(game)
+        voting = self.chess_games.get_top_n(game)
+        moves = flask.request.args.get("moves", "true").lower() == "true"
 
-        return {
-            "game": chess_games.get_game(game).__dict__,
-            "voting": chess_games.get_top_n(game)
-        }
+        return conditional_response(
+            status_responses, ( "game", game, version, voting, moves ),
+            lambda: { "game": current_game.to_response(moves), "voting": voting },
+            config.STATUS_MAX_AGE
+        )
+
+@move_ns.route("/history/<game>")
+class GameBoard(GameResource):
+    @middleware
+    def get(self, game: str):
+        args = flask.request.args
+        since = max(int(args.get("since", 0)), 0)
+        limit = max(
+            1, min(int(args.get("limit", config.HISTORY_MAX_LIMIT)), config.HISTORY_MAX_LIMIT)
+        )
+
+        return self.chess_games.get_history(game, since, limit)
 
 @move_ns.route("/status/voting/<game>")
-class GameBoard(Resource):
+class GameBoard(GameResource):
     @middleware
     def get(self, game: str):
-        chess_games = LocalGameManager()
+        voting = self.chess_games.get_top_n(game)
+
+        return conditional_response(
+            status_responses, ( "voting", game, voting ), lambda: { "voting": voting },
+            config.STATUS_MAX_AGE
+        )
+
+@move_ns.route("/status/voters/<game>")
+class GameBoard(GameResource):
+    @middleware
+    def get(self, game: str):
+        return { "voters": self.chess_games.count_voters(game) }
+
+@move_ns.route("/stream/<game>")
+class GameStream(GameResource):
+    @middleware
+    def get(self, game: str):
+        # Fail with a json error before starting the stream
+        self.chess_games.get_game(game)
+        events = self.chess_games.events
+
+        return flask.Response(
+            flask.stream_with_context(events.stream(game, config.STREAM_HEARTBEAT)),
+            mimetype="text/event-stream",
+            headers={ "Cache-Control": "no-cache", "X-Accel-Buffering": "no" }
+        )
+
+@move_ns.route("/status/pools")
+class GameBoard(GameResource):
+    @middleware
+    def get(self):
+        return { "pid": os.getpid(), "pools": self.chess_games.pool_stats() }
+
+@move_ns.route("/status/ponder")
+class GameBoard(GameResource):
+    @middleware
+    def get(self):
+        return { "ponder": self.chess_games.ponder_stats() }
+
+@move_ns.route("/status/engine-cache")
+class GameBoard(GameResource):
+    @middleware
+    def get(self):
+        return { "engine_cache": self.chess_games.engine_cache_stats() }
+
+@move_ns.route("/status/leader")
+class GameBoard(GameResource):
+    @middleware
+    def get(self):
+        leader = self.chess_games.leader
+
+        return {
+            "leader": leader.current(),
+            "worker": { "identity": leader.identity, "is_leader": leader.is_leader }
+        }
+
+@move_ns.route("/status/recaptcha")
+class GameBoard(GameResource):
+    @middleware
+    def get(self):
+        return { "recaptcha": self.recaptcha.stats() }
+
+@move_ns.route("/status/commits")
+class GameBoard(GameResource):
+    @middleware
+    def get(self):
+        commit_queue = self.chess_games.commit_queue
 
         return {
-            "voting": chess_games.get_top_n(game)
+            "mode": "queue" if commit_queue is not None else "local",
+            "commits": commit_queue.stats() if commit_queue is not None else None
         }
@@ -0,0 +1,317 @@
+"""
+Engine analysis of finished games. Every position is evaluated once (white
+point of view, in centipawns) and cached by position and depth, each played
+move is then scored against the best move of the position before it.
+"""
+import logging
+import math
+import multiprocessing
+import multiprocessing.util
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import chess
+import chess.engine
+import pymongo
+import pymongo.collection
+import pymongo.database
+from app.utils import record
+
+ANALYSIS_VERSION = 1
+MATE_SCORE = 10000
+# A missed mate counts as one blunder, not as thousands of centipawns
+MAX_LOSS = 1000
+BLUNDER_LOSS = 300
+MISTAKE_LOSS = 100
+
+# Engine of each analysis process, see '_start_engine'
+_engine: chess.engine.SimpleEngine | None = None
+
+
+def position_key (board: chess.Board, depth: int) -> str:
+    # Move counters left out, repeated positions share their evaluation
+    return f"{board.epd()}|d{depth}"
+
+def win_percent (centipawns: float) -> float:
+    """
+    Winning chances of a centipawn evaluation, as used by lichess accuracy
+    """
+    return 50 + 50 * ( 2 / ( 1 + math.exp(-0.00368208 * centipawns) ) - 1 )
+
+def move_accuracy (before: float, after: float) -> float:
+    """
+    Accuracy of a move from the evaluations (mover point of view) around it
+
+    :return: 0 to 100
+    """
+    loss = max(0.0, win_percent(before) - win_percent(after))
+
+    return max(0.0, min(100.0, 103.1668 * math.exp(-0.04354 * loss) - 3.1669))
+
+def terminal_evaluation (board: chess.Board) -> dict[str, Any] | None:
+    # Game over positions need no engine
+    if board.is_checkmate():
+        mated = -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+        return { "eval": mated, "best_move": None }
+
+    if board.is_game_over():
+        return { "eval": 0, "best_move": None }
+
+    return None
+
+def _start_engine (command: str | list[str], options: dict[str, int]) -> None:
+    global _engine
+
+    _engine = chess.engine.SimpleEngine.popen_uci(command)
+    _engine.configure({
+        option: value for option, value in options.items() if option in _engine.options
+    })
+    # Quit with the process, pool workers skip atexit handlers
+    multiprocessing.util.Finalize(_engine, _engine.quit, exitpriority=10)
+
+def _evaluate (fen: str, depth: int) -> dict[str, Any]:
+    board = chess.Board(fen)
+    evaluation = terminal_evaluation(board)
+
+    if evaluation is not None:
+        return evaluation
+
+    info = _engine.analyse(board, chess.engine.Limit(depth=depth))
+    pv = info.get("pv") or []
+
+    return {
+        "eval": info["score"].white().score(mate_score=MATE_SCORE),
+        "best_move": pv[0].uci() if len(pv) > 0 else None
+    }
+
+def game_boards (moves: list[str]) -> list[chess.Board]:
+    """
+    :return: Position before each move and the final position
+    """
+    board = chess.Board()
+    boards = [ board.copy(stack=False) ]
+
+    for move in moves:
+        # Checked, 'push' takes illegal moves
+        board.push_uci(move)
+        boards.append(board.copy(stack=False))
+
+    return boards
+
+def analyse_game (
+    moves: list[str], player_color: str, evaluations: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """
+    Score each move of a game
+
+    :param moves: Moves in UCI format
+    :param player_color: Color played by the voters
+    :param evaluations: Evaluation of each position (see 'game_boards')
+    :return: Per ply best move, evaluation and centipawn loss, and summaries by side
+    """
+    plies = []
+    sides = { "humanity": [], "ai": [] }
+
+    for ply, move in enumerate(moves):
+        before, after = evaluations[ply], evaluations[ply + 1]
+        # Mover point of view
+        sign = 1 if ply % 2 == 0 else -1
+        best, played = sign * before["eval"], sign * after["eval"]
+        loss = min(MAX_LOSS, max(0, best - played))
+
+        plies.append({
+            "move": move, "best_move": before["best_move"], "eval": after["eval"], "cpl": loss
+        })
+
+        mover = "white" if ply % 2 == 0 else "black"
+        side = "humanity" if mover == player_color else "ai"
+        sides[side].append(( loss, move_accuracy(
+            max(-MAX_LOSS, min(MAX_LOSS, best)), max(-MAX_LOSS, min(MAX_LOSS, played))
+        ) ))
+
+    return {
+        "plies": plies,
+        "summary": { side: summarize(scores) for side, scores in sides.items() }
+    }
+
+def summarize (scores: list[tuple[int, float]]) -> dict[str, int | float | None]:
+    if len(scores) == 0:
+        return { "moves": 0, "acpl": None, "accuracy": None, "mistakes": 0, "blunders": 0 }
+
+    losses = [ loss for loss, _ in scores ]
+
+    return {
+        "moves": len(scores),
+        "acpl": round(sum(losses) / len(losses), 1),
+        "accuracy": round(sum(accuracy for _, accuracy in scores) / len(scores), 1),
+        "mistakes": sum(1 for loss in losses if MISTAKE_LOSS <= loss < BLUNDER_LOSS),
+        "blunders": sum(1 for loss in losses if loss >= BLUNDER_LOSS)
+    }
+
+
+class ArchiveAnalyzer:
+    """
+    Analyse finished games without analysis at 'depth', in batches. Each batch
+    stores its new evaluations in the position cache before writing the game
+    analyses, so an interrupted run resumes where it stopped.
+    """
+    games_collection: pymongo.collection.Collection
+    positions_collection: pymongo.collection.Collection
+    progress_collection: pymongo.collection.Collection
+    depth: int
+    processes: int
+
+    def __init__ (
+        self, chess_db: pymongo.database.Database, command: str | list[str],
+        options: dict[str, int] = None, depth: int = 14, processes: int = 1
+    ):
+        """
+        :param chess_db: Database of the finished games
+        :param command: UCI engine binary path (or argv list)
+        :param options: Engine options (like Threads and Hash), defaults to None
+        :param depth: Search depth of each position, defaults to 14
+        :param processes: Analysis processes (one engine each), defaults to 1
+        """
+        self.games_collection = chess_db["games"]
+        self.positions_collection = chess_db["analysis_positions"]
+        self.progress_collection = chess_db["analysis_progress"]
+        self.command = command
+        self.options = options or {}
+        self.depth = depth
+        self.processes = processes
+
+    @property
+    def pending_filter (self) -> dict[str, Any]:
+        # Never analysed, or analysed with other settings
+        return { "$or": [
+            { "analysis.depth": { "$ne": self.depth } },
+            { "analysis.version": { "$ne": ANALYSIS_VERSION } }
+        ] }
+
+    def pending (self) -> int:
+        return self.games_collection.count_documents(self.pending_filter)
+
+    def _pending_batches (self, batch: int, max_games: int = None) -> Iterator[list[dict]]:
+        last_id = None
+        analysed = 0
+
+        while max_games is None or analysed < max_games:
+            match = self.pending_filter
+            if last_id is not None:
+                match = { "$and": [ match, { "_id": { "$gt": last_id } } ] }
+
+            size = batch if max_games is None else min(batch, max_games - analysed)
+            documents = list(self.games_collection.find(
+                match, { "last_moves": 1, "player_color": 1 }
+            ).sort("_id", pymongo.ASCENDING).limit(size))
+
+            if len(documents) == 0:
+                return
+
+            yield documents
+
+            last_id = documents[-1]["_id"]
+            analysed += len(documents)
+
+    def run (self, batch: int = 50, max_games: int = None) -> dict[str, int]:
+        """
+        Analyse every pending game
+
+        :param batch: Games per batch (and per bulk write), defaults to 50
+        :param max_games: Max analysed games, defaults to None (every pending game)
+        :return: Analysed games, failed games, searched and cached positions
+        """
+        totals = { "games": 0, "failed": 0, "searched": 0, "cached": 0 }
+        pending = self.pending()
+        logging.info("%s games to analyse at depth %s", pending, self.depth)
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            self.processes, mp_context=context, initializer=_start_engine,
+            initargs=( self.command, self.options )
+        ) as executor:
+            for documents in self._pending_batches(batch, max_games):
+                result = self._analyse_batch(executor, documents)
+
+                for key, value in result.items():
+                    totals[key] += value
+
+                self.progress_collection.update_one({ "_id": "archive" }, {
+                    "$inc": result,
+                    "$set": { "depth": self.depth, "mtime": int(time.time() * 1000) }
+                }, upsert=True)
+                logging.info(
+                    "Analysed %s/%s games (%s positions searched, %s cached)", totals["games"],
+                    pending, totals["searched"], totals["cached"]
+                )
+
+        return totals
+
+    def _analyse_batch (
+        self, executor: ProcessPoolExecutor, documents: list[dict]
+    ) -> dict[str, int]:
+        games, errors = {}, {}
+        for document in documents:
+            try:
+                moves = document.get("last_moves") or []
+                if isinstance(moves, bytes):
+                    moves = record.unpack_moves(moves)
+
+                games[document["_id"]] = ( moves, document.get("player_color", "white"), [
+                    ( position_key(board, self.depth), board.fen() )
+                    for board in game_boards(moves)
+                ] )
+
+            except (KeyError, ValueError) as exc:
+                # Stored too, so broken games are not retried on every run
+                logging.error("Could not analyse game '%s': %s", document["_id"], exc)
+                errors[document["_id"]] = { "error": str(exc) }
+
+        # Cached positions first, each missing position is searched once per batch
+        keys = { key: fen for _, _, positions in games.values() for key, fen in positions }
+        evaluations = {
+            cached["_id"]: cached
+            for cached in self.positions_collection.find({ "_id": { "$in": list(keys) } })
+        }
+        missing = [ key for key in keys if key not in evaluations ]
+
+        searched = executor.map(
+            _evaluate, [ keys[key] for key in missing ], [ self.depth ] * len(missing),
+            chunksize=8
+        )
+        for key, evaluation in zip(missing, searched):
+            evaluations[key] = evaluation
+
+        if len(missing) > 0:
+            self.positions_collection.bulk_write([
+                pymongo.UpdateOne(
+                    { "_id": key }, { "$setOnInsert": evaluations[key] }, upsert=True
+                ) for key in missing
+            ], ordered=False)
+
+        analyses = {
+            game_id: analyse_game(
+                moves, player_color, [ evaluations[key] for key, _ in positions ]
+            )
+            for game_id, ( moves, player_color, positions ) in games.items()
+        }
+        analyses.update(errors)
+
+        updates = []
+        for game_id, analysis in analyses.items():
+            analysis.update({
+                "depth": self.depth, "version": ANALYSIS_VERSION,
+                "ctime": int(time.time() * 1000)
+            })
+            updates.append(
+                pymongo.UpdateOne({ "_id": game_id }, { "$set": { "analysis": analysis } })
+            )
+
+        self.games_collection.bulk_write(updates, ordered=False)
+
+        return {
+            "games": len(games), "failed": len(errors), "searched": len(missing),
+            "cached": len(keys) - len(missing)
+        }
@@ -0,0 +1,267 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+import redis
+from app.utils import codec
+
+# Seconds between checks of the other buffers acknowledgments
+DRAIN_POLL_INTERVAL = 0.01
+
+
+class VoteBuffer:
+    """
+    Accumulate votes in memory and write them to redis in pipelined batches.
+    Votes are flushed every 'flush_interval' seconds or when 'max_pending'
+    votes are waiting, so a crashed worker loses at most one interval of votes.
+
+    Each flush acknowledges the last drain request it saw, so a commit can wait
+    until every live buffer wrote the votes it held when the commit started.
+    """
+    redis_client: redis.Redis
+    flush_interval: float
+    max_pending: int
+
+    def __init__ (
+        self, redis_client: redis.Redis, flush_interval: float = 0.25, max_pending: int = 1000,
+        channel_prefix: str = "chess:events:"
+    ):
+        self.redis_client = redis_client
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.channel_prefix = channel_prefix
+
+        # Ids of the buffers with a flusher, each acknowledges drains in its marker key
+        self.buffers_key = "chess:votes:buffers"
+        self.drain_key = "chess:votes:drain"
+        # A buffer whose marker expired (crashed worker) is not waited for
+        self.marker_ttl = int(max(flush_interval * 10, 5) * 1000)
+
+        # ( game name, voting key, move ) -> votes
+        self._pending: Counter[tuple[str, str, str]] = Counter()
+        # ( game voters key, voting key, expire at ) -> voter ids
+        self._pending_voters: dict[tuple[str, str, int], set[str]] = {}
+        # Round tally expiries, by voting key
+        self._pending_expiries: dict[str, int] = {}
+        self._pending_votes = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._flusher_pid: int | None = None
+        self._buffer_id: str | None = None
+
+    def add (self, name: str, voting_key: str, move: str, expire_at: int = None) -> None:
+        """
+        Buffer a vote, it must be validated already
+
+        :param name: Game name
+        :param voting_key: Voting key of the round
+        :param move: Move in UCI format
+        :param expire_at: Unix time in ms when the round tally expires, defaults to None (never)
+        """
+        self._ensure_flusher()
+
+        with self._lock:
+            self._pending[( name, voting_key, move )] += 1
+            if expire_at is not None:
+                self._pending_expiries[voting_key] = expire_at
+            self._pending_votes += 1
+            is_full = self._pending_votes >= self.max_pending
+
+        if is_full:
+            self.flush()
+
+    def add_voter (self, voters_key: str, voting_key: str, voter: str, expire_at: int) -> None:
+        """
+        Buffer a voter, counted in the game and round unique voters with the next flush
+
+        :param voters_key: Unique voters of the game
+        :param voting_key: Voting key of the round
+        :param voter: Voter id
+        :param expire_at: Unix time in ms when the round voters expire
+        """
+        with self._lock:
+            self._pending_voters.setdefault(( voters_key, voting_key, expire_at ), set()).add(voter)
+
+    def pending (self) -> int:
+        return self._pending_votes
+
+    def marker_key (self, buffer_id: str) -> str:
+        return f"chess:votes:flushed:{buffer_id}"
+
+    def flush (self) -> int:
+        """
+        Write every buffered vote with a single pipeline, then acknowledge the
+        last drain request (empty flushes acknowledge too)
+
+        :return: Number of flushed votes
+        """
+        with self._flush_lock:
+            buffer_id = self._buffer_id
+            drain_id = None
+
+            if buffer_id is not None:
+                try:
+                    # Read before taking the votes: every vote held when this drain
+                    # was requested is in this flush (or an earlier one)
+                    drain_id = int(self.redis_client.get(self.drain_key) or 0)
+
+                except redis.RedisError as exc:
+                    logging.error("Failed to flush buffered votes: %s", exc)
+                    return 0
+
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                pending_voters, self._pending_voters = self._pending_voters, {}
+                pending_expiries, self._pending_expiries = self._pending_expiries, {}
+                self._pending_votes = 0
+
+            if len(pending) == 0 and buffer_id is None:
+                return 0
+
+            try:
+                with self.redis_client.pipeline(transaction=False) as pipe:
+                    for ( _, voting_key, move ), votes in pending.items():
+                        pipe.zincrby(voting_key, votes, move)
+
+                    for voting_key, expire_at in pending_expiries.items():
+                        pipe.pexpireat(voting_key, expire_at)
+
+                    for ( voters_key, voting_key, expire_at ), voters in pending_voters.items():
+                        pipe.pfadd(voters_key, *voters)
+                        pipe.pfadd(f"{voting_key}:voters", *voters)
+                        pipe.pexpireat(f"{voting_key}:voters", expire_at)
+
+                    for name in { name for name, _, _ in pending }:
+                        pipe.publish(
+                            f"{self.channel_prefix}{name}", codec.dumps({ "type": "tally" })
+                        )
+
+                    if buffer_id is not None:
+                        # Written after the votes, a non transactional pipeline runs in order
+                        pipe.set(self.marker_key(buffer_id), drain_id, px=self.marker_ttl)
+                        pipe.sadd(self.buffers_key, buffer_id)
+
+                    pipe.execute()
+
+            except redis.RedisError as exc:
+                # Keep the votes for the next flush
+                logging.error("Failed to flush %s buffered votes: %s", pending.total(), exc)
+
+                with self._lock:
+                    self._pending.update(pending)
+                    self._pending_votes += pending.total()
+
+                    for key, voters in pending_voters.items():
+                        self._pending_voters.setdefault(key, set()).update(voters)
+
+                    for voting_key, expire_at in pending_expiries.items():
+                        self._pending_expiries.setdefault(voting_key, expire_at)
+
+                return 0
+
+            return pending.total()
+
+    def drain (self, timeout: float) -> bool:
+        """
+        Flush the votes of every live buffer (every worker) before a tally is read.
+        Votes held by a buffer when the drain starts are written once it returns
+        True, unless their worker crashed (at most one flush interval of its votes).
+        Votes accepted while waiting may miss the round being committed.
+
+        :param timeout: Max seconds to wait for the other buffers
+        :return: False if a live buffer did not flush within 'timeout'
+        """
+        drain_id = self.redis_client.incr(self.drain_key)
+        self.flush()
+
+        end = time.monotonic() + timeout
+        while True:
+            buffer_ids = [
+                buffer_id.decode("utf8")
+                for buffer_id in self.redis_client.smembers(self.buffers_key)
+            ]
+            markers = []
+            if len(buffer_ids) > 0:
+                markers = self.redis_client.mget([
+                    self.marker_key(buffer_id) for buffer_id in buffer_ids
+                ])
+
+            gone = [ buffer_id for buffer_id, marker in zip(buffer_ids, markers) if marker is None ]
+            if len(gone) > 0:
+                self.redis_client.srem(self.buffers_key, *gone)
+
+            waiting = sum(1 for marker in markers if marker is not None and int(marker) < drain_id)
+            if waiting == 0:
+                return True
+
+            if time.monotonic() >= end:
+                logging.warning("%s vote buffers did not flush within %ss", waiting, timeout)
+                return False
+
+            # Other buffers flush on their own interval, not this one
+            time.sleep(min(DRAIN_POLL_INTERVAL, max(0, end - time.monotonic())))
+
+    def close (self) -> None:
+        self._stop.set()
+        self.flush()
+
+        if self._buffer_id is not None:
+            try:
+                # Drains do not wait for a stopped buffer
+                with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.srem(self.buffers_key, self._buffer_id)
+                    pipe.delete(self.marker_key(self._buffer_id))
+                    pipe.execute()
+
+            except redis.RedisError as exc:
+                logging.warning("Failed to unregister the vote buffer: %s", exc)
+
+    def _ensure_flusher (self) -> None:
+        # Threads do not survive a fork, start one flusher per worker process
+        if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+
+        with self._lock:
+            if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+
+            if self._flusher_pid is None:
+                # Flush what is left before the interpreter exits, the app also
+                # closes the buffer on lifecycle stop
+                atexit.register(self.close)
+
+            # Votes buffered by the parent process are flushed by the parent
+            self._pending = Counter()
+            self._pending_voters = {}
+            self._pending_expiries = {}
+            self._pending_votes = 0
+            self._stop.clear()
+            self._buffer_id = uuid.uuid4().hex
+            self._register()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="vote-buffer", daemon=True
+            )
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
+
+    def _register (self) -> None:
+        # Before the first vote is held, so no drain misses it
+        try:
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(self.marker_key(self._buffer_id), 0, px=self.marker_ttl)
+                pipe.sadd(self.buffers_key, self._buffer_id)
+                pipe.execute()
+
+        except redis.RedisError as exc:
+            # Registered by the first flush
+            logging.warning("Failed to register the vote buffer: %s", exc)
+
+    def _flush_loop (self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
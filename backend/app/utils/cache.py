@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+
+import redis
+from app.services.game.models import ChessGame
+
+
+class GameCache:
+    """
+    Per worker cache of games, each entry is tagged with the game version counter
+    stored in redis. Writers bump the version and publish the game name in
+    'channel', so every worker drops its copy as soon as a move is committed.
+
+    If an invalidation is lost (listener reconnecting, message in flight) an entry
+    is never served for more than 'max_staleness' seconds without checking the version.
+    """
+    redis_client: redis.Redis
+    channel: str
+    max_staleness: float
+
+    hits: int
+    misses: int
+
+    def __init__ (
+        self, redis_client: redis.Redis, channel: str = "chess:games:invalidate",
+        max_staleness: float = 1.0
+    ):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.max_staleness = max_staleness
+
+        self.hits = 0
+        self.misses = 0
+
+        # name -> (version, game, last validation time)
+        self._entries: dict[str, tuple[int, ChessGame, float]] = {}
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+        self._listener_pid: int | None = None
+
+    def get (
+        self, name: str, version_key: str, load: Callable[[], tuple[int, ChessGame | None]]
+    ) -> tuple[int, ChessGame | None]:
+        """
+        Get a game from memory, loading it from redis when missing or outdated.
+        Returned objects are shared between requests, do not mutate them.
+
+        :param name: Game name
+        :param version_key: Redis key with the game version counter
+        :param load: Callable returning ( version, game ) from redis
+        :return: Game version and object (None if the game does not exist)
+        """
+        self._ensure_listener()
+
+        now = time.monotonic()
+        entry = self._entries.get(name)
+
+        if entry is not None:
+            version, game, validated_at = entry
+
+            if now - validated_at <= self.max_staleness:
+                self.hits += 1
+                return version, game
+
+            # Too old to trust without asking redis, check only the version
+            current_version = int(self.redis_client.get(version_key) or 0)
+            if current_version == version:
+                self.hits += 1
+                with self._lock:
+                    self._entries[name] = ( version, game, now )
+
+                return version, game
+
+        self.misses += 1
+        version, game = load()
+
+        if game is not None:
+            with self._lock:
+                self._entries[name] = ( version, game, now )
+
+        return version, game
+
+    def invalidate (self, name: str = None) -> None:
+        """
+        Drop a game from this worker cache
+
+        :param name: Game name, defaults to None (drop every game)
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+
+            else:
+                self._entries.pop(name, None)
+
+    def stats (self) -> dict[str, int]:
+        return { "hits": self.hits, "misses": self.misses, "size": len(self._entries) }
+
+    def _ensure_listener (self) -> None:
+        # Threads do not survive a fork, start one listener per worker process
+        if self._listener_pid == os.getpid() and self._listener.is_alive():
+            return
+
+        with self._lock:
+            if self._listener_pid == os.getpid() and self._listener.is_alive():
+                return
+
+            self._entries.clear()
+            self._listener = threading.Thread(
+                target=self._listen, name="game-cache-invalidation", daemon=True
+            )
+            self._listener_pid = os.getpid()
+            self._listener.start()
+
+    def _listen (self) -> None:
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+
+            try:
+                pubsub.subscribe(self.channel)
+                # Anything published while disconnected was missed
+                self.invalidate()
+
+                # Poll with a timeout, blocking reads would hit the pool socket timeout
+                while True:
+                    message = pubsub.get_message(timeout=self.max_staleness)
+
+                    if message is not None and message["type"] == "message":
+                        self.invalidate(message["data"].decode("utf8"))
+
+            except redis.RedisError as exc:
+                logging.warning("Game cache listener disconnected: %s", exc)
+                time.sleep(self.max_staleness)
+
+            finally:
+                pubsub.close()
@@ -0,0 +1,42 @@
+"""
+Json encoding of games, events and responses. Every value written to redis or
+sent to clients goes through 'dumps', so there is a single encoder to tune.
+"""
+import dataclasses as dc
+import functools
+from typing import Any
+
+import orjson
+
+# Accept non string keys (converted) like the json module
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default (value: Any) -> str:
+    # Mongo ObjectIds and other values with a string form
+    return str(value)
+
+def dumps (value: Any) -> bytes:
+    """
+    :return: Compact utf8 json
+    """
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+def loads (raw_value: bytes | str) -> Any:
+    return orjson.loads(raw_value)
+
+@functools.cache
+def field_names (cls: type) -> tuple[str, ...]:
+    return tuple(field.name for field in dc.fields(cls))
+
+def to_dict (obj: Any, exclude: tuple[str, ...] = ()) -> dict[str, Any]:
+    """
+    Shallow dict of a dataclass, slotted models have no '__dict__' and
+    'dataclasses.asdict' deep copies every list
+
+    :param obj: Dataclass instance
+    :param exclude: Fields left out, defaults to ()
+    """
+    return {
+        field: getattr(obj, field) for field in field_names(type(obj)) if field not in exclude
+    }
@@ -2,11 +2,131 @@ import os
 
 REDIS_CONN = os.environ.get("REDIS_CONN", "127.0.0.1")
 REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD", "")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+REDIS_DB = int(os.environ.get("REDIS_DB", 0))
 MONGO_CONN = os.environ.get("MONGO_CONN", "mongodb://localhost:27017")
 FLASK_ENV = os.environ.get("FLASK_ENV", "development")
-RECAPTCHA_SECRET_KEY = os.environ["RECAPTCHA_SECRET_KEY"]
+# Required by the api only (checked on startup, see 'check_config'), tooling imports
+# config without it
+RECAPTCHA_SECRET_KEY = os.environ.get("RECAPTCHA_SECRET_KEY", "")
+
+# reCAPTCHA verification, 'siteverify' posts to RECAPTCHA_VERIFY_URL, 'allow' accepts any token
+RECAPTCHA_BACKEND = os.environ.get("RECAPTCHA_BACKEND", "siteverify")
+RECAPTCHA_VERIFY_URL = os.environ.get(
+    "RECAPTCHA_VERIFY_URL", "https://www.google.com/recaptcha/api/siteverify"
+)
+RECAPTCHA_TIMEOUT = float(os.environ.get("RECAPTCHA_TIMEOUT", 3))
+RECAPTCHA_POOL_SIZE = int(os.environ.get("RECAPTCHA_POOL_SIZE", 20))
+# Verify tokens in background threads and count the vote afterwards, 0 to verify inline
+RECAPTCHA_ASYNC_WORKERS = int(os.environ.get("RECAPTCHA_ASYNC_WORKERS", 0))
+
+# Connection pools, one of each per worker process
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 5))
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 20))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+
+# UCI engine pool
+STOCKFISH_PATH = os.environ.get("STOCKFISH_PATH", "/usr/games/stockfish")
+ENGINE_POOL_SIZE = int(os.environ.get("ENGINE_POOL_SIZE", 1))
+ENGINE_THREADS = int(os.environ.get("ENGINE_THREADS", 1))
+ENGINE_HASH_MB = int(os.environ.get("ENGINE_HASH_MB", 64))
+ENGINE_SKILL_LEVEL = int(os.environ.get("ENGINE_SKILL_LEVEL", 20))
+ENGINE_BORROW_TIMEOUT = float(os.environ.get("ENGINE_BORROW_TIMEOUT", 300))
+# Engine moves by position, skill level and search time, shared by every game
+ENGINE_CACHE_ENABLED = os.environ.get("ENGINE_CACHE_ENABLED", "true").lower() == "true"
+ENGINE_CACHE_MAX_POSITIONS = int(os.environ.get("ENGINE_CACHE_MAX_POSITIONS", 100000))
+# Post-game analysis (python -m app.analysis), processes 0 for one engine per core
+ANALYSIS_DEPTH = int(os.environ.get("ANALYSIS_DEPTH", 14))
+ANALYSIS_PROCESSES = int(os.environ.get("ANALYSIS_PROCESSES", 0))
+ANALYSIS_BATCH = int(os.environ.get("ANALYSIS_BATCH", 50))
+
+# Search AI replies to the leading vote candidates while voting is open
+PONDER_ENABLED = os.environ.get("PONDER_ENABLED", "true").lower() == "true"
+PONDER_INTERVAL = int(os.environ.get("PONDER_INTERVAL", 300))
+PONDER_CANDIDATES = int(os.environ.get("PONDER_CANDIDATES", 3))
+# Only games committing within these seconds are pondered
+PONDER_HORIZON = int(os.environ.get("PONDER_HORIZON", 3600))
+
+# Only the leader runs the move commit loop, a dead leader is replaced after the lease
+LEADER_LEASE_SECONDS = float(os.environ.get("LEADER_LEASE_SECONDS", 30))
+
+# Max vote tally events per second and game sent to stream viewers
+STREAM_TALLY_RATE = float(os.environ.get("STREAM_TALLY_RATE", 2))
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT", 15))
+
+# Buffer votes in memory and write them in batches, the flush interval is also
+# the max window of votes lost if a worker crashes. Commits wait up to the drain
+# timeout for every worker to flush, see 'VoteBuffer.drain'
+VOTE_BUFFER_ENABLED = os.environ.get("VOTE_BUFFER_ENABLED", "false").lower() == "true"
+VOTE_BUFFER_FLUSH_MS = int(os.environ.get("VOTE_BUFFER_FLUSH_MS", 250))
+VOTE_BUFFER_MAX_PENDING = int(os.environ.get("VOTE_BUFFER_MAX_PENDING", 1000))
+VOTE_BUFFER_DRAIN_TIMEOUT = float(os.environ.get("VOTE_BUFFER_DRAIN_TIMEOUT", 2))
+
+# One vote per voter and round, checked on a Bloom filter of the round.
+# Enforced in the vote script, so votes skip the buffer
+VOTE_ONCE_PER_ROUND = os.environ.get("VOTE_ONCE_PER_ROUND", "false").lower() == "true"
+# Bloom filter bits (redis memory per round is bits / 8) and hash functions
+VOTER_FILTER_BITS = int(os.environ.get("VOTER_FILTER_BITS", 1 << 18))
+VOTER_FILTER_HASHES = int(os.environ.get("VOTER_FILTER_HASHES", 4))
+# Header with the voter id (like 'X-Real-IP' behind a proxy), remote address if empty
+VOTER_ID_HEADER = os.environ.get("VOTER_ID_HEADER", "")
+# Seconds the keys of a round (tally, voters) are kept after its deadline
+VOTER_KEYS_GRACE = int(os.environ.get("VOTER_KEYS_GRACE", 3600))
+# Seconds between scans for round keys left behind, and keys per scan call
+VOTE_SWEEP_INTERVAL = int(os.environ.get("VOTE_SWEEP_INTERVAL", 3600))
+VOTE_SWEEP_BATCH = int(os.environ.get("VOTE_SWEEP_BATCH", 500))
+
+# Seconds a CDN or reverse proxy can serve game and voting status responses
+STATUS_MAX_AGE = int(os.environ.get("STATUS_MAX_AGE", 2))
+
+# Max finished games per archive page
+FINISHED_GAMES_MAX_LIMIT = int(os.environ.get("FINISHED_GAMES_MAX_LIMIT", 50))
+# Max plies per /history page
+HISTORY_MAX_LIMIT = int(os.environ.get("HISTORY_MAX_LIMIT", 500))
+
+# Seconds before retrying a failed game commit
+COMMIT_RETRY_SECONDS = float(os.environ.get("COMMIT_RETRY_SECONDS", 60))
+# Due games committed at the same time, AI moves also wait for a free engine
+COMMIT_WORKERS = int(os.environ.get("COMMIT_WORKERS", 4))
+# 'local' commits in the web leader, 'queue' enqueues commits for 'python -m app.worker'
+COMMIT_MODE = os.environ.get("COMMIT_MODE", "local")
+# Seconds a commit job can run before another worker takes it
+COMMIT_JOB_TIMEOUT = float(os.environ.get("COMMIT_JOB_TIMEOUT", 300))
+COMMIT_JOB_MAX_ATTEMPTS = int(os.environ.get("COMMIT_JOB_MAX_ATTEMPTS", 3))
+# Concurrent commits of a commit worker, each one with its own engine, 0 for one per core
+COMMIT_WORKER_CONCURRENCY = int(os.environ.get("COMMIT_WORKER_CONCURRENCY", 0))
+# Port of the commit worker Prometheus metrics, 0 to disable
+COMMIT_WORKER_METRICS_PORT = int(os.environ.get("COMMIT_WORKER_METRICS_PORT", 0))
+
+# Games created from the API
+GAMES_MAX = int(os.environ.get("GAMES_MAX", 10000))
+GAME_MIN_BASE_UPDATE = int(os.environ.get("GAME_MIN_BASE_UPDATE", 60))
+GAME_MAX_BASE_UPDATE = int(os.environ.get("GAME_MAX_BASE_UPDATE", 7 * 24 * 3600))
+GAME_MAX_BOT_LIMIT = int(os.environ.get("GAME_MAX_BOT_LIMIT", 60))
+# Max game names per /list-games page
+LIST_GAMES_MAX_LIMIT = int(os.environ.get("LIST_GAMES_MAX_LIMIT", 100))
+
+# 'create' runs the startup phases (warm-up, background jobs) in 'create_app', 'hook'
+# leaves them to the gunicorn 'post_worker_init' hook, needed with --preload
+APP_START = os.environ.get("APP_START", "create")
+# Games loaded in the worker cache and engines started before serving requests
+WARMUP_MAX_GAMES = int(os.environ.get("WARMUP_MAX_GAMES", 1000))
+WARMUP_ENGINES = os.environ.get("WARMUP_ENGINES", "true").lower() == "true"
+# Seconds before retrying a failed startup phase (like redis down)
+STARTUP_RETRY_SECONDS = float(os.environ.get("STARTUP_RETRY_SECONDS", 5))
+
+# Prometheus '/metrics' endpoint, gunicorn workers share metrics through the
+# PROMETHEUS_MULTIPROC_DIR directory (set in gunicorn_config.py)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# Max seconds a worker serves a cached game without checking its version in redis
+GAME_CACHE_MAX_STALENESS = float(os.environ.get("GAME_CACHE_MAX_STALENESS", 1.0))
 
 # Gunicorn config
 GUNICORN_BIND = os.environ.get("GUNICORN_BIND", "0.0.0.0:5002")
 GUNICORN_WORKERS = os.environ.get("GUNICORN_WORKERS", 4)
-GUNICORN_TIMEOUT = os.environ.get("GUNICORN_TIMEOUT", 120)
\ No newline at end of file
+GUNICORN_TIMEOUT = os.environ.get("GUNICORN_TIMEOUT", 120)
+# Event stream viewers hold a connection each, use an async worker
+GUNICORN_WORKER_CLASS = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+GUNICORN_WORKER_CONNECTIONS = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 5000))
\ No newline at end of file
@@ -0,0 +1,207 @@
+import contextlib
+import logging
+import os
+import queue
+import threading
+from collections.abc import Iterator
+
+import chess
+import chess.engine
+from app.utils import config
+from app.utils.metrics import timed
+
+
+class EnginePool:
+    """
+    Pool of long-lived UCI engine processes. Engines are started on first use,
+    checked before each borrow and restarted when they crash.
+
+    Engine threads are not daemons, the pool owner must 'close' it before the
+    interpreter exits (the app does it on lifecycle stop).
+    """
+    command: str | list[str]
+    size: int
+    options: dict[str, str | int]
+
+    def __init__ (
+        self, command: str | list[str] = None, size: int = None, threads: int = None,
+        hash_mb: int = None, timeout: float = None
+    ):
+        """
+        :param command: UCI binary path (or argv list), defaults to config.STOCKFISH_PATH
+        :param size: Number of engine processes, defaults to config.ENGINE_POOL_SIZE
+        :param threads: Search threads per engine, defaults to config.ENGINE_THREADS
+        :param hash_mb: Hash table size per engine in MB, defaults to config.ENGINE_HASH_MB
+        :param timeout: Seconds to wait for a free engine, defaults to config.ENGINE_BORROW_TIMEOUT
+        """
+        self.command = command or config.STOCKFISH_PATH
+        self.size = size or config.ENGINE_POOL_SIZE
+        self.timeout = timeout or config.ENGINE_BORROW_TIMEOUT
+        self.options = {
+            "Threads": threads or config.ENGINE_THREADS,
+            "Hash": hash_mb or config.ENGINE_HASH_MB
+        }
+
+        self._engines: queue.Queue[chess.engine.SimpleEngine | None] = queue.Queue()
+        self._all_engines: list[chess.engine.SimpleEngine] = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._closed = False
+
+    def _ensure_started (self) -> None:
+        # Engine processes and their threads belong to the process that started them
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._engines = queue.Queue()
+            self._all_engines = []
+            # Placeholders, engines are spawned when first borrowed
+            for _ in range(self.size):
+                self._engines.put(None)
+
+            self._pid = os.getpid()
+            self._closed = False
+
+    def _spawn (self) -> chess.engine.SimpleEngine:
+        engine = chess.engine.SimpleEngine.popen_uci(self.command)
+        engine.configure(self._supported(engine, self.options))
+
+        with self._lock:
+            self._all_engines.append(engine)
+
+        logging.info("Started UCI engine '%s' (pid %s)", self.command, engine.transport.get_pid())
+
+        return engine
+
+    def _discard (self, engine: chess.engine.SimpleEngine) -> None:
+        with self._lock:
+            if engine in self._all_engines:
+                self._all_engines.remove(engine)
+
+        try:
+            engine.close()
+
+        except Exception:
+            ...
+
+    @staticmethod
+    def _supported (
+        engine: chess.engine.SimpleEngine, options: dict[str, str | int] = None
+    ) -> dict[str, str | int]:
+        # Other UCI engines (or test stubs) may not have every stockfish option
+        return {
+            option: value for option, value in (options or {}).items() if option in engine.options
+        }
+
+    def _healthy (self, engine: chess.engine.SimpleEngine) -> bool:
+        try:
+            engine.ping()
+            return True
+
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError, TimeoutError):
+            return False
+
+    @contextlib.contextmanager
+    def borrow (self) -> Iterator[chess.engine.SimpleEngine]:
+        """
+        Borrow an engine, it goes back to the pool when the block exits.
+        Engines that crash while borrowed are replaced on the next borrow.
+
+        :raises queue.Empty: Raised when no engine is free before the pool timeout
+        """
+        self._ensure_started()
+
+        if self._closed:
+            raise RuntimeError("Engine pool is closed")
+
+        engine = self._engines.get(timeout=self.timeout)
+
+        try:
+            if engine is not None and not self._healthy(engine):
+                logging.warning("UCI engine '%s' is not responding, restarting", self.command)
+                self._discard(engine)
+                engine = None
+
+            if engine is None:
+                engine = self._spawn()
+
+            yield engine
+
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+            if engine is not None:
+                self._discard(engine)
+                engine = None
+
+            raise
+
+        finally:
+            self._engines.put(engine)
+
+    @timed("engine_play")
+    def play (
+        self, board: chess.Board, limit: chess.engine.Limit, options: dict[str, str | int] = None
+    ) -> chess.engine.PlayResult:
+        """
+        Search a move with a pooled engine
+
+        :param board: Position to search
+        :param limit: Search limit
+        :param options: Engine options for this search only (like Skill Level)
+        :return: Engine play result
+        """
+        with self.borrow() as engine:
+            return engine.play(board, limit, options=self._supported(engine, options))
+
+    @timed("engine_analyse")
+    def analyse (
+        self, board: chess.Board, limit: chess.engine.Limit, options: dict[str, str | int] = None
+    ) -> chess.engine.InfoDict:
+        """
+        Analyse a position with a pooled engine
+
+        :param board: Position to analyse
+        :param limit: Search limit
+        :param options: Engine options for this search only
+        :return: Engine analysis info
+        """
+        with self.borrow() as engine:
+            return engine.analyse(board, limit, options=self._supported(engine, options))
+
+    def warm_up (self) -> int:
+        """
+        Start every engine process now instead of on first borrow
+
+        :return: Number of running engines
+        """
+        with contextlib.ExitStack() as stack:
+            for _ in range(self.size):
+                stack.enter_context(self.borrow())
+
+        return len(self._all_engines)
+
+    def stats (self) -> dict[str, int]:
+        return {
+            "size": self.size, "running": len(self._all_engines), "idle": self._engines.qsize()
+        }
+
+    def close (self) -> None:
+        """
+        Quit every engine process of this pool
+        """
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            engines, self._all_engines = self._all_engines, []
+            self._closed = True
+
+        for engine in engines:
+            try:
+                engine.quit()
+
+            except Exception:
+                engine.close()
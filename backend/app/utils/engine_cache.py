@@ -0,0 +1,136 @@
+import chess
+import chess.polyglot
+import redis
+from app.utils import codec
+
+# Entries are scored by a counter incremented on every use, the lowest is the
+# least recently used
+
+# KEYS: moves hash, lru sorted set, lru clock, stats hash | ARGV: entry
+GET_SCRIPT = """
+local raw_result = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw_result then
+    redis.call('HINCRBY', KEYS[4], 'misses', 1)
+    return false
+end
+redis.call('ZADD', KEYS[2], redis.call('INCR', KEYS[3]), ARGV[1])
+return raw_result
+"""
+
+# KEYS: moves hash, lru sorted set, lru clock | ARGV: entry, result, max entries
+PUT_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], redis.call('INCR', KEYS[3]), ARGV[1])
+local overflow = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[3])
+if overflow > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, overflow - 1)
+    redis.call('HDEL', KEYS[1], unpack(evicted))
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, overflow - 1)
+end
+return overflow
+"""
+
+
+class EngineCache:
+    """
+    Engine moves shared by every game and worker, keyed by the Zobrist hash of
+    the position, the skill level and the search time. Least recently used
+    positions are evicted past 'max_entries'.
+    """
+    redis_client: redis.Redis
+    max_entries: int
+
+    def __init__ (self, redis_client: redis.Redis, max_entries: int = 100000):
+        """
+        :param redis_client: Redis client
+        :param max_entries: Positions kept, defaults to 100000
+        """
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+
+        self.moves_key = "chess:engine:moves"
+        self.lru_key = "chess:engine:lru"
+        self.clock_key = "chess:engine:clock"
+        self.stats_key = "chess:engine:stats"
+
+        self._get_script = redis_client.register_script(GET_SCRIPT)
+        self._put_script = redis_client.register_script(PUT_SCRIPT)
+
+    @staticmethod
+    def entry (board: chess.Board, limit: float, skill_level: int) -> str:
+        # Same position (castling and en passant rights included) and search settings
+        return f"{chess.polyglot.zobrist_hash(board):016x}:{skill_level}:{limit:g}"
+
+    def get (self, board: chess.Board, limit: float, skill_level: int) -> chess.Move | None:
+        """
+        Get the cached engine move of a position
+
+        :param board: Position to play
+        :param limit: Search seconds
+        :param skill_level: Engine skill level
+        :return: Cached move or None if the position was not searched with these settings
+        """
+        raw_result = self._get_script(
+            keys=[ self.moves_key, self.lru_key, self.clock_key, self.stats_key ],
+            args=[ self.entry(board, limit, skill_level) ]
+        )
+
+        if raw_result is None:
+            return None
+
+        result = codec.loads(raw_result)
+        move = chess.Move.from_uci(result["move"])
+
+        # Zobrist hashes can collide, never play an illegal move
+        if move not in board.legal_moves:
+            self.redis_client.hincrby(self.stats_key, "misses", 1)
+            return None
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self.stats_key, "hits", 1)
+            pipe.hincrbyfloat(self.stats_key, "seconds_saved", result["seconds"])
+            pipe.execute()
+
+        return move
+
+    def put (
+        self, board: chess.Board, limit: float, skill_level: int, move: chess.Move, seconds: float
+    ) -> None:
+        """
+        Cache the engine move of a position
+
+        :param board: Searched position
+        :param limit: Search seconds
+        :param skill_level: Engine skill level
+        :param move: Engine move
+        :param seconds: Search duration, added to the saved seconds on each hit
+        """
+        self._put_script(
+            keys=[ self.moves_key, self.lru_key, self.clock_key ],
+            args=[
+                self.entry(board, limit, skill_level),
+                codec.dumps({ "move": move.uci(), "seconds": seconds }), self.max_entries
+            ]
+        )
+
+    def contains (self, board: chess.Board, limit: float, skill_level: int) -> bool:
+        entry = self.entry(board, limit, skill_level)
+
+        return bool(self.redis_client.hexists(self.moves_key, entry))
+
+    def stats (self) -> dict[str, int | float]:
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self.stats_key)
+            pipe.zcard(self.lru_key)
+            raw_stats, positions = pipe.execute()
+
+        hits = int(raw_stats.get(b"hits", 0))
+        misses = int(raw_stats.get(b"misses", 0))
+
+        return {
+            "positions": positions,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+            "seconds_saved": float(raw_stats.get(b"seconds_saved", 0.0))
+        }
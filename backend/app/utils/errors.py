@@ -1,2 +1,11 @@
 class RecaptchaError(Exception):
     pass
+
+class FencingError(Exception):
+    pass
+
+class DuplicateVoteError(Exception):
+    pass
+
+class NotFoundError(ValueError):
+    pass
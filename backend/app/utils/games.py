@@ -1,19 +1,119 @@
+import functools
 import json
 import logging
+import os
 import random
 import time
+import traceback
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
+import bson
+import bson.errors
 import chess
 import chess.engine
 import pymongo
+import pymongo.errors
 import pymongo.collection
 import pymongo.database
 import redis
 from app.services.game.models import ChessGame
 from app.services.game.structs import CreateChessGame
-from app.utils import config
+from app.utils import codec, config, record, voters
+from app.utils.buffer import VoteBuffer
+from app.utils.cache import GameCache
+from app.utils.engine import EnginePool
+from app.utils.engine_cache import EngineCache
+from app.utils.errors import DuplicateVoteError, FencingError, NotFoundError
+from app.utils.jobs import CommitQueue
+from app.utils.leader import LeaderElection
+from app.utils.metrics import (
+    COMMITS, VOTES, VOTING_KEYS_SWEPT, InstrumentedConnection, timed
+)
+from app.utils.ponder import PonderCache
+from app.utils.pools import MongoPoolStats, redis_pool_stats
+from app.utils.stream import EventBroadcaster
+
+# Vote script return codes
+VOTE_ACCEPTED = 1
+VOTE_ILLEGAL = 0
+VOTE_NOT_TURN = -1
+VOTE_NO_ROUND = -2
+VOTE_DUPLICATE = -3
+
+VOTE_RESULTS = {
+    VOTE_ACCEPTED: VOTES.labels("accepted"),
+    VOTE_ILLEGAL: VOTES.labels("illegal"),
+    VOTE_NOT_TURN: VOTES.labels("not_turn"),
+    VOTE_NO_ROUND: VOTES.labels("no_game"),
+    VOTE_DUPLICATE: VOTES.labels("duplicate")
+}
+
+# KEYS: round hash, legal moves set, game voters | ARGV: move in UCI format, game
+# events channel, voter id ('' if unknown), round keys ttl in ms (rounds written
+# without 'expires_at'), Bloom filter offsets of the voter (none to not enforce)
+VOTE_SCRIPT = """
+local round = redis.call('HMGET', KEYS[1], 'voting_key', 'turn', 'player_color', 'expires_at')
+if not round[1] then
+    return -2
+end
+if round[2] ~= round[3] then
+    return -1
+end
+if redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+local function expire (key)
+    if round[4] then
+        redis.call('PEXPIREAT', key, round[4])
+    else
+        redis.call('PEXPIRE', key, ARGV[4])
+    end
+end
+if ARGV[3] ~= '' then
+    if #ARGV > 4 then
+        local filter_key = round[1] .. ':filter'
+        local is_new = false
+        for i = 5, #ARGV do
+            if redis.call('SETBIT', filter_key, ARGV[i], 1) == 0 then
+                is_new = true
+            end
+        end
+        if not is_new then
+            return -3
+        end
+        expire(filter_key)
+    end
+    local round_voters_key = round[1] .. ':voters'
+    redis.call('PFADD', round_voters_key, ARGV[3])
+    redis.call('PFADD', KEYS[3], ARGV[3])
+    expire(round_voters_key)
+end
+redis.call('ZINCRBY', round[1], 1, ARGV[1])
+expire(round[1])
+redis.call('PUBLISH', ARGV[2], '{"type": "tally"}')
+return 1
+"""
+
+# Round keys (tally, voters filter and count) are "{game}:{fen}[:suffix]", game
+# names have no ':' or '/', so only they match
+VOTING_KEYS_PATTERN = "*:*/*/*/*/*/*/*/* [wb] *"
+
+# KEYS: round hash of the key game, key | ARGV: voting key the key belongs to.
+# Returns 0 (current round, kept), 1 (current round, expiry added) or 2 (unlinked)
+SWEEP_SCRIPT = """
+local round = redis.call('HMGET', KEYS[1], 'voting_key', 'expires_at')
+if round[1] == ARGV[1] then
+    if round[2] and redis.call('PTTL', KEYS[2]) == -1 then
+        redis.call('PEXPIREAT', KEYS[2], round[2])
+        return 1
+    end
+    return 0
+end
+redis.call('UNLINK', KEYS[2])
+return 2
+"""
 
 
 class GamesManager(ABC):
@@ -23,6 +123,16 @@ class GamesManager(ABC):
     games_collection: pymongo.collection.Collection
 
     redis_client: redis.Redis
+    engine_pool: EnginePool
+    ponder_cache: PonderCache | None = None
+    engine_cache: EngineCache | None = None
+    leader: LeaderElection | None = None
+    events: EventBroadcaster
+    vote_buffer: VoteBuffer | None = None
+    commit_queue: CommitQueue | None = None
+
+    _commit_executor: ThreadPoolExecutor | None = None
+    _commit_executor_pid: int | None = None
 
     @property
     @abstractmethod
@@ -36,85 +146,203 @@ class GamesManager(ABC):
         raise ValueError("Cannot set games directly, use 'add_game' or 'update_game' instead.")
 
     @abstractmethod
-    def get_games (self) -> list[str]:
+    def get_games (self, limit: int = None, cursor: str = None) -> list[str]:
         """
-        Get registered names in redis
+        Get registered names in redis, sorted by name
 
+        :param limit: Max names, defaults to None (every name)
+        :param cursor: Last name of the previous page, defaults to None (first page)
         :return: List of game names
         """
 
     @abstractmethod
-    def add_game (self, name: str, base_update: int, next_update: int = None) -> None:
+    def count_games (self) -> int:
+        """
+        Get the number of registered games
+        """
+
+    @abstractmethod
+    def count_voting_keys (self, names: list[str] = None) -> int:
+        """
+        Get the number of vote tallies of the current rounds
+
+        :param names: Game names, defaults to None (every game)
+        """
+
+    @abstractmethod
+    def count_voters (self, name: str) -> dict[str, int]:
+        """
+        Get the approximate unique voters of a game and of its current round
+
+        :param name: Game name
+        """
+
+    @abstractmethod
+    def sweep_voting_keys (self, batch: int = 500) -> dict[str, int]:
+        """
+        Unlink round keys (tallies, voters) of positions that are not the current
+        round of their game, left by crashes or games played before they expired.
+        Keys of current rounds without an expiry get one.
+
+        :param batch: Keys per SCAN call and pipeline, defaults to 500
+        :return: Number of scanned, kept, expiring (expiry added) and reclaimed keys
+        """
+
+    @abstractmethod
+    def get_history (self, name: str, since: int = 0, limit: int = None) -> dict[str, Any]:
+        """
+        Get the played moves after a ply, each with the FEN after it and the votes of its round
+
+        :param name: Game name
+        :param since: Last ply known by the client, defaults to 0 (from the start)
+        :param limit: Max entries, defaults to None (every entry)
+        :return: History entries and the ply of the game
+        """
+
+    @abstractmethod
+    def add_game (
+        self, name: str, base_update: int, next_update: int = None, bot_limit: int = 60,
+        player_color: str = "white", replace: bool = True
+    ) -> None:
         """
         Add a game
 
         :param name: Game name
         :param base_update: Base update time in seconds (like 60 for 1 minute)
         :param next_update: Next update, defaults to None (time now + base_update will be used)
+        :param bot_limit: AI search seconds, defaults to 60
+        :param player_color: Color played by the voters, defaults to "white"
+        :param replace: Replace an existing game with the same name, defaults to True
+        :raises ValueError: Raised if the game exists and 'replace' is False
         """
 
     @abstractmethod
-    def get_game (self, name: str) -> ChessGame:
+    def get_game (self, name: str, fields: tuple[str, ...] = None) -> ChessGame:
         """
         Get a game from name
 
         :param name: Game name
+        :param fields: Only load these fields, defaults to None (load all fields)
         :return: Game Object
         """
 
     @abstractmethod
-    def update_game (self, game: str, move: str, next_update: int) -> ChessGame:
+    def get_due_games (self, now: int = None) -> list[str]:
+        """
+        Get games whose commit time has come, the commit starts 'bot_limit' seconds
+        before 'next_update' to leave time for the AI move
+
+        :param now: Unix time in ms, defaults to None (time now)
+        :return: Due game names
+        """
+
+    @abstractmethod
+    def next_deadline (self) -> float | None:
+        """
+        Get the earliest commit time of every game
+
+        :return: Unix time in seconds or None if there are no games
+        """
+
+    @abstractmethod
+    def postpone_game (self, name: str, seconds: float) -> None:
+        """
+        Move the commit time of a game, used to retry failed commits later
+
+        :param name: Game name
+        :param seconds: Seconds from now
+        """
+
+    @abstractmethod
+    def get_versioned_game (self, name: str) -> tuple[int, ChessGame]:
+        """
+        Get a game and its version, the version changes on every game write
+
+        :param name: Game name
+        :return: Game version and object
+        """
+
+    @abstractmethod
+    def update_game (
+        self, game: str, move: str, top_moves: list[str, int], fencing_token: int = None
+    ) -> ChessGame:
         """
         Update a game with a move
 
         :param game: Game name
         :param move: Move in UCI format
-        :param next_update:
-        :return: _description_
+        :param top_moves: Top voted moves of this round
+        :param fencing_token: Leader fencing token, defaults to None (not fenced)
+        :raises FencingError: Raised if a newer leader was elected
+        :return: Updated game object
         """
 
-    def verify_move (self, game: str, move: str):
+    @abstractmethod
+    def reset_game (self, game: ChessGame, fencing_token: int = None) -> ChessGame:
         """
-        Verify if a move is valid for a game
+        Reset a finished game to the starting position
 
-        :param game: Game name
-        :param move: move in UCI format
-        :raises chess.InvalidMoveError: Raise for illegal moves and trying to move on the wrong turn
+        :param game: Game object to reset
+        :param fencing_token: Leader fencing token, defaults to None (not fenced)
+        :raises FencingError: Raised if a newer leader was elected
+        :return: Reset game object
         """
-        current_game = self.get_game(game)
-        game_board = chess.Board(current_game.board)
 
-        try:
-            chess_move = chess.Move.from_uci(move)
+    @property
+    def fencing_token (self) -> int | None:
+        """
+        Leader fencing token, read once per commit: a lease lost mid-commit must
+        still fence the remaining writes, not turn them into unfenced ones
 
-            # Raise for illegal moves and trying to move on the wrong turn
-            is_player_turn = (
-                (current_game.player_color == "white" and game_board.turn == chess.WHITE)
-                or (current_game.player_color == "black" and game_board.turn == chess.BLACK)
-            )
+        :raises FencingError: Raised if this process does not lead
+        :return: Fencing token, None if there is no election (not fenced)
+        """
+        if self.leader is None:
+            return None
 
-            if (
-                chess_move not in game_board.legal_moves or not is_player_turn
-            ):
-                raise chess.InvalidMoveError(move)
+        token = self.leader.token
+        if token is None or not self.leader.is_leader:
+            raise FencingError(f"'{self.leader.identity}' is not the leader")
 
-        except Exception as exc:
-            logging.error(exc)
+        return token
 
-            raise chess.InvalidMoveError(move)
+    def is_leader (self) -> bool:
+        """
+        Only the leader commits moves, every process leads if there is no election
+        """
+        return self.leader is None or self.leader.is_leader
 
-    def vote (self, game: str, move: str):
+    def warm_up (self, limit: int = None) -> int:
         """
-        Vote for a move in a game
+        Load games in the worker cache, so the first requests do not wait for redis
 
-        :param game: Game name
-        :param move: Move in UCI format
+        :param limit: Max games, defaults to None (every game)
+        :return: Number of loaded games
         """
-        self.verify_move(game, move)
+        names = self.get_games(limit)
+
+        for name in names:
+            try:
+                self.get_versioned_game(name)
+
+            except ValueError:
+                # Removed since listed
+                ...
 
-        curent_game = self.get_game(game)
+        return len(names)
 
-        self.redis_client.zincrby(curent_game.voting_key, 1, move)
+    @abstractmethod
+    def vote (self, game: str, move: str, voter: str = None):
+        """
+        Vote for a move in a game, the move is validated against the round legal moves
+
+        :param game: Game name
+        :param move: Move in UCI format
+        :param voter: Voter id, defaults to None (anonymous, voters are not tracked)
+        :raises chess.InvalidMoveError: Raised for illegal moves and votes on the AI turn
+        :raises ValueError: Raised if the game does not exist
+        :raises DuplicateVoteError: Raised if the voter already voted in this round
+        """
 
     def get_top_n (self, game: str, n: int = 3) -> list[tuple[str, float]]:
         """
@@ -124,18 +352,31 @@ class GamesManager(ABC):
         :param n: N top voted moves, defaults to 3
         :return: Sorted list of tuples with move and score
         """
-        curent_game = self.get_game(game)
+        curent_game = self.get_game(game, ( "board", ))
 
         return [
             ( move.decode("utf8"), int(score) ) for move, score in
             self.redis_client.zrevrange(curent_game.voting_key, 0, n-1, withscores=True)
         ]
 
-    def register_moves (self, game: str):
+    def drain_votes (self):
+        """
+        Flush buffered votes of every worker before reading a tally. Waits for each
+        live buffer to acknowledge a flush started after this call, at most
+        'VOTE_BUFFER_DRAIN_TIMEOUT' seconds. Votes accepted before the call are
+        counted unless their worker crashed (at most one flush interval of votes)
+        """
+        if self.vote_buffer is None:
+            return
+
+        self.vote_buffer.drain(config.VOTE_BUFFER_DRAIN_TIMEOUT)
+
+    def register_moves (self, game: str, fencing_token: int = None):
         """
         Register top players move and make a move for the AI
 
         :param game: Game name
+        :param fencing_token: Leader fencing token, defaults to None (not fenced)
         """
         top_moves = self.get_top_n(game, 3)
 
@@ -145,114 +386,869 @@ class GamesManager(ABC):
         if len(top_moves) > 0:
             top_move = top_moves[0][0]
 
-        current_game: ChessGame = self.update_game(game, top_move, top_moves)
+        current_game: ChessGame = self.update_game(
+            game, top_move, top_moves, fencing_token=fencing_token
+        )
 
         if current_game.finished:
             return
 
-        # AI move
-        # Stockfish config
-        engine = chess.engine.SimpleEngine.popen_uci("/usr/games/stockfish")
-        engine.configure({ "Skill Level": 20 })
+        self.play_ai_move(current_game, fencing_token)
 
-        # Stockfish move
-        ai_move = engine.play(
-            chess.Board(current_game.board), chess.engine.Limit(current_game.bot_limit)
-        )
-        self.update_game(game, ai_move.move, [])
+    def play_ai_move (self, current_game: ChessGame, fencing_token: int = None):
+        """
+        Make a move for the AI, its reply to the last voted move
+
+        :param current_game: Game object, on the AI turn
+        :param fencing_token: Leader fencing token, defaults to None (not fenced)
+        """
+        game = current_game.name
+
+        # AI move, use the reply pondered while voting if the winner was a candidate
+        board = chess.Board(current_game.board)
+        ai_move = None
+        if self.ponder_cache is not None:
+            ai_move = self.ponder_cache.pop(game, current_game.board)
+
+        # Then the move searched for this position before, by any game
+        if ai_move is None and self.engine_cache is not None:
+            ai_move = self.engine_cache.get(
+                board, current_game.bot_limit, config.ENGINE_SKILL_LEVEL
+            )
+
+        if ai_move is None:
+            # Borrow a running engine from the pool
+            start = time.perf_counter()
+            ai_move = self.engine_pool.play(
+                board, chess.engine.Limit(current_game.bot_limit),
+                options={ "Skill Level": config.ENGINE_SKILL_LEVEL }
+            ).move
+
+            if self.engine_cache is not None and ai_move is not None:
+                self.engine_cache.put(
+                    board, current_game.bot_limit, config.ENGINE_SKILL_LEVEL, ai_move,
+                    time.perf_counter() - start
+                )
+
+        self.update_game(game, ai_move, [], fencing_token=fencing_token)
+
+    def ponder_games (self):
+        """
+        Search ahead the AI reply to the leading vote candidates of each game
+        """
+        if self.ponder_cache is None or not self.is_leader():
+            return
+
+        # Only games committing soon, votes are also more predictive near the deadline
+        horizon = int((time.time() + config.PONDER_HORIZON) * 1000)
+
+        for game_name in self.get_due_games(horizon):
+            game = self.get_game(game_name)
+            # Leave the engines free for the commit, it starts 'bot_limit' before the deadline
+            commit_at = game.next_update / 1000 - game.bot_limit
 
+            if game.finished or not game.is_player_turn or time.time() >= commit_at:
+                continue
+
+            candidates = [ move for move, _ in self.get_top_n(game_name, config.PONDER_CANDIDATES) ]
+
+            # Each search takes up to 'bot_limit', only those ending before the commit start
+            self.ponder_cache.ponder(
+                game_name, chess.Board(game.board), candidates,
+                chess.engine.Limit(game.bot_limit),
+                options={ "Skill Level": config.ENGINE_SKILL_LEVEL }, ttl=game.base_update,
+                deadline=commit_at
+            )
+
+    @property
+    def commit_executor (self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork, one pool per process
+        if self._commit_executor_pid != os.getpid():
+            self._commit_executor = ThreadPoolExecutor(
+                config.COMMIT_WORKERS, thread_name_prefix="commit"
+            )
+            self._commit_executor_pid = os.getpid()
+
+        return self._commit_executor
+
+    @timed("commit_loop")
     def verify_games_to_update (self):
-        for game_name, game in self.games.items():
-            seconds_remaining = ((game.next_update - int(time.time() * 1000)) / 1000)
-
-            if seconds_remaining <= game.bot_limit:
-                if game.finished:
-                    # Delete voting keys by fen (default fen included)
-                    for game_fen in game.fen_to_votes:
-                        voting_key = f"{game_name}:{game_fen}"
-                        self.redis_client.delete(voting_key)
-
-                    self.save_finished_game(game)
-                    # Reset game and counters
-                    game.reset()
-
-                    games = self.games
-                    games[game_name] = game
-                    self.redis_client.set(
-                        self.games_key,
-                        json.dumps({ k: v.__dict__ for k, v in games.items() }, default=str)
-                    )
+        """
+        Commit every due game, only due games are read. Games are independent,
+        so they are committed concurrently on 'commit_executor'.
+        """
+        if not self.is_leader():
+            return
+
+        due_games = self.get_due_games()
+        if len(due_games) == 0:
+            return
+
+        # Buffered votes must be counted before reading the winners
+        self.drain_votes()
+
+        commits = {
+            self.commit_executor.submit(self.commit_game, game_name): game_name
+            for game_name in due_games
+        }
+
+        for commit in as_completed(commits):
+            game_name = commits[commit]
+
+            try:
+                commit.result()
+                COMMITS.labels("committed").inc()
+
+            except FencingError as exc:
+                # Another process leads now, it will commit the remaining games
+                logging.warning("Stopped committing games: %s", exc)
+                COMMITS.labels("fenced").inc()
+
+                for pending in commits:
+                    pending.cancel()
+
+                return
+
+            except Exception:
+                logging.error(traceback.format_exc())
+                COMMITS.labels("failed").inc()
+                self.postpone_game(game_name, config.COMMIT_RETRY_SECONDS)
+
+    def enqueue_due_games (self):
+        """
+        Enqueue the commit of every due game for the commit workers, see 'app.worker'
+        """
+        if not self.is_leader():
+            return
+
+        for game_name in self.get_due_games():
+            ply = len(self.get_game(game_name, ( "last_moves", )).last_moves)
+
+            # Due again only if the job did not commit the game in time, the
+            # commit writes the next deadline
+            self.postpone_game(game_name, self.commit_queue.job_timeout)
+            self.commit_queue.enqueue(game_name, ply)
+
+    @timed("commit_game")
+    def commit_game (self, game_name: str):
+        """
+        Register the round moves of a game, or archive and reset it if finished
+
+        :param game_name: Game name
+        :raises FencingError: Raised if this process does not lead, or stops leading
+        """
+        # Every write of this commit is fenced with the same token
+        fencing_token = self.fencing_token
+        game = self.get_game(game_name)
+
+        if game.finished:
+            # Round keys were unlinked by each commit, the last one by the reset
+            self.save_finished_game(game)
+            # Reset game and counters
+            self.reset_game(game, fencing_token=fencing_token)
 
-                else:
-                    self.register_moves(game_name)
+        elif not game.is_player_turn:
+            # A failed commit (engine error, timeout) wrote the voted move only,
+            # voting again now would play the AI side
+            self.play_ai_move(game, fencing_token)
+
+        else:
+            self.register_moves(game_name, fencing_token)
 
     def save_finished_game (self, game: ChessGame):
         self.games_collection.insert_one(game.to_insert())
 
-    def get_old_matches (self, n: int = 3, game_name: str = "Daily"):
-        return json.loads(json.dumps(list(self.games_collection.find(
-            { "name": game_name },
-        ).limit(n).sort("ctime", pymongo.DESCENDING)), default=str))
+    def ensure_indexes (self):
+        """
+        Create finished games indexes, archive pages are read by name and newest first
+        """
+        try:
+            self.games_collection.create_index([
+                ( "name", pymongo.ASCENDING ), ( "ctime", pymongo.DESCENDING ),
+                ( "_id", pymongo.DESCENDING )
+            ], name="name_ctime_id")
+
+        except pymongo.errors.PyMongoError as exc:
+            logging.error("Could not create finished games indexes: %s", exc)
+
+    @staticmethod
+    def _encode_document (document: dict[str, Any]) -> dict[str, Any]:
+        # Only ObjectIds are not json serializable in finished games
+        return {
+            key: str(value) if isinstance(value, bson.ObjectId) else value
+            for key, value in document.items()
+        }
+
+    def get_old_matches (
+        self, n: int = 3, game_name: str = "Daily", cursor: str = None
+    ) -> dict[str, list[dict[str, Any]] | str | None]:
+        """
+        Get a page of finished games summaries, newest first
+
+        :param n: Page size, defaults to 3
+        :param game_name: Game name, defaults to "Daily"
+        :param cursor: 'next_cursor' of the previous page, defaults to None (first page)
+        :raises ValueError: Raised for invalid cursors
+        :return: Games summaries and the cursor of the next page (None if last page)
+        """
+        match = { "name": game_name }
+
+        if cursor is not None:
+            try:
+                ctime, match_id = cursor.split(":")
+                ctime, match_id = float(ctime), bson.ObjectId(match_id)
+
+            except (ValueError, bson.errors.InvalidId):
+                raise ValueError(f"Invalid cursor: '{cursor}'")
+
+            # Keyset pagination on the ( name, ctime, _id ) index
+            match["$or"] = [
+                { "ctime": { "$lt": ctime } }, { "ctime": ctime, "_id": { "$lt": match_id } }
+            ]
+
+        games = [ self._encode_document(game) for game in self.games_collection.aggregate([
+            { "$match": match },
+            { "$sort": { "ctime": pymongo.DESCENDING, "_id": pymongo.DESCENDING } },
+            { "$limit": n },
+            { "$project": {
+                "name": 1, "player_color": 1, "board": 1, "winner": 1, "ctime": 1, "mtime": 1,
+                # Packed games store their length, legacy ones a list of moves
+                "moves": { "$cond": [
+                    { "$isArray": "$last_moves" }, { "$size": "$last_moves" },
+                    { "$ifNull": [ "$ply", 0 ] }
+                ] },
+                # Set once the game is analysed, see 'app.analysis'
+                "analysis": "$analysis.summary"
+            } }
+        ]) ]
+
+        next_cursor = None
+        if len(games) == n:
+            next_cursor = f"{games[-1]['ctime']}:{games[-1]['_id']}"
+
+        return { "games": games, "next_cursor": next_cursor }
+
+    def get_old_match (self, match_id: str) -> dict[str, Any]:
+        """
+        Get a finished game with its moves and votes
+
+        :param match_id: Finished game id
+        :raises NotFoundError: Raised if the game does not exist
+        :return: Finished game
+        """
+        if not bson.ObjectId.is_valid(match_id):
+            raise NotFoundError(f"Finished game '{match_id}' not found")
+
+        game = self.games_collection.find_one({ "_id": bson.ObjectId(match_id) })
+
+        if game is None:
+            raise NotFoundError(f"Finished game '{match_id}' not found")
+
+        return self._encode_document(record.decode_document(game))
 
 class LocalGameManager (GamesManager):
     games_key: str
+    games_index_key: str
+    legacy_index_key: str
+    redis_pool: redis.ConnectionPool
     redis_client: redis.Redis
-    mongo_client: pymongo.MongoClient
-
-    def __init__ (self, games: dict[str, Any] = None):
+    mongo_pool_stats: MongoPoolStats
+
+    games_channel: str
+    deadlines_key: str
+    game_cache: GameCache | None
+    vote_script: redis.commands.core.Script
+
+    def __init__ (
+        self, games: dict[str, Any] = None, cache_games: bool = True,
+        engine_pool: EnginePool = None, redis_pool: redis.ConnectionPool = None
+    ):
+        # Legacy key with every game in a single json blob, see 'migrate_games_blob'
         self.games_key = "chess:games1"
+        # Sorted set with every game name (same score, sorted by name), each
+        # game is stored in its own hash
+        self.games_index_key = "chess:games:names"
+        # Legacy unsorted set of game names, see 'migrate_games_index'
+        self.legacy_index_key = "chess:games:index"
+        # Game names are published here when a game changes
+        self.games_channel = "chess:games:invalidate"
+        # Sorted set of game names by commit time (unix ms)
+        self.deadlines_key = "chess:games:deadlines"
+
+        # Redis pools reconnect by themselves after a fork
+        self.redis_pool = redis_pool or redis.ConnectionPool(
+            host=config.REDIS_CONN, port=config.REDIS_PORT, password=config.REDIS_PASSWORD,
+            db=config.REDIS_DB,
+            max_connections=config.REDIS_MAX_CONNECTIONS,
+            socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+            connection_class=InstrumentedConnection
+        )
+        self.redis_client = redis.StrictRedis(connection_pool=self.redis_pool)
+        self.vote_script = self.redis_client.register_script(VOTE_SCRIPT)
+        self.sweep_script = self.redis_client.register_script(SWEEP_SCRIPT)
+
+        self.game_cache = None
+        if cache_games:
+            self.game_cache = GameCache(
+                self.redis_client, self.games_channel, config.GAME_CACHE_MAX_STALENESS
+            )
 
-        self.redis_client = redis.StrictRedis(config.REDIS_CONN, password=config.REDIS_PASSWORD)
+        self.engine_pool = engine_pool or EnginePool()
 
-        self.mongo_client = pymongo.MongoClient(config.MONGO_CONN)
-        self.chess_db = self.mongo_client["chess"]
-        self.games_collection = self.chess_db["games"]
+        self.leader = LeaderElection(self.redis_client, config.LEADER_LEASE_SECONDS)
+        self.events = EventBroadcaster(self.redis_client, self.get_top_n, config.STREAM_TALLY_RATE)
 
-        # BUG return this when want to remove games :p
-        # self.redis_client.delete(self.games_key)
-        # if self.redis_client.get(self.games_key) is None:
-        #     games = games or {}
-        #     self.redis_client.set(self.games_key, json.dumps(games, default=str))
+        if config.VOTE_BUFFER_ENABLED:
+            self.vote_buffer = VoteBuffer(
+                self.redis_client, config.VOTE_BUFFER_FLUSH_MS / 1000,
+                config.VOTE_BUFFER_MAX_PENDING, self.events.channel_prefix
+            )
+
+        if config.COMMIT_MODE == "queue":
+            self.commit_queue = CommitQueue(
+                self.redis_client, config.COMMIT_JOB_TIMEOUT, config.COMMIT_JOB_MAX_ATTEMPTS
+            )
+
+        if config.PONDER_ENABLED:
+            self.ponder_cache = PonderCache(self.redis_client, self.engine_pool)
+
+        if config.ENGINE_CACHE_ENABLED:
+            self.engine_cache = EngineCache(self.redis_client, config.ENGINE_CACHE_MAX_POSITIONS)
+
+        self.mongo_pool_stats = MongoPoolStats()
+        self._mongo_client = None
+        self._mongo_pid = None
+
+    @property
+    def mongo_client (self) -> pymongo.MongoClient:
+        # Mongo clients are not fork-safe, build one per process (gunicorn --preload)
+        if self._mongo_pid != os.getpid():
+            self.mongo_pool_stats.reset()
+            self._mongo_client = pymongo.MongoClient(
+                config.MONGO_CONN,
+                maxPoolSize=config.MONGO_MAX_POOL_SIZE, minPoolSize=config.MONGO_MIN_POOL_SIZE,
+                event_listeners=[ self.mongo_pool_stats ], connect=False
+            )
+            self._mongo_pid = os.getpid()
+
+        return self._mongo_client
+
+    @property
+    def chess_db (self) -> pymongo.database.Database:
+        return self.mongo_client["chess"]
+
+    @property
+    def games_collection (self) -> pymongo.collection.Collection:
+        return self.chess_db["games"]
+
+    def pool_stats (self) -> dict[str, dict[str, int]]:
+        """
+        Get connection and engine pools usage of this worker
+
+        :return: Redis, mongo and engine pool stats
+        """
+        return {
+            "redis": redis_pool_stats(self.redis_pool),
+            "mongo": {
+                **self.mongo_pool_stats.stats(), "max": config.MONGO_MAX_POOL_SIZE
+            },
+            "engine": self.engine_pool.stats()
+        }
+
+    def ponder_stats (self) -> dict[str, int | float]:
+        """
+        Get pondering hit rate and engine seconds saved at commit time
+
+        :return: Ponder stats, empty if pondering is disabled
+        """
+        if self.ponder_cache is None:
+            return {}
+
+        return self.ponder_cache.stats()
+
+    def engine_cache_stats (self) -> dict[str, int | float]:
+        """
+        Get the engine cache size, hit rate and engine seconds saved at commit time
+
+        :return: Engine cache stats, empty if the cache is disabled
+        """
+        if self.engine_cache is None:
+            return {}
+
+        return self.engine_cache.stats()
+
+    def game_key (self, name: str) -> str:
+        return f"chess:game:{name}"
+
+    def version_key (self, name: str) -> str:
+        return f"chess:game:{name}:version"
+
+    def round_key (self, name: str) -> str:
+        return f"chess:game:{name}:round"
+
+    def legal_moves_key (self, name: str) -> str:
+        return f"chess:game:{name}:legal"
+
+    def voters_key (self, name: str) -> str:
+        return f"chess:game:{name}:voters"
+
+    def history_key (self, name: str) -> str:
+        return f"chess:game:{name}:history"
+
+    @staticmethod
+    def round_keys (voting_key: str) -> tuple[str, str, str]:
+        # Tally, voters Bloom filter and unique voters of a round
+        return ( voting_key, f"{voting_key}:filter", f"{voting_key}:voters" )
+
+    @staticmethod
+    def _voters_expire_at (game: ChessGame) -> int:
+        # Round keys are kept a while after the deadline, commits can be late
+        next_update = game.next_update or int(time.time() * 1000)
+
+        return next_update + config.VOTER_KEYS_GRACE * 1000
+
+    @staticmethod
+    def _encode_fields (game: ChessGame, fields: tuple[str, ...] = None) -> dict[str, str]:
+        fields = fields or codec.field_names(type(game))
+
+        return { field: record.encode_field(field, getattr(game, field)) for field in fields }
+
+    @staticmethod
+    def _decode_fields (name: str, raw_fields: dict[bytes | str, bytes]) -> ChessGame:
+        game = {}
+        for field, value in raw_fields.items():
+            if value is None:
+                continue
+
+            field = field.decode("utf8") if isinstance(field, bytes) else field
+            game[field] = record.decode_field(field, value)
+
+        game["name"] = name
+
+        # Hashes written before the compact record keep votes by fen
+        return ChessGame.from_dict(game)
+
+    def _write_game (
+        self, pipe: redis.client.Pipeline, game: ChessGame, fields: tuple[str, ...] = None
+    ) -> None:
+        pipe.hset(self.game_key(game.name), mapping=self._encode_fields(game, fields))
+
+        if fields is None or "ply_votes" in fields:
+            # Replaced by 'ply_votes', see app.utils.record
+            pipe.hdel(self.game_key(game.name), "fen_to_votes")
+
+        if fields is None or "board" in fields:
+            self._write_round(pipe, game)
+
+        if fields is None or "next_update" in fields:
+            pipe.zadd(self.deadlines_key, {
+                game.name: game.next_update - ( game.bot_limit * 1000 )
+            })
+
+        # Outdate cached copies in every worker
+        pipe.incr(self.version_key(game.name))
+        pipe.publish(self.games_channel, game.name)
+
+    def _write_round (self, pipe: redis.client.Pipeline, game: ChessGame) -> None:
+        # Precompute what the vote script checks, so votes need no python-chess work
+        board = chess.Board(game.board)
+        turn = "white" if board.turn == chess.WHITE else "black"
+
+        pipe.hset(self.round_key(game.name), mapping={
+            "voting_key": game.voting_key, "turn": turn, "player_color": game.player_color,
+            "expires_at": self._voters_expire_at(game)
+        })
+        pipe.delete(self.legal_moves_key(game.name))
+
+        legal_moves = [ move.uci() for move in board.legal_moves ]
+        if turn == game.player_color and len(legal_moves) > 0:
+            pipe.sadd(self.legal_moves_key(game.name), *legal_moves)
+
+    @timed("vote")
+    def vote (self, game: str, move: str, voter: str = None):
+        # Buffered votes can not be checked against the round voters
+        if self.vote_buffer is not None and not config.VOTE_ONCE_PER_ROUND:
+            return self._buffer_vote(game, move, voter)
+
+        filter_offsets = []
+        if voter is not None and config.VOTE_ONCE_PER_ROUND:
+            filter_offsets = voters.filter_offsets(
+                voter, config.VOTER_FILTER_BITS, config.VOTER_FILTER_HASHES
+            )
+
+        # Validate, deduplicate and count the vote in a single round trip
+        result = self.vote_script(
+            keys=[ self.round_key(game), self.legal_moves_key(game), self.voters_key(game) ],
+            args=[
+                move, self.events.channel(game), voter or "", config.VOTER_KEYS_GRACE * 1000,
+                *filter_offsets
+            ]
+        )
+        VOTE_RESULTS[result].inc()
+
+        if result == VOTE_NO_ROUND:
+            raise ValueError(f"Game '{game}' not found")
+
+        if result == VOTE_DUPLICATE:
+            raise DuplicateVoteError(f"Already voted in this round of game '{game}'")
+
+        if result != VOTE_ACCEPTED:
+            raise chess.InvalidMoveError(move)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _voting_moves (board: str, player_color: str) -> frozenset[str]:
+        # Computed once per position and worker
+        game_board = chess.Board(board)
+        if (game_board.turn == chess.WHITE) != (player_color == "white"):
+            return frozenset()
+
+        return frozenset(move.uci() for move in game_board.legal_moves)
+
+    def _buffer_vote (self, game: str, move: str, voter: str = None):
+        # Validate against the cached game, the vote reaches redis with the next flush
+        current_game = self.get_game(game)
+
+        if move not in self._voting_moves(current_game.board, current_game.player_color):
+            VOTE_RESULTS[VOTE_ILLEGAL].inc()
+            raise chess.InvalidMoveError(move)
+
+        self.vote_buffer.add(
+            game, current_game.voting_key, move, self._voters_expire_at(current_game)
+        )
+
+        if voter is not None:
+            self.vote_buffer.add_voter(
+                self.voters_key(game), current_game.voting_key, voter,
+                self._voters_expire_at(current_game)
+            )
+        VOTE_RESULTS[VOTE_ACCEPTED].inc()
+
+    def _invalidate (self, name: str = None) -> None:
+        # Other workers are notified by pub/sub, this one must read its own writes
+        if self.game_cache is not None:
+            self.game_cache.invalidate(name)
 
     @property
     def games (self) -> dict[str, ChessGame]:
+        names = self.get_games()
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for name in names:
+            pipe.hgetall(self.game_key(name))
+
+        return {
+            name: self._decode_fields(name, raw_game)
+            for name, raw_game in zip(names, pipe.execute()) if raw_game
+        }
+
+    def get_games (self, limit: int = None, cursor: str = None) -> list[str]:
+        # Exclusive lexicographic range after the cursor
+        start = "-" if cursor is None else f"({cursor}"
+
+        if limit is None:
+            names = self.redis_client.zrangebylex(self.games_index_key, start, "+")
+
+        else:
+            names = self.redis_client.zrangebylex(
+                self.games_index_key, start, "+", start=0, num=limit
+            )
+
+        return [ name.decode("utf8") for name in names ]
+
+    def count_games (self) -> int:
+        return self.redis_client.zcard(self.games_index_key)
+
+    def count_voting_keys (self, names: list[str] = None) -> int:
+        names = self.get_games() if names is None else names
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.hget(self.round_key(name), "voting_key")
+
+            voting_keys = [ key for key in pipe.execute() if key is not None ]
+
+        if len(voting_keys) == 0:
+            return 0
+
+        return self.redis_client.exists(*voting_keys)
+
+    def count_voters (self, name: str) -> dict[str, int]:
+        voting_key = self.redis_client.hget(self.round_key(name), "voting_key")
+        if voting_key is None:
+            raise ValueError(f"Game '{name}' not found")
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.pfcount(self.voters_key(name))
+            pipe.pfcount(voting_key.decode("utf8") + ":voters")
+            game_voters, round_voters = pipe.execute()
+
+        return { "game": game_voters, "round": round_voters }
+
+    @timed("sweep_voting_keys")
+    def sweep_voting_keys (self, batch: int = 500) -> dict[str, int]:
+        if not self.is_leader():
+            return {}
+
+        results = { "scanned": 0, "kept": 0, "expiring": 0, "reclaimed": 0 }
+        keys = []
+
+        for key in self.redis_client.scan_iter(match=VOTING_KEYS_PATTERN, count=batch):
+            keys.append(key.decode("utf8"))
+
+            if len(keys) >= batch:
+                self._sweep_keys(keys, results)
+                keys = []
+
+        self._sweep_keys(keys, results)
+
+        for result in ( "kept", "expiring", "reclaimed" ):
+            VOTING_KEYS_SWEPT.labels(result).inc(results[result])
+
+        if results["reclaimed"] > 0 or results["expiring"] > 0:
+            logging.info(
+                "Swept %s voting keys: %s reclaimed, %s given an expiry", results["scanned"],
+                results["reclaimed"], results["expiring"]
+            )
+
+        return results
+
+    def _sweep_keys (self, keys: list[str], results: dict[str, int]) -> None:
+        if len(keys) == 0:
+            return
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                # "{game}:{fen}" and its ":filter" and ":voters" keys
+                name, fen = key.split(":")[:2]
+                self.sweep_script(
+                    keys=[ self.round_key(name), key ], args=[ f"{name}:{fen}" ], client=pipe
+                )
+
+            codes = pipe.execute()
+
+        results["scanned"] += len(keys)
+        for code in codes:
+            results[( "kept", "expiring", "reclaimed" )[code]] += 1
+
+    def get_history (self, name: str, since: int = 0, limit: int = None) -> dict[str, Any]:
+        end = -1 if limit is None else since + limit - 1
+
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.llen(self.history_key(name))
+            pipe.lrange(self.history_key(name), since, end)
+            length, raw_entries = pipe.execute()
+
+        ply = len(self.get_game(name).last_moves)
+
+        # Games played before the history list existed are rebuilt once
+        if length < ply:
+            entries = self._rebuild_history(name)
+            length = len(entries)
+            raw_entries = entries[since:None if limit is None else since + limit]
+
         return {
-            name: ChessGame(**game)
-            for name, game in json.loads(self.redis_client.get(self.games_key) or "{}").items()
+            "history": [ codec.loads(raw_entry) for raw_entry in raw_entries ],
+            "ply": length
         }
 
-    def get_games (self) -> list[str]:
-        return list(self.games.keys())
+    def _rebuild_history (self, name: str) -> list[str]:
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(self.game_key(name))
+                    # Every field, legacy games only have 'fen_to_votes'
+                    _, game = self._load_game(name)
+                    if game is None:
+                        raise ValueError(f"Game '{name}' not found")
+
+                    entries = [
+                        codec.dumps(entry)
+                        for entry in record.history(game.last_moves, game.ply_votes or [])
+                    ]
+
+                    pipe.multi()
+                    pipe.delete(self.history_key(name))
+                    if len(entries) > 0:
+                        pipe.rpush(self.history_key(name), *entries)
+                    pipe.execute()
+
+                    return entries
+
+                except redis.WatchError:
+                    logging.warning("Game '%s' changed while rebuilding history, retrying", name)
 
     def add_game (
-        self, name: str, base_update: int, next_update: int = None, bot_limit: int = 60
+        self, name: str, base_update: int, next_update: int = None, bot_limit: int = 60,
+        player_color: str = "white", replace: bool = True
     ) -> None:
         if self.shorter_update_time is None or self.shorter_update_time > (base_update // 2):
             self.shorter_update_time = base_update // 2
             logging.info("Shorter update time set to %s", self.shorter_update_time)
 
-        games = self.games
         new_game = CreateChessGame(
-            name, base_update, next_update, bot_limit=bot_limit
+            name, base_update, next_update, player_color, bot_limit=bot_limit
         ).to_object()
         new_game.set_timer()
 
-        games[name] = new_game
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(self.game_key(name))
 
-        self.redis_client.set(
-            self.games_key, json.dumps({ k: v.__dict__ for k, v in games.items() }, default=str)
-        )
+                    if not replace and pipe.exists(self.game_key(name)):
+                        raise ValueError(f"Game '{name}' already exists")
+
+                    # Replace the whole hash, so stale fields from an old game do not survive
+                    pipe.multi()
+                    pipe.delete(self.game_key(name), self.history_key(name))
+                    self._write_game(pipe, new_game)
+                    pipe.zadd(self.games_index_key, { name: 0 })
+                    pipe.execute()
+                    break
+
+                except redis.WatchError:
+                    logging.warning("Game '%s' was created concurrently, retrying", name)
+
+        self._invalidate(name)
+
+    @timed("get_game")
+    def get_game (self, name: str, fields: tuple[str, ...] = None) -> ChessGame:
+        if self.game_cache is None:
+            _, game = self._load_game(name, fields)
+
+        else:
+            # Cached games have every field loaded
+            _, game = self.get_versioned_game(name)
+
+        if game is None:
+            raise ValueError(f"Game '{name}' not found")
+
+        return game
+
+    def get_due_games (self, now: int = None) -> list[str]:
+        now = now or int(time.time() * 1000)
+
+        return [
+            name.decode("utf8")
+            for name in self.redis_client.zrangebyscore(self.deadlines_key, "-inf", now)
+        ]
+
+    def next_deadline (self) -> float | None:
+        earliest = self.redis_client.zrange(self.deadlines_key, 0, 0, withscores=True)
+
+        if len(earliest) == 0:
+            return None
+
+        return earliest[0][1] / 1000
+
+    def postpone_game (self, name: str, seconds: float) -> None:
+        self.redis_client.zadd(self.deadlines_key, { name: int((time.time() + seconds) * 1000) })
 
-    def get_game (self, name: str) -> ChessGame:
-        if name not in self.games:
+    def get_versioned_game (self, name: str) -> tuple[int, ChessGame]:
+        if self.game_cache is None:
+            version, game = self._load_game(name)
+
+        else:
+            version, game = self.game_cache.get(
+                name, self.version_key(name), lambda: self._load_game(name)
+            )
+
+        if game is None:
             raise ValueError(f"Game '{name}' not found")
 
-        return self.games[name]
+        return version, game
+
+    def _load_game (
+        self, name: str, fields: tuple[str, ...] = None
+    ) -> tuple[int, ChessGame | None]:
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.get(self.version_key(name))
+
+        if fields is None:
+            pipe.hgetall(self.game_key(name))
+            version, raw_game = pipe.execute()
 
+        else:
+            pipe.hmget(self.game_key(name), fields)
+            version, values = pipe.execute()
+            raw_game = { field: value for field, value in zip(fields, values) if value is not None }
+
+        if not raw_game:
+            return int(version or 0), None
+
+        return int(version or 0), self._decode_fields(name, raw_game)
+
+    @timed("update_game")
     def update_game (
-        self, game: str, top_move: str | chess.Move | None, top_moves: list[str, int] = []
+        self, game: str, top_move: str | chess.Move | None, top_moves: list[str, int] = [],
+        fencing_token: int = None
     ) -> ChessGame:
-        current_game = self.get_game(game)
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Another worker committing the same game aborts this transaction
+                    pipe.watch(self.game_key(game))
+                    self._check_fencing_token(pipe, fencing_token)
+                    voting_key, current_game = self._apply_move(game, top_move, top_moves)
+
+                    pipe.multi()
+                    self._write_game(pipe, current_game, (
+                        "board", "last_moves", "next_update", "ply_votes",
+                        "finished", "winner", "mtime"
+                    ))
+                    # The top moves are archived in 'ply_votes', the round keys are done
+                    pipe.unlink(*self.round_keys(voting_key))
+                    # Append only, history reads are range reads of this list
+                    pipe.rpush(self.history_key(game), codec.dumps(record.history_entry(
+                        len(current_game.last_moves), current_game.last_moves[-1],
+                        current_game.board, top_moves
+                    )))
+                    pipe.publish(self.events.channel(game), self.events.encode("move", {
+                        "move": current_game.last_moves[-1], "board": current_game.board,
+                        "ply": len(current_game.last_moves), "next_update": current_game.next_update,
+                        "finished": current_game.finished, "winner": current_game.winner
+                    }))
+                    pipe.execute()
+                    self._invalidate(game)
+
+                    return current_game
+
+                except redis.WatchError:
+                    logging.warning("Game '%s' changed while updating, retrying", game)
+
+    def _check_fencing_token (self, pipe: redis.client.Pipeline, fencing_token: int = None) -> None:
+        # Watched, so a leader elected before the transaction executes aborts it
+        if fencing_token is None or self.leader is None:
+            return
+
+        pipe.watch(self.leader.fencing_key)
+        current_token = int(pipe.get(self.leader.fencing_key) or 0)
+        # Not watched, renewals would abort every commit. An expired lease with no
+        # newer leader yet is lost all the same
+        lease = pipe.get(self.leader.lease_key)
+        lease_token = int(lease.rsplit(b"|", 1)[1]) if lease is not None else None
+
+        if current_token != fencing_token:
+            pipe.reset()
+            raise FencingError(
+                f"Fencing token {fencing_token} is outdated, current token is {current_token}"
+            )
+
+        if lease_token != fencing_token:
+            pipe.reset()
+            raise FencingError(f"Leader lease of fencing token {fencing_token} was lost")
+
+    def _apply_move (
+        self, game: str, top_move: str | chess.Move | None, top_moves: list[str, int]
+    ) -> tuple[str, ChessGame]:
+        # Always read from redis, cached games are shared and must not be mutated
+        _, current_game = self._load_game(game)
+        if current_game is None:
+            raise ValueError(f"Game '{game}' not found")
+
+        voting_key = current_game.voting_key
+
         current_board = chess.Board(current_game.board)
 
         # No votes, get random move
@@ -262,24 +1258,123 @@ class LocalGameManager (GamesManager):
         if isinstance(top_move, str):
             top_move = chess.Move.from_uci(top_move)
 
-        # Update last moves and fen -> vote 
-        current_game.fen_to_votes[current_board.fen()] = top_moves
+        # Update last moves and round votes
+        ply_votes = current_game.ply_votes or []
+        current_game.ply_votes = ply_votes[:len(current_game.last_moves)] + [ top_moves ]
 
         current_board.push(top_move)
 
         current_game.next_update = int(time.time() * 1000) + (current_game.base_update * 1000)
         current_game.last_moves.append(top_move.uci())
         current_game.board = current_board.fen()
+        current_game.mtime = int(time.time() * 1000)
 
         if current_board.is_checkmate():
             current_game.finished = True
             # BUG fix winner for players playing with blacks
             current_game.winner = "ai" if current_board.turn == chess.WHITE else "humanity"
 
-        games = self.games
-        games[game] = current_game
-        self.redis_client.set(
-            self.games_key, json.dumps({ k: v.__dict__ for k, v in games.items() }, default=str)
-        )
+        return voting_key, current_game
+
+    def reset_game (self, game: ChessGame, fencing_token: int = None) -> ChessGame:
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # A vote or commit written meanwhile aborts this transaction
+                    pipe.watch(self.game_key(game.name))
+                    self._check_fencing_token(pipe, fencing_token)
+
+                    # Always read from redis, cached games are shared and must not be mutated
+                    _, current_game = self._load_game(game.name)
+                    if current_game is None:
+                        raise ValueError(f"Game '{game.name}' not found")
+
+                    voting_key = current_game.voting_key
+                    current_game.reset()
+                    current_game.mtime = int(time.time() * 1000)
+
+                    pipe.multi()
+                    self._write_game(pipe, current_game, (
+                        "board", "last_moves", "next_update", "ply_votes",
+                        "finished", "winner", "mtime"
+                    ))
+                    # A new game counts its voters from zero
+                    pipe.delete(self.voters_key(game.name), self.history_key(game.name))
+                    # Positions repeat in the next game, their tallies must not
+                    pipe.unlink(
+                        *self.round_keys(voting_key), *self.round_keys(current_game.voting_key)
+                    )
+                    pipe.publish(self.events.channel(game.name), self.events.encode("reset", {
+                        "board": current_game.board, "next_update": current_game.next_update
+                    }))
+                    pipe.execute()
+                    break
+
+                except redis.WatchError:
+                    logging.warning("Game '%s' changed while resetting, retrying", game.name)
+
+        self._invalidate(game.name)
 
         return current_game
+
+    def migrate_games_blob (self) -> int:
+        """
+        One-shot migration from the legacy single blob (every game json encoded
+        in 'games_key') to one hash per game. Games already migrated are kept.
+
+        :return: Number of migrated games
+        """
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(self.games_key)
+                    raw_games = pipe.get(self.games_key)
+
+                    if raw_games is None:
+                        return 0
+
+                    games = {
+                        name: ChessGame.from_dict(game)
+                        for name, game in json.loads(raw_games).items()
+                    }
+                    migrated = [
+                        name for name in games
+                        if pipe.zscore(self.games_index_key, name) is None
+                    ]
+
+                    pipe.multi()
+                    for name in migrated:
+                        self._write_game(pipe, games[name])
+                        pipe.zadd(self.games_index_key, { name: 0 })
+
+                    pipe.delete(self.games_key)
+                    pipe.execute()
+                    self._invalidate()
+
+                    logging.info("Migrated %s games from '%s'", len(migrated), self.games_key)
+
+                    return len(migrated)
+
+                except redis.WatchError:
+                    logging.warning("Games blob changed while migrating, retrying")
+
+    def migrate_games_index (self) -> int:
+        """
+        One-shot migration from the legacy unsorted set of game names to the
+        sorted index used to paginate games
+
+        :return: Number of migrated names
+        """
+        names = self.redis_client.smembers(self.legacy_index_key)
+
+        if len(names) == 0:
+            return 0
+
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.games_index_key, { name: 0 for name in names })
+            pipe.delete(self.legacy_index_key)
+            pipe.execute()
+
+        logging.info("Migrated %s game names from '%s'", len(names), self.legacy_index_key)
+
+        return len(names)
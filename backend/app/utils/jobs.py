@@ -0,0 +1,219 @@
+import contextlib
+import logging
+import time
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import redis
+from app.utils import codec
+
+# KEYS: job key, queue | ARGV: job, job key ttl in ms
+ENQUEUE_SCRIPT = """
+if redis.call('SET', KEYS[1], 'queued', 'NX', 'PX', ARGV[2]) then
+    redis.call('LPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: queue, processing | ARGV: visibility deadline in ms
+RESERVE_SCRIPT = """
+local job = redis.call('RPOP', KEYS[1])
+if job then
+    redis.call('ZADD', KEYS[2], ARGV[1], job)
+end
+return job
+"""
+
+# KEYS: processing, delayed, queue | ARGV: now in ms
+RECOVER_SCRIPT = """
+local moved = 0
+for _, key in ipairs({ KEYS[1], KEYS[2] }) do
+    for _, job in ipairs(redis.call('ZRANGEBYSCORE', key, '-inf', ARGV[1])) do
+        redis.call('ZREM', key, job)
+        redis.call('LPUSH', KEYS[3], job)
+        moved = moved + 1
+    end
+end
+return moved
+"""
+
+# KEYS: lock | ARGV: lock owner
+UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class CommitJob:
+    game: str
+    ply: int
+    attempts: int = 0
+
+    def encode (self) -> bytes:
+        return codec.dumps({ "game": self.game, "ply": self.ply, "attempts": self.attempts })
+
+    @classmethod
+    def decode (cls, raw_job: bytes) -> "CommitJob":
+        return cls(**codec.loads(raw_job))
+
+class CommitQueue:
+    """
+    Reliable redis queue of game commits. A job is enqueued once per ( game, ply ),
+    reserved jobs come back to the queue if not completed within 'job_timeout'
+    (crashed worker) and failed jobs are retried with exponential backoff.
+    """
+    redis_client: redis.Redis
+    job_timeout: float
+    max_attempts: int
+    retry_delay: float
+
+    def __init__ (
+        self, redis_client: redis.Redis, job_timeout: float = 300, max_attempts: int = 3,
+        retry_delay: float = 5
+    ):
+        """
+        :param redis_client: Redis client
+        :param job_timeout: Seconds a reserved job can run before being delivered again
+        :param max_attempts: Attempts before a job is moved to the failed list
+        :param retry_delay: Seconds before the first retry, doubled on each attempt
+        """
+        self.redis_client = redis_client
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self.queue_key = "chess:commits:queue"
+        self.processing_key = "chess:commits:processing"
+        self.delayed_key = "chess:commits:delayed"
+        self.failed_key = "chess:commits:failed"
+
+        self._enqueue_script = redis_client.register_script(ENQUEUE_SCRIPT)
+        self._reserve_script = redis_client.register_script(RESERVE_SCRIPT)
+        self._recover_script = redis_client.register_script(RECOVER_SCRIPT)
+        self._unlock_script = redis_client.register_script(UNLOCK_SCRIPT)
+
+    def job_key (self, game: str, ply: int) -> str:
+        return f"chess:commits:job:{game}:{ply}"
+
+    def enqueue (self, game: str, ply: int) -> bool:
+        """
+        Enqueue the commit of a game round, once per ( game, ply ) until 'job_timeout'
+
+        :param game: Game name
+        :param ply: Number of moves of the game when the commit is due
+        :return: True if the job was enqueued, False if already known
+        """
+        return bool(self._enqueue_script(
+            keys=[ self.job_key(game, ply), self.queue_key ],
+            args=[ CommitJob(game, ply).encode(), int(self.job_timeout * 1000) ]
+        ))
+
+    def reserve (self) -> tuple[bytes, CommitJob] | None:
+        """
+        Take the oldest job, it must be completed or retried within 'job_timeout'
+
+        :return: Raw job (used to complete or retry it) and job, None if the queue is empty
+        """
+        raw_job = self._reserve_script(
+            keys=[ self.queue_key, self.processing_key ],
+            args=[ int((time.time() + self.job_timeout) * 1000) ]
+        )
+
+        if raw_job is None:
+            return None
+
+        return raw_job, CommitJob.decode(raw_job)
+
+    def complete (self, raw_job: bytes, job: CommitJob) -> None:
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, raw_job)
+            pipe.set(self.job_key(job.game, job.ply), "done", px=int(self.job_timeout * 1000))
+            pipe.execute()
+
+    def retry (self, raw_job: bytes, job: CommitJob) -> bool:
+        """
+        Retry a failed job later, or move it to the failed list after 'max_attempts'
+
+        :return: True if the job will be retried
+        """
+        job = CommitJob(job.game, job.ply, job.attempts + 1)
+
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, raw_job)
+
+            if job.attempts >= self.max_attempts:
+                pipe.lpush(self.failed_key, job.encode())
+                pipe.ltrim(self.failed_key, 0, 999)
+                pipe.set(self.job_key(job.game, job.ply), "failed", px=int(self.job_timeout * 1000))
+
+            else:
+                retry_at = time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+                pipe.zadd(self.delayed_key, { job.encode(): int(retry_at * 1000) })
+
+            pipe.execute()
+
+        if job.attempts >= self.max_attempts:
+            logging.error(
+                "Commit of '%s' (ply %s) failed %s times", job.game, job.ply, job.attempts
+            )
+            return False
+
+        return True
+
+    def requeue (self, raw_job: bytes, job: CommitJob) -> None:
+        """
+        Deliver a job again after 'retry_delay', without counting an attempt
+        (it could not run yet, it did not fail)
+        """
+        retry_at = time.time() + self.retry_delay
+
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, raw_job)
+            pipe.zadd(self.delayed_key, { job.encode(): int(retry_at * 1000) })
+            pipe.execute()
+
+    def recover (self) -> int:
+        """
+        Requeue jobs of crashed workers and retries whose delay is over
+
+        :return: Number of requeued jobs
+        """
+        return self._recover_script(
+            keys=[ self.processing_key, self.delayed_key, self.queue_key ],
+            args=[ int(time.time() * 1000) ]
+        )
+
+    @contextlib.contextmanager
+    def lock (self, game: str) -> Iterator[bool]:
+        """
+        Hold the commit lock of a game, so a job delivered twice is not run twice at once
+
+        :param game: Game name
+        :return: True if the lock was acquired
+        """
+        lock_key = f"chess:commits:lock:{game}"
+        owner = uuid.uuid4().hex
+
+        is_locked = self.redis_client.set(lock_key, owner, nx=True, px=int(self.job_timeout * 1000))
+
+        try:
+            yield bool(is_locked)
+
+        finally:
+            if is_locked:
+                self._unlock_script(keys=[ lock_key ], args=[ owner ])
+
+    def stats (self) -> dict[str, int]:
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.llen(self.queue_key)
+            pipe.zcard(self.processing_key)
+            pipe.zcard(self.delayed_key)
+            pipe.llen(self.failed_key)
+            queued, processing, delayed, failed = pipe.execute()
+
+        return { "queued": queued, "processing": processing, "delayed": delayed, "failed": failed }
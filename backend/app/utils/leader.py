@@ -0,0 +1,130 @@
+import logging
+import os
+import socket
+
+import redis
+
+# KEYS: lease, fencing counter | ARGV: identity, lease in ms
+ACQUIRE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[1] .. '|' .. token, 'PX', ARGV[2])
+return token
+"""
+
+# KEYS: lease | ARGV: lease value, lease in ms
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: lease | ARGV: lease value
+RESIGN_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElection:
+    """
+    Cluster-wide leader election with a redis lease. Each new leader gets a
+    fencing token greater than any previous one, writers check it so a leader
+    that lost its lease (paused, partitioned) can not commit anymore.
+    """
+    redis_client: redis.Redis
+    lease_key: str
+    fencing_key: str
+    lease_seconds: float
+
+    token: int | None
+
+    def __init__ (self, redis_client: redis.Redis, lease_seconds: float = 30):
+        self.redis_client = redis_client
+        self.lease_key = "chess:scheduler:leader"
+        self.fencing_key = "chess:scheduler:fencing"
+        self.lease_seconds = lease_seconds
+
+        self.token = None
+        self._token_pid = None
+
+        self._acquire_script = redis_client.register_script(ACQUIRE_SCRIPT)
+        self._renew_script = redis_client.register_script(RENEW_SCRIPT)
+        self._resign_script = redis_client.register_script(RESIGN_SCRIPT)
+
+    @property
+    def identity (self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def is_leader (self) -> bool:
+        # A forked child does not inherit the parent lease
+        return self.token is not None and self._token_pid == os.getpid()
+
+    def _lease_value (self) -> str:
+        return f"{self.identity}|{self.token}"
+
+    def campaign (self) -> bool:
+        """
+        Renew the lease if this process is the leader, try to acquire it otherwise.
+        Must run more often than 'lease_seconds'.
+
+        :return: True if this process is the leader
+        """
+        lease_ms = int(self.lease_seconds * 1000)
+
+        try:
+            if self.is_leader:
+                if self._renew_script(keys=[ self.lease_key ], args=[ self._lease_value(), lease_ms ]):
+                    return True
+
+                logging.warning("Leader lease lost by '%s' (token %s)", self.identity, self.token)
+                self.token = None
+
+            token = self._acquire_script(
+                keys=[ self.lease_key, self.fencing_key ], args=[ self.identity, lease_ms ]
+            )
+
+        except redis.RedisError as exc:
+            # Can not prove the lease is still ours
+            logging.error("Leader election failed: %s", exc)
+            self.token = None
+            return False
+
+        if token:
+            self.token = int(token)
+            self._token_pid = os.getpid()
+            logging.info("'%s' is the scheduler leader (token %s)", self.identity, self.token)
+
+        return self.is_leader
+
+    def resign (self) -> None:
+        """
+        Release the lease so another process takes over without waiting it to expire
+        """
+        if self.is_leader:
+            self._resign_script(keys=[ self.lease_key ], args=[ self._lease_value() ])
+            self.token = None
+
+    def current (self) -> dict[str, str | int | None]:
+        """
+        Get the current cluster leader
+
+        :return: Leader identity, fencing token and lease milliseconds left
+        """
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.get(self.lease_key)
+            pipe.pttl(self.lease_key)
+            lease, lease_ms = pipe.execute()
+
+        if lease is None:
+            return { "identity": None, "token": None, "lease_ms": None }
+
+        identity, token = lease.decode("utf8").rsplit("|", 1)
+
+        return { "identity": identity, "token": int(token), "lease_ms": lease_ms }
@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+
+class Lifecycle:
+    """
+    Startup phases of a worker, run in order once per process. Nothing connects
+    or starts threads before 'start', so the app can be created (and imported)
+    before gunicorn forks its workers.
+
+    A failed phase is retried after 'retry_seconds', the worker is ready once
+    every phase is done.
+    """
+    retry_seconds: float
+
+    def __init__ (self, retry_seconds: float = 5):
+        """
+        :param retry_seconds: Seconds before retrying a failed phase, defaults to 5
+        """
+        self.retry_seconds = retry_seconds
+
+        self._phases: list[tuple[str, Callable[[], Any]]] = []
+        self._shutdowns: list[Callable[[], Any]] = []
+        self._durations: dict[str, float] = {}
+        self._error: str | None = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def add_phase (self, name: str, phase: Callable[[], Any]) -> None:
+        self._phases.append(( name, phase ))
+
+    def add_shutdown (self, shutdown: Callable[[], Any]) -> None:
+        self._shutdowns.append(shutdown)
+
+    @property
+    def is_ready (self) -> bool:
+        return self._ready.is_set() and self._pid == os.getpid()
+
+    def start (self, background: bool = False) -> None:
+        """
+        Run every phase, only the first call of each process does anything
+
+        :param background: Run in a thread instead of blocking, defaults to False
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            self._durations = {}
+            self._error = None
+            self._ready.clear()
+
+        if background:
+            threading.Thread(target=self._run, name="lifecycle-start", daemon=True).start()
+
+        else:
+            self._run()
+
+    def _run (self, first: int = 0) -> None:
+        for index in range(first, len(self._phases)):
+            name, phase = self._phases[index]
+            start = time.perf_counter()
+
+            try:
+                phase()
+
+            except Exception as exc:
+                self._error = f"{name}: {type(exc).__name__}: {exc}"
+                logging.exception(
+                    "Startup phase '%s' failed, retrying in %ss", name, self.retry_seconds
+                )
+
+                retry = threading.Timer(self.retry_seconds, self._run, args=( index, ))
+                retry.daemon = True
+                retry.start()
+                return
+
+            self._durations[name] = time.perf_counter() - start
+            logging.info("Startup phase '%s' done in %.3fs", name, self._durations[name])
+
+        self._error = None
+        self._ready.set()
+
+    def wait (self, timeout: float = None) -> bool:
+        """
+        Wait until every phase is done
+
+        :param timeout: Max seconds, defaults to None (no limit)
+        :return: Whether the worker is ready
+        """
+        return self._ready.wait(timeout)
+
+    def stop (self) -> None:
+        """
+        Stop what the phases started, in reverse order
+        """
+        if self._pid != os.getpid():
+            return
+
+        for shutdown in reversed(self._shutdowns):
+            try:
+                shutdown()
+
+            except Exception:
+                logging.exception("Shutdown of %s failed", shutdown)
+
+    def status (self) -> dict[str, Any]:
+        return {
+            "ready": self.is_ready,
+            "pid": os.getpid(),
+            "phases": dict(self._durations),
+            "error": self._error
+        }
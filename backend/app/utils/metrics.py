@@ -0,0 +1,190 @@
+import functools
+import os
+import time
+from collections.abc import Callable, Iterator
+
+import redis
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+    multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+# Hot path metrics only count and observe in memory (or in mmap files with
+# PROMETHEUS_MULTIPROC_DIR, one per gunicorn worker), gauges read redis and
+# the pools when '/metrics' is scraped
+REQUEST_LATENCY = Histogram(
+    "chess_http_request_duration_seconds", "Request latency by route",
+    ( "route", "method", "status" ),
+    buckets=( 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5 )
+)
+OPERATION_LATENCY = Histogram(
+    "chess_operation_duration_seconds", "Games manager and engine operations latency",
+    ( "operation", ),
+    buckets=( 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300 )
+)
+VOTES = Counter("chess_votes_total", "Votes by result", ( "result", ))
+COMMITS = Counter("chess_game_commits_total", "Game commits by result", ( "result", ))
+VOTING_KEYS_SWEPT = Counter(
+    "chess_voting_keys_swept_total", "Round keys seen by the sweeper by result", ( "result", )
+)
+REDIS_ROUND_TRIPS = Counter("chess_redis_round_trips_total", "Redis round trips, pipelines count once")
+
+
+def timed (operation: str) -> Callable:
+    """
+    Observe the latency of every call in OPERATION_LATENCY
+
+    :param operation: Operation label
+    """
+    histogram = OPERATION_LATENCY.labels(operation)
+
+    def decorator (f: Callable) -> Callable:
+        @functools.wraps(f)
+        def wrapper (*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return f(*args, **kwargs)
+
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+class InstrumentedConnection (redis.Connection):
+    """
+    Redis connection counting its round trips
+    """
+    _round_trips = REDIS_ROUND_TRIPS
+
+    def send_packed_command (self, command, check_health: bool = True):
+        self._round_trips.inc()
+
+        return super().send_packed_command(command, check_health)
+
+class GamesCollector:
+    """
+    Gauges computed at scrape time. Pools and caches are from the worker
+    answering the scrape, labeled by pid.
+    """
+    def __init__ (self, chess_games, recaptcha = None):
+        """
+        :param chess_games: Games manager
+        :param recaptcha: reCAPTCHA verifier, defaults to None
+        """
+        self.chess_games = chess_games
+        self.recaptcha = recaptcha
+
+    def collect (self) -> Iterator[Metric]:
+        chess_games = self.chess_games
+        pid = str(os.getpid())
+
+        names = chess_games.get_games()
+        yield GaugeMetricFamily("chess_games", "Registered games", value=len(names))
+
+        due_games = GaugeMetricFamily("chess_games_due", "Games waiting to be committed")
+        due_games.add_metric([], len(chess_games.get_due_games()))
+        yield due_games
+
+        yield GaugeMetricFamily(
+            "chess_voting_keys", "Vote tallies of the current rounds",
+            value=chess_games.count_voting_keys(names)
+        )
+
+        pools = GaugeMetricFamily(
+            "chess_pool_connections", "Pool usage of this worker", labels=( "pool", "state", "pid" )
+        )
+        for pool, stats in chess_games.pool_stats().items():
+            for state, value in stats.items():
+                pools.add_metric([ pool, state, pid ], value)
+        yield pools
+
+        if chess_games.game_cache is not None:
+            cache = CounterMetricFamily(
+                "chess_game_cache_reads", "Game cache reads of this worker", labels=( "result", "pid" )
+            )
+            cache_stats = chess_games.game_cache.stats()
+            cache.add_metric([ "hit", pid ], cache_stats["hits"])
+            cache.add_metric([ "miss", pid ], cache_stats["misses"])
+            yield cache
+
+        ponder_stats = chess_games.ponder_stats()
+        if ponder_stats:
+            ponder = CounterMetricFamily(
+                "chess_ponder_lookups", "Pondered replies lookups at commit time", labels=( "result", )
+            )
+            ponder.add_metric([ "hit" ], ponder_stats["hits"])
+            ponder.add_metric([ "miss" ], ponder_stats["misses"])
+            yield ponder
+
+            yield CounterMetricFamily(
+                "chess_ponder_seconds_saved", "Engine seconds saved by pondering",
+                value=ponder_stats["seconds_saved"]
+            )
+
+        engine_cache_stats = chess_games.engine_cache_stats()
+        if engine_cache_stats:
+            engine_cache = CounterMetricFamily(
+                "chess_engine_cache_lookups", "Engine cache lookups at commit time",
+                labels=( "result", )
+            )
+            engine_cache.add_metric([ "hit" ], engine_cache_stats["hits"])
+            engine_cache.add_metric([ "miss" ], engine_cache_stats["misses"])
+            yield engine_cache
+
+            yield CounterMetricFamily(
+                "chess_engine_cache_seconds_saved", "Engine seconds saved by the engine cache",
+                value=engine_cache_stats["seconds_saved"]
+            )
+            yield GaugeMetricFamily(
+                "chess_engine_cache_positions", "Positions in the engine cache",
+                value=engine_cache_stats["positions"]
+            )
+
+        if chess_games.vote_buffer is not None:
+            pending = GaugeMetricFamily(
+                "chess_vote_buffer_pending", "Buffered votes of this worker", labels=( "pid", )
+            )
+            pending.add_metric([ pid ], chess_games.vote_buffer.pending())
+            yield pending
+
+        viewers = GaugeMetricFamily(
+            "chess_stream_viewers", "Event stream viewers of this worker", labels=( "pid", )
+        )
+        viewers.add_metric([ pid ], chess_games.events.viewers())
+        yield viewers
+
+        if self.recaptcha is not None:
+            recaptcha = CounterMetricFamily(
+                "chess_recaptcha_verifications", "Token verifications of this worker",
+                labels=( "result", "pid" )
+            )
+            for result, count in self.recaptcha.stats().items():
+                recaptcha.add_metric([ result, pid ], count)
+            yield recaptcha
+
+def metrics_response (collector: GamesCollector) -> tuple[bytes, int, dict[str, str]]:
+    """
+    Prometheus exposition of every worker metrics and the scrape time gauges
+
+    :param collector: Scrape time gauges
+    :return: Flask response tuple
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Merge the metrics files of every worker (dead workers included)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    else:
+        registry = REGISTRY
+
+    scrape_registry = CollectorRegistry()
+    scrape_registry.register(collector)
+
+    return (
+        generate_latest(registry) + generate_latest(scrape_registry), 200,
+        { "Content-Type": CONTENT_TYPE_LATEST }
+    )
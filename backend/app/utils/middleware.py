@@ -1,14 +1,22 @@
+import hashlib
 import logging
+import threading
+import time
 import traceback
+from collections import OrderedDict
 from collections.abc import Callable
+from typing import Any
 
 import chess
 import flask
-from app.utils.errors import RecaptchaError
+from app.utils import codec
+from app.utils.errors import DuplicateVoteError, NotFoundError, RecaptchaError
+from app.utils.metrics import REQUEST_LATENCY
 
 
 def middleware (f: Callable) -> Callable:
     def wrapper(*args, **kwargs):
+        start = time.perf_counter()
         status_code = 200
         response = { "result": None, "status": { "message": "success", "status": "ok" } }
 
@@ -17,15 +25,27 @@ def middleware (f: Callable) -> Callable:
 
             # Return file
             if isinstance(result, flask.Response):
+                observe_request(start, result.status_code)
                 return result
 
             response["result"] = result
 
         except chess.InvalidMoveError as exc:
-            logging.error(traceback.format_exc())
+            # Expected on bad votes, keep it cheap
+            logging.debug("Invalid move: %s", exc)
             status_code = 400
             response["status"] = { "status": "error", "message": f"Error! Invalid Move: '{exc}'" }
 
+        except DuplicateVoteError as exc:
+            logging.debug("Duplicate vote: %s", exc)
+            status_code = 409
+            response["status"] = { "status": "error", "message": f"Error! {exc}" }
+
+        except NotFoundError as exc:
+            logging.debug("Not found: %s", exc)
+            status_code = 404
+            response["status"] = { "status": "error", "message": f"Error! {exc}" }
+
         except RecaptchaError as exc:
             logging.error(traceback.format_exc())
             status_code = 401
@@ -39,7 +59,80 @@ def middleware (f: Callable) -> Callable:
                 "status": "error", "message": f"{type(exc).__name__} Error: {exc}"
             }
 
-        # Return json
-        return response, status_code
+        # Return json, encoded here instead of by flask-restx
+        observe_request(start, status_code)
+        return flask.Response(codec.dumps(response), status_code, mimetype="application/json")
 
     return wrapper
+
+def observe_request (start: float, status_code: int) -> None:
+    rule = flask.request.url_rule
+    REQUEST_LATENCY.labels(
+        rule.rule if rule is not None else "unknown", flask.request.method, status_code
+    ).observe(time.perf_counter() - start)
+
+
+class ResponseCache:
+    """
+    Serialized success responses by ETag, so unchanged versions skip json encoding
+    """
+    max_entries: int
+
+    def __init__ (self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._bodies: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build (self, etag: str, build: Callable[[], Any]) -> bytes:
+        """
+        Get the serialized response of an ETag, building it once
+
+        :param etag: ETag of the response content
+        :param build: Callable returning the response result
+        :return: Json encoded response body
+        """
+        with self._lock:
+            body = self._bodies.get(etag)
+
+            if body is not None:
+                self._bodies.move_to_end(etag)
+                return body
+
+        body = codec.dumps({
+            "result": build(), "status": { "message": "success", "status": "ok" }
+        })
+
+        with self._lock:
+            self._bodies[etag] = body
+
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+        return body
+
+def conditional_response (
+    cache: ResponseCache, etag_parts: tuple[Any, ...], build: Callable[[], Any], max_age: int
+) -> flask.Response:
+    """
+    Answer 304 if the client already has this content, the cached body otherwise
+
+    :param cache: Response cache
+    :param etag_parts: Values identifying the response content (like game version)
+    :param build: Callable returning the response result, only called on cache misses
+    :param max_age: Seconds shared caches (CDN, reverse proxy) can serve the response
+    :return: Flask response
+    """
+    etag = hashlib.sha1(repr(etag_parts).encode("utf8")).hexdigest()
+    headers = { "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={max_age}" }
+
+    if flask.request.if_none_match.contains(etag):
+        response = flask.Response(status=304, headers=headers)
+
+    else:
+        response = flask.Response(
+            cache.get_or_build(etag, build), mimetype="application/json", headers=headers
+        )
+
+    response.set_etag(etag)
+
+    return response
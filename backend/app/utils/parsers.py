@@ -6,4 +6,19 @@ new_move_vote.add_argument(
 )
 new_move_vote.add_argument(
     "game", type=str, help="Chess board game name", location="form", required=True
-)
\ No newline at end of file
+)
+
+new_game = reqparse.RequestParser()
+new_game.add_argument(
+    "name", type=str, help="Chess board game name", location="form", required=True
+)
+new_game.add_argument(
+    "base_update", type=int, help="Seconds between moves", location="form", required=True
+)
+new_game.add_argument(
+    "bot_limit", type=int, help="AI search seconds", location="form", required=False
+)
+new_game.add_argument(
+    "player_color", type=str, help="Color played by the voters (white or black)",
+    location="form", required=False
+)
@@ -0,0 +1,119 @@
+import logging
+import time
+
+import chess
+import chess.engine
+import redis
+from app.utils import codec
+from app.utils.engine import EnginePool
+
+
+class PonderCache:
+    """
+    Engine replies searched ahead, while votes are open, for the positions the
+    leading vote candidates would reach. Stored in redis keyed by FEN, so the
+    worker committing the move can use replies pondered by any worker.
+    """
+    redis_client: redis.Redis
+    engine_pool: EnginePool
+    stats_key: str
+
+    def __init__ (self, redis_client: redis.Redis, engine_pool: EnginePool):
+        self.redis_client = redis_client
+        self.engine_pool = engine_pool
+        self.stats_key = "chess:ponder:stats"
+
+    def key (self, name: str) -> str:
+        return f"chess:game:{name}:ponder"
+
+    def ponder (
+        self, name: str, board: chess.Board, candidates: list[str], limit: chess.engine.Limit,
+        options: dict[str, str | int] = None, ttl: int = None, deadline: float = None
+    ) -> int:
+        """
+        Search the engine reply for each candidate move not pondered yet
+
+        :param name: Game name
+        :param board: Current game board
+        :param candidates: Candidate moves in UCI format
+        :param limit: Search limit, same as the one used at commit time
+        :param options: Engine options (like Skill Level)
+        :param ttl: Seconds to keep the replies, defaults to None (no expiry)
+        :param deadline: Unix time in seconds when the engines must be free again, checked
+            before each search, defaults to None (no deadline)
+        :return: Number of new pondered positions
+        """
+        pondered = 0
+
+        for move in candidates:
+            # The commit must not wait for a ponder search to free the engine
+            if deadline is not None and time.time() + ( limit.time or 0 ) > deadline:
+                logging.info("Stopped pondering game '%s', its commit is near", name)
+                break
+
+            candidate_board = board.copy(stack=False)
+            candidate_board.push_uci(move)
+            fen = candidate_board.fen()
+
+            if candidate_board.is_game_over() or self.redis_client.hexists(self.key(name), fen):
+                continue
+
+            start = time.perf_counter()
+            result = self.engine_pool.play(candidate_board, limit, options)
+            seconds = time.perf_counter() - start
+
+            if result.move is None:
+                continue
+
+            with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(self.key(name), fen, codec.dumps({
+                    "move": result.move.uci(), "seconds": seconds
+                }))
+                if ttl is not None:
+                    pipe.expire(self.key(name), ttl)
+
+                pipe.execute()
+
+            pondered += 1
+            logging.info("Pondered '%s' for game '%s' in %.2fs", move, name, seconds)
+
+        return pondered
+
+    def pop (self, name: str, fen: str) -> chess.Move | None:
+        """
+        Get the pondered reply for a position and drop the game pondered replies,
+        they are useless once a move is committed
+
+        :param name: Game name
+        :param fen: Position reached by the committed move
+        :return: Pondered engine move or None if this position was not pondered
+        """
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hget(self.key(name), fen)
+            pipe.delete(self.key(name))
+            raw_reply, _ = pipe.execute()
+
+        if raw_reply is None:
+            self.redis_client.hincrby(self.stats_key, "misses", 1)
+            return None
+
+        reply = codec.loads(raw_reply)
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self.stats_key, "hits", 1)
+            pipe.hincrbyfloat(self.stats_key, "seconds_saved", reply["seconds"])
+            pipe.execute()
+
+        return chess.Move.from_uci(reply["move"])
+
+    def stats (self) -> dict[str, int | float]:
+        raw_stats = self.redis_client.hgetall(self.stats_key)
+        hits = int(raw_stats.get(b"hits", 0))
+        misses = int(raw_stats.get(b"misses", 0))
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+            "seconds_saved": float(raw_stats.get(b"seconds_saved", 0.0))
+        }
@@ -0,0 +1,91 @@
+import threading
+
+import redis
+from pymongo import monitoring
+
+
+class MongoPoolStats (monitoring.ConnectionPoolListener):
+    """
+    Count mongo pool connections, pymongo has no public pool usage api
+    """
+    created: int
+    closed: int
+    checked_out: int
+
+    def __init__ (self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+
+        self._lock = threading.Lock()
+
+    def reset (self) -> None:
+        with self._lock:
+            self.created = 0
+            self.closed = 0
+            self.checked_out = 0
+
+    def stats (self) -> dict[str, int]:
+        return {
+            "open": self.created - self.closed,
+            "in_use": self.checked_out
+        }
+
+    def connection_created (self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.created += 1
+
+    def connection_closed (self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.closed += 1
+
+    def connection_checked_out (self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self._lock:
+            self.checked_out += 1
+
+    def connection_checked_in (self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def pool_created (self, event: monitoring.PoolCreatedEvent) -> None:
+        ...
+
+    def pool_ready (self, event: monitoring.PoolReadyEvent) -> None:
+        ...
+
+    def pool_cleared (self, event: monitoring.PoolClearedEvent) -> None:
+        ...
+
+    def pool_closed (self, event: monitoring.PoolClosedEvent) -> None:
+        ...
+
+    def connection_ready (self, event: monitoring.ConnectionReadyEvent) -> None:
+        ...
+
+    def connection_check_out_started (
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ) -> None:
+        ...
+
+    def connection_check_out_failed (
+        self, event: monitoring.ConnectionCheckOutFailedEvent
+    ) -> None:
+        ...
+
+
+def redis_pool_stats (pool: redis.ConnectionPool) -> dict[str, int]:
+    """
+    Get redis pool usage
+
+    :param pool: Redis connection pool
+    :return: Open and in use connections (None if unknown) and the pool limit
+    """
+    # redis-py has no public pool usage api, these depend on its version and pool class
+    created = getattr(pool, "_created_connections", None)
+    in_use = getattr(pool, "_in_use_connections", None)
+
+    return {
+        "open": created,
+        "in_use": len(in_use) if in_use is not None else None,
+        "max": pool.max_connections
+    }
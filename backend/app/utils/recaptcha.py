@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+import requests.adapters
+from app.utils.errors import RecaptchaError
+from app.utils.metrics import OPERATION_LATENCY
+
+
+class RecaptchaBackend (ABC):
+    @abstractmethod
+    def verify (self, token: str) -> bool:
+        """
+        Verify a reCAPTCHA token
+
+        :param token: Token sent by the client
+        :raises RecaptchaError: Raised if the token could not be verified
+        :return: True if the token is valid
+        """
+
+class SiteVerifyBackend (RecaptchaBackend):
+    """
+    Google siteverify api (or any server answering like it, like a local stub)
+    """
+    url: str
+    secret: str
+    timeout: tuple[float, float]
+    session: requests.Session
+
+    def __init__ (self, url: str, secret: str, timeout: float = 3, pool_size: int = 20):
+        self.url = url
+        self.secret = secret
+        # ( connect, read ) timeouts
+        self.timeout = ( timeout, timeout )
+
+        # Keep alive connections shared by every request of this worker
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=0
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def verify (self, token: str) -> bool:
+        try:
+            response = self.session.post(
+                self.url, data={ "secret": self.secret, "response": token }, timeout=self.timeout
+            )
+
+            return bool(response.json().get("success"))
+
+        except (requests.RequestException, ValueError) as exc:
+            raise RecaptchaError(f"Could not verify token ({type(exc).__name__})")
+
+class AllowAllBackend (RecaptchaBackend):
+    """
+    Accept every token, for development and load runs
+    """
+    def verify (self, token: str) -> bool:
+        return True
+
+
+class RecaptchaVerifier:
+    """
+    Verify tokens with a backend. Tokens are single-use (the backend rejects
+    duplicates), so results are not cached. With 'async_workers' tokens can
+    also be verified in background threads.
+    """
+    backend: RecaptchaBackend
+
+    def __init__ (self, backend: RecaptchaBackend, async_workers: int = 0):
+        self.backend = backend
+
+        self._executor = None
+        if async_workers > 0:
+            self._executor = ThreadPoolExecutor(async_workers, thread_name_prefix="recaptcha")
+
+        # Verification results of this worker, latencies are in OPERATION_LATENCY
+        self._results = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def is_async (self) -> bool:
+        return self._executor is not None
+
+    def verify (self, token: str) -> bool:
+        """
+        Verify a token, each call is a backend round trip
+
+        :param token: Token sent by the client
+        :raises RecaptchaError: Raised if the backend could not verify the token
+        :return: True if the token is valid
+        """
+        result = "error"
+        start = time.perf_counter()
+
+        try:
+            is_valid = self.backend.verify(token)
+            result = "valid" if is_valid else "invalid"
+
+            return is_valid
+
+        finally:
+            OPERATION_LATENCY.labels("recaptcha_verify").observe(time.perf_counter() - start)
+
+            with self._lock:
+                self._results[result] += 1
+
+    def submit (self, token: str, on_valid: Callable[[], None]) -> Future:
+        """
+        Verify a token in background and call 'on_valid' if it is valid
+
+        :param token: Token sent by the client
+        :param on_valid: Called (in the background thread) if the token is valid
+        :return: Future with the verification result
+        """
+        def verify_and_run () -> bool:
+            try:
+                if not self.verify(token):
+                    return False
+
+                on_valid()
+                return True
+
+            except Exception as exc:
+                logging.warning("Background reCAPTCHA verification failed: %s", exc)
+                return False
+
+        return self._executor.submit(verify_and_run)
+
+    def stats (self) -> dict[str, int]:
+        with self._lock:
+            return { result: self._results[result] for result in ( "valid", "invalid", "error" ) }
+
+def create_verifier (
+    backend_name: str, url: str, secret: str, timeout: float, pool_size: int, async_workers: int
+) -> RecaptchaVerifier:
+    """
+    Build a verifier from its backend name
+
+    :param backend_name: 'siteverify' (Google or a compatible stub at 'url') or 'allow'
+    :raises ValueError: Raised for unknown backends
+    """
+    if backend_name == "siteverify":
+        backend = SiteVerifyBackend(url, secret, timeout, pool_size)
+
+    elif backend_name == "allow":
+        backend = AllowAllBackend()
+
+    else:
+        raise ValueError(f"Unknown reCAPTCHA backend: '{backend_name}'")
+
+    return RecaptchaVerifier(backend, async_workers)
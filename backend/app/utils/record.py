@@ -0,0 +1,181 @@
+"""
+Compact game record. Moves are packed in 16 bits (from square, to square and
+promotion piece) and the votes of each round are stored by ply index, boards
+are rebuilt by replaying the moves only when FENs are needed.
+
+    move  = from | to << 6 | promotion << 12     (">H", 0 is the null move)
+    round = count (">B") + count * ( move, votes )     (">HI" each)
+"""
+import struct
+from typing import Any
+
+import chess
+from app.utils import codec
+
+# Prefix of packed values, legacy json values never start with it
+RECORD_VERSION = b"\x01"
+
+_MOVE = struct.Struct(">H")
+_COUNT = struct.Struct(">B")
+_VOTE = struct.Struct(">HI")
+
+
+def _move_tables () -> tuple[dict[str, int], dict[int, str]]:
+    # Parsing with chess.Move costs more than the json it replaces, every
+    # move (promotions from the 7th rank only) is looked up instead
+    moves = [
+        chess.Move(from_square, to_square) for from_square in chess.SQUARES
+        for to_square in chess.SQUARES
+    ] + [
+        chess.Move(from_square, to_square, promotion)
+        for from_rank, to_rank in ( ( 6, 7 ), ( 1, 0 ) )
+        for from_square in chess.SQUARES if chess.square_rank(from_square) == from_rank
+        for to_square in chess.SQUARES if chess.square_rank(to_square) == to_rank
+        for promotion in ( chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN )
+    ]
+    codes = {
+        move.uci(): move.from_square | move.to_square << 6 | ( move.promotion or 0 ) << 12
+        for move in moves
+    }
+    # Null move, from and to a1
+    codes["0000"] = 0
+
+    return codes, { code: move for move, code in codes.items() }
+
+_CODES, _MOVES = _move_tables()
+
+
+def encode_move (move: str) -> int:
+    return _CODES[move]
+
+def decode_move (code: int) -> str:
+    return _MOVES[code]
+
+def pack_moves (moves: list[str]) -> bytes:
+    return struct.pack(f">{len(moves)}H", *[ _CODES[move] for move in moves ])
+
+def unpack_moves (data: bytes) -> list[str]:
+    return [ _MOVES[code] for code in struct.unpack(f">{len(data) // _MOVE.size}H", data) ]
+
+def pack_votes (ply_votes: list[list[tuple[str, int]]]) -> bytes:
+    """
+    :param ply_votes: Top moves and votes of each round, by ply
+    """
+    packed = bytearray()
+
+    for votes in ply_votes:
+        packed += _COUNT.pack(len(votes))
+
+        for move, count in votes:
+            packed += _VOTE.pack(_CODES[move], count)
+
+    return bytes(packed)
+
+def unpack_votes (data: bytes) -> list[list[list[str | int]]]:
+    ply_votes = []
+    offset = 0
+
+    while offset < len(data):
+        count, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+
+        votes = []
+        for _ in range(count):
+            code, votes_count = _VOTE.unpack_from(data, offset)
+            offset += _VOTE.size
+            votes.append([ _MOVES[code], votes_count ])
+
+        ply_votes.append(votes)
+
+    return ply_votes
+
+def encode_field (field: str, value: Any) -> bytes | str:
+    if field == "last_moves":
+        return RECORD_VERSION + pack_moves(value)
+
+    if field == "ply_votes":
+        return RECORD_VERSION + pack_votes(value)
+
+    return codec.dumps(value)
+
+def decode_field (field: str, raw_value: bytes) -> Any:
+    if raw_value[:1] == RECORD_VERSION:
+        data = raw_value[1:]
+        return unpack_moves(data) if field == "last_moves" else unpack_votes(data)
+
+    return codec.loads(raw_value)
+
+def positions (moves: list[str]) -> list[str]:
+    """
+    :return: FEN of the board before each move
+    """
+    board = chess.Board()
+    fens = []
+
+    for move in moves:
+        fens.append(board.fen())
+        # Stored moves were legal, skip the legality check of push_uci
+        board.push(chess.Move.from_uci(move))
+
+    return fens
+
+def votes_by_fen (moves: list[str], ply_votes: list[list[Any]]) -> dict[str, list[Any]]:
+    """
+    Rebuild the legacy FEN -> votes mapping of a game
+    """
+    return dict(zip(positions(moves), ply_votes))
+
+def votes_by_ply (moves: list[str], fen_to_votes: dict[str, list[Any]]) -> list[list[Any]]:
+    """
+    Votes of each ply from the legacy FEN -> votes mapping, FENs of previous
+    games (not cleared on reset) are dropped
+    """
+    return [ fen_to_votes.get(fen, []) for fen in positions(moves) ]
+
+def history_entry (ply: int, move: str, fen: str, votes: list[Any]) -> dict[str, Any]:
+    """
+    Entry of the game history list, a played move with the FEN after it and the
+    votes of its round
+    """
+    return { "ply": ply, "move": move, "fen": fen, "votes": votes }
+
+def history (moves: list[str], ply_votes: list[list[Any]]) -> list[dict[str, Any]]:
+    """
+    Rebuild every history entry of a game, by replaying its moves
+    """
+    board = chess.Board()
+    entries = []
+
+    for ply, move in enumerate(moves, start=1):
+        board.push(chess.Move.from_uci(move))
+        votes = ply_votes[ply - 1] if ply <= len(ply_votes) else []
+        entries.append(history_entry(ply, move, board.fen(), votes))
+
+    return entries
+
+def upgrade_legacy (game: dict[str, Any]) -> dict[str, Any]:
+    """
+    Replace the legacy 'fen_to_votes' of a stored game by 'ply_votes'
+    """
+    fen_to_votes = game.pop("fen_to_votes", None)
+
+    if fen_to_votes is not None and "ply_votes" not in game and game.get("last_moves") is not None:
+        game["ply_votes"] = votes_by_ply(game["last_moves"], fen_to_votes)
+
+    return game
+
+def decode_document (document: dict[str, Any]) -> dict[str, Any]:
+    """
+    Finished game document (packed or legacy) as returned by the API
+    """
+    document = dict(document)
+    document.pop("ply", None)
+
+    if isinstance(document.get("last_moves"), bytes):
+        document["last_moves"] = unpack_moves(document["last_moves"])
+
+    if isinstance(document.get("ply_votes"), bytes):
+        ply_votes = unpack_votes(document.pop("ply_votes"))
+        document["fen_to_votes"] = votes_by_fen(document["last_moves"], ply_votes)
+
+    return document
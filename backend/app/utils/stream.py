@@ -0,0 +1,194 @@
+import logging
+import os
+import queue
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterator
+
+import redis
+from app.utils import codec
+
+
+class EventBroadcaster:
+    """
+    Fan out game events to every stream viewer of this worker from a single
+    redis pub/sub connection. Committed moves and resets are pushed as they
+    arrive, vote tallies are coalesced to at most 'tally_rate' per second and game.
+    """
+    redis_client: redis.Redis
+    channel_prefix: str
+    tally_rate: float
+
+    def __init__ (
+        self, redis_client: redis.Redis, get_tally: Callable[[str], list[tuple[str, int]]],
+        tally_rate: float = 2, channel_prefix: str = "chess:events:"
+    ):
+        """
+        :param redis_client: Redis client
+        :param get_tally: Callable returning the current vote tally of a game
+        :param tally_rate: Max tally events per second and game
+        :param channel_prefix: Pub/sub channel prefix, the game name is appended
+        """
+        self.redis_client = redis_client
+        self.channel_prefix = channel_prefix
+        self.tally_rate = tally_rate
+
+        self._get_tally = get_tally
+        self._viewers: dict[str, set[queue.Queue]] = {}
+        self._dirty_tallies: set[str] = set()
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+        self._listener_pid: int | None = None
+
+    def channel (self, name: str) -> str:
+        return f"{self.channel_prefix}{name}"
+
+    @staticmethod
+    def encode (event_type: str, data: dict = None) -> bytes:
+        return codec.dumps({ "type": event_type, **(data or {}) })
+
+    def subscribe (self, name: str, max_pending: int = 64) -> queue.Queue:
+        """
+        Register a viewer of a game
+
+        :param name: Game name
+        :param max_pending: Max events waiting for a slow viewer before new ones are dropped
+        :return: Queue receiving ( event type, data ) tuples
+        """
+        self._ensure_listener()
+
+        viewer = queue.Queue(max_pending)
+        with self._lock:
+            self._viewers.setdefault(name, set()).add(viewer)
+
+        return viewer
+
+    def unsubscribe (self, name: str, viewer: queue.Queue) -> None:
+        with self._lock:
+            viewers = self._viewers.get(name, set())
+            viewers.discard(viewer)
+
+            if len(viewers) == 0:
+                self._viewers.pop(name, None)
+
+    def viewers (self) -> int:
+        return sum(len(viewers) for viewers in self._viewers.values())
+
+    def stream (self, name: str, heartbeat: float = 15) -> Iterator[str]:
+        """
+        Server-Sent Events stream of a game, starting with its current tally
+
+        :param name: Game name
+        :param heartbeat: Seconds between keep-alive comments
+        """
+        viewer = self.subscribe(name)
+
+        try:
+            yield self._format("tally", { "voting": self._get_tally(name) })
+
+            while True:
+                try:
+                    event_type, data = viewer.get(timeout=heartbeat)
+                    yield self._format(event_type, data)
+
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+
+        finally:
+            self.unsubscribe(name, viewer)
+
+    @staticmethod
+    def _format (event_type: str, data: dict) -> str:
+        return f"event: {event_type}\ndata: {codec.dumps(data).decode('utf8')}\n\n"
+
+    def _push (self, name: str, event_type: str, data: dict) -> None:
+        with self._lock:
+            viewers = list(self._viewers.get(name, ()))
+
+        for viewer in viewers:
+            try:
+                viewer.put_nowait(( event_type, data ))
+
+            except queue.Full:
+                # Slow viewer, it will catch up with the next event
+                ...
+
+    def _ensure_listener (self) -> None:
+        # Threads do not survive a fork, start one listener per worker process
+        if self._listener_pid == os.getpid() and self._listener.is_alive():
+            return
+
+        with self._lock:
+            if self._listener_pid == os.getpid() and self._listener.is_alive():
+                return
+
+            if self._listener_pid != os.getpid():
+                # Viewers of the parent process, a restarted listener keeps its own
+                self._viewers = {}
+
+            self._listener = threading.Thread(
+                target=self._listen, name="game-events", daemon=True
+            )
+            self._listener_pid = os.getpid()
+            self._listener.start()
+
+    def _flush_tallies (self) -> None:
+        with self._lock:
+            dirty, self._dirty_tallies = self._dirty_tallies, set()
+            # Games without viewers are not worth a tally query
+            dirty = [ name for name in dirty if name in self._viewers ]
+
+        for name in dirty:
+            self._push(name, "tally", { "voting": self._get_tally(name) })
+
+    def _dispatch (self, message: dict) -> None:
+        name = message["channel"].decode("utf8")[len(self.channel_prefix):]
+
+        try:
+            event = codec.loads(message["data"])
+            event_type = event.pop("type")
+
+        except ( ValueError, KeyError, AttributeError, TypeError ):
+            # Not published by this app (or a newer version of it)
+            logging.warning("Skipped malformed event of game '%s': %r", name, message["data"][:100])
+            return
+
+        if event_type == "tally":
+            with self._lock:
+                self._dirty_tallies.add(name)
+
+        else:
+            self._push(name, event_type, event)
+
+    def _listen (self) -> None:
+        tally_interval = 1 / self.tally_rate
+
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+
+            try:
+                pubsub.psubscribe(f"{self.channel_prefix}*")
+                next_flush = time.monotonic() + tally_interval
+
+                while True:
+                    message = pubsub.get_message(timeout=max(0, next_flush - time.monotonic()))
+
+                    if message is not None and message["type"] == "pmessage":
+                        self._dispatch(message)
+
+                    if time.monotonic() >= next_flush:
+                        self._flush_tallies()
+                        next_flush = time.monotonic() + tally_interval
+
+            except redis.RedisError as exc:
+                logging.warning("Game events listener disconnected: %s", exc)
+                time.sleep(tally_interval)
+
+            except Exception:
+                # Viewers wait on this thread, keep listening
+                logging.error(traceback.format_exc())
+                time.sleep(tally_interval)
+
+            finally:
+                pubsub.close()
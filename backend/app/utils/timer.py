@@ -1,7 +1,14 @@
 import datetime as dt
+import heapq
+import logging
+import threading
+import time
+import traceback
+from collections.abc import Callable
 from typing import Any, TypeVar
 import pytz
 
+import redis
 from apscheduler.schedulers.background import BackgroundScheduler
 
 
@@ -52,6 +59,8 @@ class TimerManager:
     timers: dict[TIMER_TYPE, Timer]
 
     _total_timers: int
+    # ( end time, timer id ), paused and removed timers are skipped when popped
+    _deadlines: list[tuple[dt.datetime, TIMER_TYPE]]
 
     def __init__(
         self, timers: dict[TIMER_TYPE, Timer] = None, paused_timers: dict[int, Timer] = None,
@@ -63,10 +72,24 @@ class TimerManager:
 
         if scheduler is None:
             self.scheduler = BackgroundScheduler(timezone=pytz.utc)
-            self.scheduler.add_job(self.check_timers, 'interval', seconds=1)
+
+        self._deadlines = [ ( timer.end_time, timer_id ) for timer_id, timer in self.timers.items() ]
+        heapq.heapify(self._deadlines)
+        self._lock = threading.Lock()
+        self._schedule_check()
 
         self._total_timers = 0
 
+    def _schedule_check (self):
+        # Wake up only at the earliest end time instead of polling every timer
+        if len(self._deadlines) == 0:
+            return
+
+        self.scheduler.add_job(
+            self.check_timers, "date", run_date=self._deadlines[0][0].astimezone(),
+            id="check_timers", replace_existing=True
+        )
+
     def add_timer (self, duration_in_seconds: int, timer_id: int = None):
         if timer_id is None:
             timer_id = self._total_timers
@@ -79,6 +102,12 @@ class TimerManager:
         timer = Timer(duration_in_seconds, timer_id)
         self.timers[timer_id] = timer
 
+        with self._lock:
+            heapq.heappush(self._deadlines, ( timer.end_time, timer_id ))
+
+            if self._deadlines[0][1] == timer_id:
+                self._schedule_check()
+
         return timer_id, timer.end_time
 
     def get_timer (self, timer_id: int):
@@ -99,9 +128,115 @@ class TimerManager:
         return None
 
     def check_timers (self):
-        for timer in self.timers.values():
-            if timer.is_expired:
+        with self._lock:
+            now = dt.datetime.now()
+
+            while len(self._deadlines) > 0 and self._deadlines[0][0] <= now:
+                end_time, timer_id = heapq.heappop(self._deadlines)
+                timer = self.timers.get(timer_id)
+
+                # Paused or restarted with another end time
+                if timer is None or timer.end_time != end_time:
+                    continue
+
                 timer._run()
+                heapq.heappush(self._deadlines, ( timer.end_time, timer_id ))
+
+            self._schedule_check()
+
+class DeadlineScheduler:
+    """
+    Sleep until the earliest deadline and run the due work, waking up early
+    when a message is published on 'wake_channel' (deadlines changed).
+    Reading the earliest deadline of a redis sorted set is O(log n).
+    """
+    redis_client: redis.Redis
+    wake_channel: str
+    max_sleep: float
+
+    def __init__ (
+        self, redis_client: redis.Redis, wake_channel: str,
+        next_deadline: Callable[[], float | None], run_due: Callable[[], None],
+        is_active: Callable[[], bool] = lambda: True, max_sleep: float = 60
+    ):
+        """
+        :param redis_client: Redis client
+        :param wake_channel: Channel published when deadlines change
+        :param next_deadline: Callable returning the earliest deadline (unix seconds) or None
+        :param run_due: Callable running every due work
+        :param is_active: Callable returning False while this process must not run work
+        :param max_sleep: Max seconds between checks, also how fast an inactive process resumes
+        """
+        self.redis_client = redis_client
+        self.wake_channel = wake_channel
+        self.max_sleep = max_sleep
+
+        self._next_deadline = next_deadline
+        self._run_due = run_due
+        self._is_active = is_active
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def start (self) -> None:
+        self._stop.clear()
+        threading.Thread(target=self._run, name="deadline-scheduler", daemon=True).start()
+        threading.Thread(target=self._listen, name="deadline-wake", daemon=True).start()
+
+    def stop (self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake (self) -> None:
+        self._wake.set()
+
+    def _sleep (self, seconds: float) -> None:
+        self._wake.wait(max(0, min(seconds, self.max_sleep)))
+        self._wake.clear()
+
+    def _run (self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self._is_active():
+                    self._sleep(self.max_sleep)
+                    continue
+
+                deadline = self._next_deadline()
+
+                if deadline is None:
+                    self._sleep(self.max_sleep)
+
+                elif deadline <= time.time():
+                    self._run_due()
+
+                    if self._next_deadline() == deadline:
+                        # Nothing was done (leadership lost, store failing), do not spin
+                        self._sleep(self.max_sleep)
+
+                else:
+                    self._sleep(deadline - time.time())
+
+            except Exception:
+                logging.error(traceback.format_exc())
+                self._stop.wait(self.max_sleep)
+
+    def _listen (self) -> None:
+        while not self._stop.is_set():
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+
+            try:
+                pubsub.subscribe(self.wake_channel)
+
+                while not self._stop.is_set():
+                    if pubsub.get_message(timeout=self.max_sleep) is not None:
+                        self._wake.set()
+
+            except redis.RedisError as exc:
+                logging.warning("Deadline scheduler listener disconnected: %s", exc)
+                self._stop.wait(self.max_sleep)
+
+            finally:
+                pubsub.close()
 
 if __name__ == "__main__":
     timer_manager = TimerManager()
@@ -0,0 +1,36 @@
+import hashlib
+
+
+def filter_offsets (voter: str, bits: int, hashes: int) -> list[int]:
+    """
+    Bits of a voter in a round Bloom filter, by double hashing one digest
+
+    :param voter: Voter id
+    :param bits: Filter size in bits
+    :param hashes: Number of hash functions (bits set per voter)
+    :return: Bit offsets
+    """
+    digest = hashlib.blake2b(voter.encode("utf8"), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "big")
+    # Odd, so the offsets do not repeat before 'bits' hashes
+    second = int.from_bytes(digest[8:], "big") | 1
+
+    return [ ( first + index * second ) % bits for index in range(hashes) ]
+
+def voter_id (headers, remote_addr: str | None, header: str = "") -> str | None:
+    """
+    Id of the voter of a request
+
+    :param headers: Request headers
+    :param remote_addr: Client address
+    :param header: Header set by a trusted proxy, defaults to "" (use the address)
+    :return: Voter id, None if unknown
+    """
+    if header:
+        value = headers.get(header)
+
+        if value:
+            # Forwarded lists start with the client
+            return value.split(",")[0].strip()
+
+    return remote_addr
@@ -0,0 +1,170 @@
+"""
+Commit worker, runs the game commits (votes winner and AI move) enqueued by the
+web leader when COMMIT_MODE is 'queue', so engine searches do not share the
+CPU of the web workers.
+
+    COMMIT_MODE=queue python -m app.worker
+"""
+import logging
+import os
+import signal
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from app.services.game.models import ChessGame
+from app.utils import config
+from app.utils.engine import EnginePool
+from app.utils.games import GamesManager, LocalGameManager
+from app.utils.jobs import CommitJob, CommitQueue
+from prometheus_client import start_http_server
+
+
+def is_committed (game: ChessGame, ply: int) -> bool:
+    """
+    Whether the round of a commit job is done, by ( ply, side to move ): a commit
+    that failed after writing the voted move (engine error, timeout) still owes
+    the AI reply, 'commit_game' resumes with it
+
+    :param game: Game with 'board', 'last_moves', 'player_color' and 'finished'
+    :param ply: Number of moves of the game when the job was enqueued
+    """
+    if len(game.last_moves) == ply:
+        return False
+
+    return not (
+        len(game.last_moves) == ply + 1 and not game.is_player_turn and not game.finished
+    )
+
+
+class CommitWorker:
+    """
+    Run commit jobs concurrently, one engine per concurrent job. Engines are
+    processes already, threads only wait for them.
+    """
+    chess_games: GamesManager
+    commit_queue: CommitQueue
+    concurrency: int
+    poll_interval: float
+
+    def __init__ (
+        self, chess_games: GamesManager, commit_queue: CommitQueue, concurrency: int,
+        poll_interval: float = 0.5
+    ):
+        self.chess_games = chess_games
+        self.commit_queue = commit_queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._stop = threading.Event()
+
+    def stop (self, *args) -> None:
+        logging.info("Stopping commit worker, waiting for running jobs")
+        self._stop.set()
+
+    def run (self) -> None:
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="commit") as executor:
+            while not self._stop.is_set():
+                try:
+                    self.commit_queue.recover()
+
+                    while self._slots.acquire(timeout=self.poll_interval):
+                        reserved = self.commit_queue.reserve()
+
+                        if reserved is None:
+                            self._slots.release()
+                            break
+
+                        executor.submit(self._run_job, *reserved)
+
+                except redis.RedisError as exc:
+                    logging.error("Commit queue unavailable: %s", exc)
+
+                self._stop.wait(self.poll_interval)
+
+    def _run_job (self, raw_job: bytes, job: CommitJob) -> None:
+        try:
+            with self.commit_queue.lock(job.game) as is_locked:
+                if not is_locked:
+                    # Delivered twice, or the previous round is still committing. Not
+                    # a failure, run it once the lock is free
+                    self.commit_queue.requeue(raw_job, job)
+                    return
+
+                game = self.chess_games.get_game(
+                    job.game, ( "board", "last_moves", "player_color", "finished" )
+                )
+
+                if not is_committed(game, job.ply):
+                    # Buffered votes must be counted before reading the winner
+                    self.chess_games.drain_votes()
+                    self.chess_games.commit_game(job.game)
+
+                else:
+                    logging.info("Game '%s' ply %s is already committed", job.game, job.ply)
+
+            self.commit_queue.complete(raw_job, job)
+
+        except Exception:
+            logging.error(traceback.format_exc())
+            self.commit_queue.retry(raw_job, job)
+
+        finally:
+            self._slots.release()
+
+    def ponder (self, interval: float) -> None:
+        """
+        Ponder the games periodically, in one worker at a time
+        """
+        while not self._stop.wait(interval):
+            try:
+                redis_client = self.commit_queue.redis_client
+
+                is_locked = redis_client.set(
+                    "chess:ponder:lock", os.getpid(), nx=True, px=int(interval * 1000)
+                )
+                if is_locked:
+                    self.chess_games.ponder_games()
+
+            except Exception:
+                logging.error(traceback.format_exc())
+
+def main ():
+    logging.basicConfig(level=logging.INFO)
+
+    concurrency = config.COMMIT_WORKER_CONCURRENCY or max(
+        1, ( os.cpu_count() or 1 ) // config.ENGINE_THREADS
+    )
+
+    chess_games = LocalGameManager(cache_games=False, engine_pool=EnginePool(size=concurrency))
+    # Commits are serialized by the job lock, not by the web scheduler election
+    chess_games.leader = None
+
+    commit_queue = chess_games.commit_queue or CommitQueue(
+        chess_games.redis_client, config.COMMIT_JOB_TIMEOUT, config.COMMIT_JOB_MAX_ATTEMPTS
+    )
+    worker = CommitWorker(chess_games, commit_queue, concurrency)
+
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    if config.COMMIT_WORKER_METRICS_PORT:
+        start_http_server(config.COMMIT_WORKER_METRICS_PORT)
+
+    if config.PONDER_ENABLED:
+        threading.Thread(
+            target=worker.ponder, args=( config.PONDER_INTERVAL, ), name="ponder", daemon=True
+        ).start()
+
+    logging.info("Commit worker running %s jobs at a time", concurrency)
+    try:
+        worker.run()
+
+    finally:
+        # Engine threads are not daemons, they would keep the process alive
+        chess_games.engine_pool.close()
+
+if __name__ == "__main__":
+    main()
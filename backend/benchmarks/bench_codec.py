@@ -0,0 +1,105 @@
+"""
+Cost of the game codec (slotted models, orjson) against the previous path
+(dict-backed dataclasses, stdlib json with default=str).
+
+No redis or mongo needed, games are random legal games:
+
+    python -m benchmarks.bench_codec --plies 20 80 200
+"""
+import argparse
+import dataclasses as dc
+import json
+import os
+import random
+import sys
+import time
+
+import chess
+
+os.environ.setdefault("RECAPTCHA_SECRET_KEY", "benchmark")
+
+from app.services.game.models import ChessGame  # noqa: E402
+from app.utils import codec  # noqa: E402
+from benchmarks.bench_record import random_game, timed  # noqa: E402
+
+# Same fields without slots, as the models were before
+LegacyGame = dc.make_dataclass(
+    "LegacyGame", [ ( field.name, field.type, field ) for field in dc.fields(ChessGame) ]
+)
+
+
+def make_game (plies: int) -> ChessGame:
+    moves, ply_votes = random_game(plies)
+    now = int(time.time() * 1000)
+
+    return ChessGame(
+        name="Bench", base_update=3600, next_update=now, player_color="white",
+        board=chess.Board.starting_fen, last_moves=moves, ply_votes=ply_votes, finished=False,
+        bot_limit=60, ctime=now, mtime=now
+    )
+
+def bench (plies: int, repeat: int) -> dict[str, float]:
+    game = make_game(plies)
+    legacy_game = LegacyGame(**codec.to_dict(game))
+    response = { "result": { "game": game.to_response() }, "status": { "status": "ok" } }
+
+    json_fields = {
+        field: json.dumps(value, default=str) for field, value in legacy_game.__dict__.items()
+    }
+    codec_fields = {
+        field: codec.dumps(getattr(game, field)) for field in codec.field_names(ChessGame)
+    }
+
+    return {
+        "plies": len(game.last_moves),
+        "json_encode_us": timed(lambda: {
+            field: json.dumps(value, default=str) for field, value in legacy_game.__dict__.items()
+        }, repeat),
+        "codec_encode_us": timed(lambda: {
+            field: codec.dumps(getattr(game, field)) for field in codec.field_names(ChessGame)
+        }, repeat),
+        "json_decode_us": timed(lambda: LegacyGame(**{
+            field: json.loads(value) for field, value in json_fields.items()
+        }), repeat),
+        "codec_decode_us": timed(lambda: ChessGame(**{
+            field: codec.loads(value) for field, value in codec_fields.items()
+        }), repeat),
+        "json_response_us": timed(lambda: json.dumps(response, default=str).encode("utf8"), repeat),
+        "codec_response_us": timed(lambda: codec.dumps(response), repeat),
+        "dict_bytes": sys.getsizeof(legacy_game) + sys.getsizeof(legacy_game.__dict__),
+        "slots_bytes": sys.getsizeof(game)
+    }
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--plies", type=int, nargs="+", default=[ 20, 80, 200 ])
+    parser.add_argument("--repeat", type=int, default=500, help="Calls per measure")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print json lines")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    if not args.json:
+        print(
+            f"{'plies':>6} {'enc json':>9} {'enc codec':>10} {'dec json':>9} {'dec codec':>10} "
+            f"{'resp json':>10} {'resp codec':>11} {'dict B':>7} {'slots B':>8}"
+        )
+
+    for plies in args.plies:
+        result = bench(plies, args.repeat)
+
+        if args.json:
+            print(json.dumps(result), flush=True)
+
+        else:
+            print(
+                f"{result['plies']:>6} {result['json_encode_us']:>9.1f} "
+                f"{result['codec_encode_us']:>10.1f} {result['json_decode_us']:>9.1f} "
+                f"{result['codec_decode_us']:>10.1f} {result['json_response_us']:>10.1f} "
+                f"{result['codec_response_us']:>11.1f} {result['dict_bytes']:>7} "
+                f"{result['slots_bytes']:>8}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-vote and commit-loop cost by number of games.
+
+Runs against the configured redis (REDIS_CONN, REDIS_DB) and FLUSHES its
+database, use a scratch one:
+
+    REDIS_DB=15 python -m benchmarks.bench_games --games 1 10 100 1000 10000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("RECAPTCHA_SECRET_KEY", "benchmark")
+os.environ.setdefault("PONDER_ENABLED", "false")
+
+from app.utils.games import LocalGameManager  # noqa: E402
+
+OPENING_MOVES = ( "e2e4", "d2d4", "g1f3", "c2c4", "b1c3" )
+
+
+def timed (f, repeat: int) -> list[float]:
+    """
+    :return: Microseconds of each call
+    """
+    samples = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    return samples
+
+def bench (chess_games: LocalGameManager, n_games: int, votes: int) -> dict[str, float]:
+    chess_games.redis_client.flushdb()
+    # Only the leader runs the commit loop
+    chess_games.leader.campaign()
+
+    names = [ f"room-{index:05d}" for index in range(n_games) ]
+    for name in names:
+        chess_games.add_game(name, 3600, bot_limit=1)
+
+    vote_samples = timed(
+        lambda: chess_games.vote(random.choice(names), random.choice(OPENING_MOVES)), votes
+    )
+    due_samples = timed(chess_games.verify_games_to_update, 100)
+    page_samples = timed(lambda: chess_games.get_games(100, random.choice(names)), 100)
+
+    return {
+        "games": n_games,
+        "vote_us": statistics.mean(vote_samples),
+        "vote_p99_us": statistics.quantiles(vote_samples, n=100)[98],
+        "commit_loop_us": statistics.mean(due_samples),
+        "list_page_us": statistics.mean(page_samples)
+    }
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, nargs="+", default=[ 1, 10, 100, 1000, 10000 ])
+    parser.add_argument("--votes", type=int, default=2000, help="Votes per run")
+    parser.add_argument("--json", action="store_true", help="Print json lines")
+    args = parser.parse_args()
+
+    chess_games = LocalGameManager(cache_games=False)
+
+    if not args.json:
+        print(f"{'games':>8} {'vote us':>10} {'vote p99':>10} {'commit loop':>12} {'list page':>10}")
+
+    for n_games in args.games:
+        result = bench(chess_games, n_games, args.votes)
+
+        if args.json:
+            print(json.dumps(result), flush=True)
+
+        else:
+            print(
+                f"{result['games']:>8} {result['vote_us']:>10.1f} {result['vote_p99_us']:>10.1f} "
+                f"{result['commit_loop_us']:>12.1f} {result['list_page_us']:>10.1f}",
+                flush=True
+            )
+
+    chess_games.redis_client.flushdb()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Size and encode/decode cost of the compact game record against the json format.
+
+No redis or mongo needed, games are random legal games with three voted
+candidates on each human round:
+
+    python -m benchmarks.bench_record --plies 20 80 200 400
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+import chess
+
+os.environ.setdefault("RECAPTCHA_SECRET_KEY", "benchmark")
+
+from app.utils import record  # noqa: E402
+
+
+def random_game (plies: int) -> tuple[list[str], list[list[list[str | int]]]]:
+    board = chess.Board()
+    moves, ply_votes = [], []
+
+    while len(moves) < plies and not board.is_game_over():
+        legal_moves = [ move.uci() for move in board.legal_moves ]
+        move = random.choice(legal_moves)
+
+        # Humans vote on even plies, AI rounds have no votes
+        votes = []
+        if board.ply() % 2 == 0:
+            candidates = random.sample(legal_moves, min(3, len(legal_moves)))
+            votes = [ [ candidate, random.randint(1, 5000) ] for candidate in candidates ]
+
+        moves.append(move)
+        ply_votes.append(votes)
+        board.push_uci(move)
+
+    return moves, ply_votes
+
+def timed (f, repeat: int) -> float:
+    """
+    :return: Mean microseconds of a call
+    """
+    samples = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    return statistics.mean(samples)
+
+def bench (plies: int, repeat: int) -> dict[str, float]:
+    moves, ply_votes = random_game(plies)
+    fen_to_votes = record.votes_by_fen(moves, ply_votes)
+
+    json_fields = lambda: ( json.dumps(moves), json.dumps(fen_to_votes) )
+    packed_fields = lambda: (
+        record.encode_field("last_moves", moves), record.encode_field("ply_votes", ply_votes)
+    )
+    raw_json, raw_packed = json_fields(), packed_fields()
+
+    return {
+        "plies": len(moves),
+        "json_bytes": sum(len(value) for value in raw_json),
+        "packed_bytes": sum(len(value) for value in raw_packed),
+        "json_encode_us": timed(json_fields, repeat),
+        "packed_encode_us": timed(packed_fields, repeat),
+        "json_decode_us": timed(lambda: [ json.loads(value) for value in raw_json ], repeat),
+        "packed_decode_us": timed(lambda: (
+            record.decode_field("last_moves", raw_packed[0]),
+            record.decode_field("ply_votes", raw_packed[1])
+        ), repeat),
+        # FENs are only rebuilt for the api responses
+        "fen_rebuild_us": timed(lambda: record.votes_by_fen(moves, ply_votes), repeat)
+    }
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--plies", type=int, nargs="+", default=[ 20, 80, 200, 400 ])
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per measure")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print json lines")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    if not args.json:
+        print(
+            f"{'plies':>6} {'json B':>8} {'packed B':>9} {'enc json':>9} {'enc pack':>9} "
+            f"{'dec json':>9} {'dec pack':>9} {'fens':>9}"
+        )
+
+    for plies in args.plies:
+        result = bench(plies, args.repeat)
+
+        if args.json:
+            print(json.dumps(result), flush=True)
+
+        else:
+            print(
+                f"{result['plies']:>6} {result['json_bytes']:>8} {result['packed_bytes']:>9} "
+                f"{result['json_encode_us']:>9.1f} {result['packed_encode_us']:>9.1f} "
+                f"{result['json_decode_us']:>9.1f} {result['packed_decode_us']:>9.1f} "
+                f"{result['fen_rebuild_us']:>9.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
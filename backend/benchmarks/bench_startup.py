@@ -0,0 +1,98 @@
+"""
+Worker startup time: importing the app, creating it and each startup phase.
+
+The import is timed in fresh interpreters. The app runs against the local
+stand-ins (see benchmarks.stubs), with games already stored so the warm-up
+has work to do:
+
+    python -m benchmarks.bench_startup --games 1 100 1000 --engines 2
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import stubs
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds (repeat: int) -> float:
+    """
+    :return: Mean seconds to import the app package in a new interpreter
+    """
+    env = { **os.environ, "RECAPTCHA_SECRET_KEY": "" }
+    samples = [
+        float(subprocess.run(
+            [ sys.executable, "-c", IMPORT_SNIPPET ], capture_output=True, text=True, check=True,
+            env=env
+        ).stdout)
+        for _ in range(repeat)
+    ]
+
+    return statistics.mean(samples)
+
+def bench (n_games: int, engines: int) -> dict[str, float]:
+    from app import create_app
+    from app.utils.engine import EnginePool
+    from app.utils.games import LocalGameManager
+
+    with contextlib.ExitStack() as stack:
+        redis_pool = stack.enter_context(stubs.local_redis())
+
+        seed = LocalGameManager(cache_games=False, redis_pool=redis_pool)
+        for index in range(n_games):
+            seed.add_game(f"room-{index:05d}", 3600)
+
+        chess_games = LocalGameManager(
+            engine_pool=EnginePool(stubs.FAKE_ENGINE, size=engines), redis_pool=redis_pool
+        )
+        stubs.use_mongomock(chess_games)
+
+        start = time.perf_counter()
+        app = create_app(chess_games)
+        create_seconds = time.perf_counter() - start
+
+        lifecycle = app.extensions["lifecycle"]
+        lifecycle.start()
+        ready_seconds = time.perf_counter() - start
+
+        lifecycle.stop()
+
+    phases = lifecycle.status()["phases"]
+
+    return {
+        "games": n_games,
+        "create_ms": create_seconds * 1000,
+        **{ f"{phase}_ms": seconds * 1000 for phase, seconds in phases.items() },
+        "ready_ms": ready_seconds * 1000
+    }
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, nargs="+", default=[ 1, 100, 1000 ])
+    parser.add_argument("--engines", type=int, default=1, help="Engines started on warm-up")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed imports")
+    args = parser.parse_args()
+
+    # Phases are started here, not in 'create_app'
+    os.environ.update({
+        "RECAPTCHA_SECRET_KEY": "benchmark", "APP_START": "hook", "PONDER_ENABLED": "false"
+    })
+
+    print(json.dumps({ "import_ms": import_seconds(args.repeat) * 1000 }), flush=True)
+
+    for n_games in args.games:
+        print(json.dumps(bench(n_games, args.engines)), flush=True)
+
+if __name__ == "__main__":
+    main()
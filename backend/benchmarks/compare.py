@@ -0,0 +1,70 @@
+"""
+Compare two benchmarks.load results, exits with 1 on regressions.
+
+    python -m benchmarks.compare base.json new.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def compare (base: dict, new: dict, threshold: float) -> list[str]:
+    """
+    :param threshold: Allowed change in percent
+    :return: Regression messages
+    """
+    regressions = []
+
+    print(f"{'endpoint':<16} {'rps':>20} {'p50 ms':>20} {'p99 ms':>20}")
+
+    for endpoint, new_result in new["endpoints"].items():
+        base_result = base["endpoints"].get(endpoint)
+        if base_result is None:
+            continue
+
+        changes = {
+            "rps": ( base_result["throughput_rps"], new_result["throughput_rps"] ),
+            "p50": ( base_result["latency_ms"]["p50"], new_result["latency_ms"]["p50"] ),
+            "p99": ( base_result["latency_ms"]["p99"], new_result["latency_ms"]["p99"] )
+        }
+        columns = []
+
+        for metric, ( before, after ) in changes.items():
+            change = (after - before) / before * 100 if before else 0.0
+            columns.append(f"{after:>10.1f} ({change:+6.1f}%)")
+
+            # Lower throughput or higher latency
+            is_worse = -change if metric == "rps" else change
+            if is_worse > threshold:
+                regressions.append(f"{endpoint} {metric}: {before:.2f} -> {after:.2f} ({change:+.1f}%)")
+
+        print(f"{endpoint:<16} " + " ".join(f"{column:>20}" for column in columns))
+
+    for key in ( "redis_round_trips_per_request", "redis_commands_per_request" ):
+        before, after = base.get(key), new.get(key)
+
+        if before is not None and after is not None:
+            print(f"{key}: {before:.2f} -> {after:.2f}")
+
+            if after > before * (1 + threshold / 100):
+                regressions.append(f"{key}: {before:.2f} -> {after:.2f}")
+
+    return regressions
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("base", help="Baseline result file")
+    parser.add_argument("new", help="New result file")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as base_file, open(args.new) as new_file:
+        regressions = compare(json.load(base_file), json.load(new_file), args.threshold)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
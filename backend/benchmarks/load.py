@@ -0,0 +1,351 @@
+"""
+Load benchmark of the game api with concurrent voters and pollers.
+
+By default the Flask app runs in this process against local stand-ins: a
+spawned redis-server (in-memory fakeredis if not installed), a stub reCAPTCHA
+siteverify server, the fake UCI engine and mongomock. With '--target' a running
+server (like gunicorn) is driven over http instead.
+
+    python -m benchmarks.load --voters 8 --pollers 32 --duration 30 --output base.json
+    python -m benchmarks.load --target http://127.0.0.1:5002 --redis-port 6379
+    python -m benchmarks.compare base.json new.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any
+
+import chess
+import redis
+import requests
+
+from benchmarks import stubs
+
+
+class Recorder:
+    """
+    Latencies and status codes by endpoint, shared by every worker thread
+    """
+    def __init__ (self):
+        self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+        self.statuses: defaultdict[str, Counter[int]] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record (self, endpoint: str, seconds: float, status: int) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    @property
+    def requests (self) -> int:
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    def report (self, duration: float) -> dict[str, dict[str, Any]]:
+        return {
+            endpoint: {
+                "requests": len(latencies),
+                "throughput_rps": len(latencies) / duration,
+                "latency_ms": latency_summary(latencies),
+                "status": { str(code): count for code, count in self.statuses[endpoint].items() }
+            }
+            for endpoint, latencies in sorted(self.latencies.items())
+        }
+
+def latency_summary (latencies: list[float]) -> dict[str, float]:
+    milliseconds = sorted(latency * 1000 for latency in latencies)
+
+    if len(milliseconds) < 2:
+        milliseconds = milliseconds * 2 or [ 0.0, 0.0 ]
+
+    percentiles = statistics.quantiles(milliseconds, n=100, method="inclusive")
+
+    return {
+        "mean": statistics.mean(milliseconds),
+        "p50": percentiles[49],
+        "p90": percentiles[89],
+        "p99": percentiles[98],
+        "max": milliseconds[-1]
+    }
+
+class AppClient:
+    """
+    Flask test client, one per thread
+    """
+    def __init__ (self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request (
+        self, method: str, path: str, json_body: dict = None, headers: dict = None
+    ) -> tuple[int, dict[str, str], Any]:
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+
+        response = self._local.client.open(path, method=method, json=json_body, headers=headers)
+
+        return response.status_code, response.headers, response.get_json(silent=True)
+
+class HttpClient:
+    """
+    Keep alive http session to a running server, one per thread
+    """
+    def __init__ (self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request (
+        self, method: str, path: str, json_body: dict = None, headers: dict = None
+    ) -> tuple[int, dict[str, str], Any]:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+
+        response = self._local.session.request(
+            method, self.base_url + path, json=json_body, headers=headers, timeout=self.timeout
+        )
+
+        try:
+            body = response.json()
+
+        except ValueError:
+            body = None
+
+        return response.status_code, response.headers, body
+
+class GameState:
+    """
+    Last board seen by the pollers, voters vote legal moves of it
+    """
+    def __init__ (self, board: str):
+        self._lock = threading.Lock()
+        self.update(board)
+
+    def update (self, board: str) -> None:
+        moves = [ move.uci() for move in chess.Board(board).legal_moves ]
+
+        with self._lock:
+            self.board = board
+            self.moves = moves or [ "0000" ]
+
+    def random_move (self) -> str:
+        with self._lock:
+            return random.choice(self.moves)
+
+def voter (client, game: str, state: GameState, recorder: Recorder, stop_at: float, think: float):
+    while time.monotonic() < stop_at:
+        body = {
+            "game": game, "move": state.random_move(),
+            # Clients get a new token for each vote
+            "recaptchaToken": f"benchmark-{uuid.uuid4().hex}"
+        }
+
+        start = time.perf_counter()
+        status, _, _ = client.request("POST", "/game/vote", body)
+        recorder.record("vote", time.perf_counter() - start, status)
+
+        time.sleep(think)
+
+def poller (client, game: str, state: GameState, recorder: Recorder, stop_at: float, think: float):
+    etag = None
+
+    while time.monotonic() < stop_at:
+        # Browsers revalidate the game with its ETag
+        headers = { "If-None-Match": etag } if etag is not None else None
+
+        start = time.perf_counter()
+        status, response_headers, body = client.request(
+            "GET", f"/game/status/game/{game}", headers=headers
+        )
+        recorder.record("status_game", time.perf_counter() - start, status)
+
+        if status == 200:
+            etag = response_headers.get("ETag")
+            state.update(body["result"]["game"]["board"])
+
+        start = time.perf_counter()
+        status, _, _ = client.request("GET", f"/game/status/voting/{game}")
+        recorder.record("status_voting", time.perf_counter() - start, status)
+
+        time.sleep(think)
+
+def committer (chess_games, game: str, recorder: Recorder, stop_at: float, interval: float):
+    while time.monotonic() + interval < stop_at:
+        time.sleep(interval)
+
+        start = time.perf_counter()
+        chess_games.commit_game(game)
+        recorder.record("commit", time.perf_counter() - start, 200)
+
+def run_workers (client, args, state: GameState, chess_games=None) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    stop_at = time.monotonic() + args.duration
+
+    workers = [
+        threading.Thread(
+            target=voter, args=( client, args.game, state, recorder, stop_at, args.think )
+        )
+        for _ in range(args.voters)
+    ] + [
+        threading.Thread(
+            target=poller, args=( client, args.game, state, recorder, stop_at, args.think )
+        )
+        for _ in range(args.pollers)
+    ]
+
+    if chess_games is not None and args.commit_interval > 0:
+        workers.append(threading.Thread(
+            target=committer,
+            args=( chess_games, args.game, recorder, stop_at, args.commit_interval )
+        ))
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    return recorder, time.perf_counter() - start
+
+def fetch_board (client, game: str) -> str:
+    status, _, body = client.request("GET", f"/game/status/game/{game}")
+
+    if status != 200:
+        raise RuntimeError(f"Could not read game '{game}' ({status}): {body}")
+
+    return body["result"]["game"]["board"]
+
+def run_in_process (args) -> dict[str, Any]:
+    with contextlib.ExitStack() as stack:
+        redis_pool = stack.enter_context(stubs.local_redis())
+        recaptcha = stack.enter_context(stubs.RecaptchaStub(args.recaptcha_latency))
+
+        # Read by app.utils.config on import
+        os.environ.update({
+            "FLASK_ENV": "production", "RECAPTCHA_SECRET_KEY": "benchmark",
+            "RECAPTCHA_BACKEND": args.recaptcha, "RECAPTCHA_VERIFY_URL": recaptcha.url,
+            "PONDER_ENABLED": "false"
+        })
+
+        from app import create_app
+        from app.utils.engine import EnginePool
+        from app.utils.games import LocalGameManager
+
+        chess_games = LocalGameManager(
+            engine_pool=EnginePool(stubs.FAKE_ENGINE, size=1), redis_pool=redis_pool
+        )
+        stubs.use_mongomock(chess_games)
+
+        app = create_app(chess_games)
+        # Commit from the benchmark, the deadline scheduler only runs in the leader
+        chess_games.leader.campaign()
+
+        client = AppClient(app)
+        state = GameState(fetch_board(client, args.game))
+
+        # Background threads (leader lease, cache version checks) are counted too
+        round_trips = stubs.RoundTripCounter.round_trips
+        recorder, duration = run_workers(client, args, state, chess_games)
+        round_trips = stubs.RoundTripCounter.round_trips - round_trips
+
+        app.extensions["lifecycle"].stop()
+
+    requests_count = recorder.requests - len(recorder.latencies.get("commit", ()))
+
+    return {
+        "duration": duration,
+        "endpoints": recorder.report(duration),
+        "redis_round_trips_per_request": round_trips / max(requests_count, 1)
+    }
+
+def run_against_target (args) -> dict[str, Any]:
+    client = HttpClient(args.target)
+    state = GameState(fetch_board(client, args.game))
+
+    # Commands (not round trips), only if the server redis is reachable and has INFO
+    redis_client = None
+    if args.redis_port is not None:
+        redis_client = redis.Redis(host=args.redis_host, port=args.redis_port)
+
+    def total_commands () -> int | None:
+        try:
+            return redis_client.info("stats")["total_commands_processed"]
+
+        except (AttributeError, redis.RedisError):
+            return None
+
+    commands = total_commands()
+    recorder, duration = run_workers(client, args, state)
+    commands_after = total_commands()
+
+    return {
+        "duration": duration,
+        "endpoints": recorder.report(duration),
+        "redis_commands_per_request": (
+            ( commands_after - commands ) / max(recorder.requests, 1)
+            if commands is not None and commands_after is not None else None
+        )
+    }
+
+def git_revision () -> str | None:
+    try:
+        return subprocess.run(
+            [ "git", "rev-parse", "--short", "HEAD" ], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main ():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--voters", type=int, default=8, help="Concurrent voters")
+    parser.add_argument("--pollers", type=int, default=16, help="Concurrent status pollers")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds")
+    parser.add_argument("--think", type=float, default=0, help="Seconds between requests of a worker")
+    parser.add_argument("--game", default="Daily")
+    parser.add_argument(
+        "--commit-interval", type=float, default=5,
+        help="Seconds between move commits (in-process only), 0 to disable"
+    )
+    parser.add_argument(
+        "--recaptcha", choices=( "siteverify", "allow" ), default="siteverify",
+        help="'siteverify' posts every token to the local stub"
+    )
+    parser.add_argument("--recaptcha-latency", type=float, default=0, help="Stub answer seconds")
+    parser.add_argument("--target", help="Base url of a running server, in-process if missing")
+    parser.add_argument("--redis-host", default="127.0.0.1", help="Redis of the target server")
+    parser.add_argument("--redis-port", type=int, help="Redis of the target server")
+    parser.add_argument("--output", help="Json result file, printed only if missing")
+    args = parser.parse_args()
+
+    result = run_against_target(args) if args.target else run_in_process(args)
+
+    report = {
+        "benchmark": "load",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "mode": "target" if args.target else "in-process",
+        "config": vars(args),
+        **result
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Local stand-ins for the benchmarks: redis, reCAPTCHA siteverify, UCI engine and mongo
+"""
+import contextlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import redis
+
+# Answers every search with the first legal move, see tests/fixtures
+FAKE_ENGINE = [
+    sys.executable,
+    os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "fake_uci_engine.py")
+]
+
+
+def free_port () -> int:
+    with socket.socket() as sock:
+        sock.bind(( "127.0.0.1", 0 ))
+        return sock.getsockname()[1]
+
+class RoundTripCounter:
+    """
+    Redis connection mixin counting round trips, a pipeline is sent in one round trip
+    """
+    round_trips = 0
+    _lock = threading.Lock()
+
+    def send_packed_command (self, command, check_health: bool = True):
+        with RoundTripCounter._lock:
+            RoundTripCounter.round_trips += 1
+
+        return super().send_packed_command(command, check_health)
+
+class CountingConnection (RoundTripCounter, redis.Connection):
+    ...
+
+@contextlib.contextmanager
+def local_redis (max_connections: int = 50, startup_timeout: float = 10) -> Iterator[redis.ConnectionPool]:
+    """
+    Throwaway redis, a spawned 'redis-server' if installed or an in-memory fakeredis
+
+    :return: Pool counting round trips (see RoundTripCounter)
+    """
+    if shutil.which("redis-server") is None:
+        import fakeredis
+
+        class CountingFakeConnection (RoundTripCounter, fakeredis.FakeRedisConnection):
+            ...
+
+        yield redis.ConnectionPool(
+            connection_class=CountingFakeConnection, server=fakeredis.FakeServer(),
+            max_connections=max_connections
+        )
+        return
+
+    port = free_port()
+    process = subprocess.Popen(
+        [ "redis-server", "--port", str(port), "--save", "", "--appendonly", "no" ],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        pool = redis.ConnectionPool(
+            port=port, connection_class=CountingConnection, max_connections=max_connections
+        )
+        deadline = time.monotonic() + startup_timeout
+
+        while True:
+            try:
+                redis.Redis(connection_pool=pool).ping()
+                break
+
+            except redis.ConnectionError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"Could not start redis-server on port {port}")
+
+                time.sleep(0.05)
+
+        yield pool
+        pool.disconnect()
+
+    finally:
+        process.terminate()
+        process.wait()
+
+class RecaptchaStub:
+    """
+    Local siteverify server accepting every token, so verification keeps its
+    http round trip without calling google
+    """
+    def __init__ (self, latency: float = 0):
+        """
+        :param latency: Seconds added to every answer
+        """
+        class Handler (BaseHTTPRequestHandler):
+            def do_POST (handler):
+                handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+                time.sleep(latency)
+
+                body = json.dumps({ "success": True }).encode("utf8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message (handler, *args):
+                ...
+
+        self.server = ThreadingHTTPServer(( "127.0.0.1", 0 ), Handler)
+
+    @property
+    def url (self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/siteverify"
+
+    def __enter__ (self) -> "RecaptchaStub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__ (self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+def use_mongomock (chess_games) -> None:
+    """
+    Replace the mongo client of a games manager by an in-memory mongomock one
+    """
+    import mongomock
+
+    chess_games._mongo_client = mongomock.MongoClient()
+    chess_games._mongo_pid = os.getpid()
@@ -3,13 +3,41 @@ import dotenv
 # Load .env vars
 dotenv.load_dotenv(override=False)
 
+import os
+import shutil
+
+# Set before anything imports prometheus_client, every worker writes its metrics there
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/chess-metrics")
+# Startup phases run in each worker (see post_worker_init), the app can be preloaded
+os.environ.setdefault("APP_START", "hook")
+
 from app.utils import config as conf
 
 bind = conf.GUNICORN_BIND
 workers = conf.GUNICORN_WORKERS
 timeout = conf.GUNICORN_TIMEOUT
+worker_class = conf.GUNICORN_WORKER_CLASS
+worker_connections = conf.GUNICORN_WORKER_CONNECTIONS
 
 loglevel = "info"
 
 # accesslog = "/dev/null"
 # errorlog = "/dev/null"
+
+
+def on_starting (server):
+    # Drop metrics of a previous run
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+def post_worker_init (worker):
+    # Warm up before the worker accepts connections
+    worker.wsgi.extensions["lifecycle"].start()
+
+def worker_exit (server, worker):
+    worker.wsgi.extensions["lifecycle"].stop()
+
+def child_exit (server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -3,7 +3,11 @@ import sys
 
 sys.path.insert(1, os.path.join(sys.path[0], '..'))
 
+# Checked on startup, siteverify calls are mocked
+os.environ.setdefault("RECAPTCHA_SECRET_KEY", "test")
+
 pytest_plugins = [
     "fixtures.fixture_client",
-    "fixtures.fixture_redis"
+    "fixtures.fixture_redis",
+    "fixtures.fixture_engine"
 ]
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Minimal UCI engine for tests, answers every search with the first legal move
+"""
+import sys
+
+import chess
+
+
+def main ():
+    board = chess.Board()
+
+    for line in sys.stdin:
+        command, *args = line.split()
+
+        if command == "uci":
+            print("id name FakeEngine")
+            print("option name Threads type spin default 1 min 1 max 512")
+            print("option name Hash type spin default 16 min 1 max 1024")
+            print("uciok")
+
+        elif command == "isready":
+            print("readyok")
+
+        elif command == "position":
+            if args[0] == "startpos":
+                board = chess.Board()
+                args = args[1:]
+
+            else:
+                board = chess.Board(" ".join(args[1:7]))
+                args = args[7:]
+
+            for move in args[1:]:
+                board.push_uci(move)
+
+        elif command == "go":
+            move = next(iter(board.legal_moves))
+            print("info depth 1 score cp 0 pv", move.uci())
+            print("bestmove", move.uci())
+
+        elif command == "quit":
+            break
+
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
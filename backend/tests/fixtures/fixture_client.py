@@ -2,11 +2,17 @@ import pytest
 from app import create_app
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def client ():
+    # The api and routes are module globals, create the app once
     app = create_app()
     app.config["TESTING"] = True
+    # Tests commit their games themselves, the app leader must not commit due ones behind them
+    app.extensions["deadlines"].stop()
+    app.extensions["scheduler"].pause()
     client = app.test_client()
 
     with app.app_context():
         yield client
+
+    app.extensions["lifecycle"].stop()
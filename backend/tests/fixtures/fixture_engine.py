@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+from app.utils.engine import EnginePool
+
+
+@pytest.fixture
+def engine_pool ():
+    engine_path = os.path.join(os.path.dirname(__file__), "fake_uci_engine.py")
+    pool = EnginePool([ sys.executable, engine_path ], size=1)
+
+    yield pool
+
+    pool.close()
@@ -1,9 +1,33 @@
 import pytest
 import redis
+from app import SECONDS_IN_DAY
+from app.utils.games import GamesManager, LocalGameManager
+
+
+def seed_games (chess_games: GamesManager) -> None:
+    # Games created by 'create_app' are expected by the api tests
+    chess_games.add_game("Daily", SECONDS_IN_DAY)
 
 
 @pytest.fixture
-def redis_client():
+def redis_client(request):
     client = redis.StrictRedis(host='localhost', port=6379, db=0)
+
+    # Each test starts from an empty db, with the app games if it uses the app
+    client.flushdb()
+    if "client" in request.fixturenames:
+        seed_games(request.getfixturevalue("client").application.extensions["chess_games"])
+
     yield client
+
     client.flushdb()
+    # The session app outlives the flush, api tests without this fixture need its games
+    seed_games(LocalGameManager(cache_games=False))
+
+
+@pytest.fixture
+def clean_games (client):
+    yield
+    chess_games = client.application.extensions["chess_games"]
+    chess_games.redis_client.flushdb()
+    seed_games(chess_games)
@@ -0,0 +1,149 @@
+import os
+
+import pytest
+from unittest.mock import patch
+
+from app.utils import config
+
+
+@pytest.mark.usefixtures("clean_games")
+class TestCreateGame:
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_create_game (self, mock_post, client):
+        mock_post.return_value.json.return_value = { "success": True }
+
+        response = client.post("/game/create-game", json={
+            "name": "Blitz room", "base_update": 120, "bot_limit": 5,
+            "recaptchaToken": "valid_token"
+        })
+
+        assert response.status_code == 200, "Status code is not 200"
+        assert response.get_json()["result"] == "Game 'Blitz room' created", "Wrong result message"
+
+        response = client.get("/game/list-games", query_string={ "limit": 10 })
+        result = response.get_json()["result"]
+
+        assert "Blitz room" in result["games"], "Game was not listed"
+        assert result["next_cursor"] is None, "Single page has a next cursor"
+
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_create_existing_game (self, mock_post, client):
+        mock_post.return_value.json.return_value = { "success": True }
+        game = { "name": "Room", "base_update": 120, "bot_limit": 5, "recaptchaToken": "valid_token" }
+
+        assert client.post("/game/create-game", json=game).status_code == 200
+        response = client.post("/game/create-game", json=game)
+
+        assert response.status_code == 400
+        assert response.get_json()["status"] == {
+            "status": "error", "message": "ValueError Error: Game 'Room' already exists"
+        }, "Wrong status message"
+
+    @pytest.mark.parametrize("limit", [ 0, -5 ])
+    def test_list_games_limit_floor (self, client, limit):
+        response = client.get("/game/list-games", query_string={ "limit": limit })
+        result = response.get_json()["result"]
+
+        assert response.status_code == 200, "Out of range limit was not clamped"
+        assert result["games"] == [ "Daily" ] and result["next_cursor"] == "Daily"
+
+    @pytest.mark.parametrize("limit, expected", [
+        ( 0, 1 ), ( -5, 1 ), ( 10**6, config.FINISHED_GAMES_MAX_LIMIT )
+    ])
+    def test_finished_games_limit (self, client, limit, expected):
+        chess_games = client.application.extensions["chess_games"]
+
+        with patch.object(chess_games, "get_old_matches", return_value={}) as get_old_matches:
+            client.get("/game/finished-games", query_string={ "limit": limit })
+
+        assert get_old_matches.call_args.args[0] == expected, "Limit was not clamped"
+
+    @pytest.mark.parametrize("match_id", [ "0" * 24, "not-an-id" ])
+    def test_unknown_finished_game (self, client, match_id, monkeypatch):
+        mongomock = pytest.importorskip("mongomock")
+        chess_games = client.application.extensions["chess_games"]
+        monkeypatch.setattr(chess_games, "_mongo_client", mongomock.MongoClient())
+        monkeypatch.setattr(chess_games, "_mongo_pid", os.getpid())
+
+        response = client.get(f"/game/finished-games/{match_id}")
+
+        assert response.status_code == 404, "Unknown game is not a 404"
+        assert response.get_json()["status"] == {
+            "status": "error", "message": f"Error! Finished game '{match_id}' not found"
+        }
+
+    def test_create_game_invalid_name (self, client):
+        response = client.post("/game/create-game", json={
+            "name": "a/b:c", "base_update": 120, "recaptchaToken": "valid_token"
+        })
+
+        assert response.status_code == 400
+        assert "Invalid game name" in response.get_json()["status"]["message"]
+
+
+@pytest.mark.usefixtures("clean_games")
+class TestHistory:
+    def test_history_since (self, client):
+        chess_games = client.application.extensions["chess_games"]
+        chess_games.update_game("Daily", "e2e4", [ [ "e2e4", 2 ] ])
+        chess_games.update_game("Daily", "e7e5", [])
+
+        response = client.get("/game/history/Daily", query_string={ "since": 1 })
+        result = response.get_json()["result"]
+
+        assert response.status_code == 200, "Status code is not 200"
+        assert result["ply"] == 2, "Wrong game ply"
+        assert [ entry["move"] for entry in result["history"] ] == [ "e7e5" ], "Wrong delta"
+
+        response = client.get("/game/status/game/Daily", query_string={ "moves": "false" })
+        game = response.get_json()["result"]["game"]
+
+        assert game["ply"] == 2, "Wrong status ply"
+        assert "last_moves" not in game and "fen_to_votes" not in game, "Moves were sent"
+
+
+@pytest.mark.usefixtures("clean_games")
+class TestConditionalStatus:
+    @pytest.mark.parametrize("url", [ "/game/status/game/Daily", "/game/status/voting/Daily" ])
+    def test_not_modified (self, client, url):
+        response = client.get(url)
+        etag = response.headers["ETag"]
+
+        assert response.status_code == 200, "Status code is not 200"
+        assert "max-age" in response.headers["Cache-Control"], "Response is not cacheable"
+
+        response = client.get(url, headers={ "If-None-Match": etag })
+
+        assert response.status_code == 304, "Unchanged status was sent again"
+        assert response.data == b"", "Not modified response has a body"
+        assert response.headers["ETag"] == etag
+
+    @pytest.mark.parametrize("url", [ "/game/status/game/Daily", "/game/status/voting/Daily" ])
+    def test_etag_changes_after_vote (self, client, url):
+        etag = client.get(url).headers["ETag"]
+        client.application.extensions["chess_games"].vote("Daily", "e2e4")
+
+        response = client.get(url, headers={ "If-None-Match": etag })
+
+        assert response.status_code == 200, "Status after a vote was not sent"
+        assert response.headers["ETag"] != etag
+        assert response.get_json()["result"]["voting"] == [ [ "e2e4", 1 ] ]
+
+    def test_etag_changes_after_commit (self, client):
+        url = "/game/status/game/Daily"
+        etag = client.get(url).headers["ETag"]
+        client.application.extensions["chess_games"].update_game("Daily", "e2e4", [])
+
+        response = client.get(url, headers={ "If-None-Match": etag })
+
+        assert response.status_code == 200, "Status after a commit was not sent"
+        assert response.headers["ETag"] != etag
+        assert response.get_json()["result"]["game"]["last_moves"] == [ "e2e4" ]
+
+    def test_etag_depends_on_moves (self, client):
+        url = "/game/status/game/Daily"
+
+        assert (
+            client.get(url).headers["ETag"]
+            != client.get(url, query_string={ "moves": "false" }).headers["ETag"]
+        ), "Responses with and without moves share an ETag"
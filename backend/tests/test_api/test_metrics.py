@@ -0,0 +1,24 @@
+import pytest
+from unittest.mock import patch
+
+
+@pytest.mark.usefixtures("clean_games")
+class TestMetrics:
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_metrics_after_vote (self, mock_post, client):
+        mock_post.return_value.json.return_value = { "success": True }
+
+        client.post(
+            "/game/vote", json={ "game": "Daily", "move": "e2e4", "recaptchaToken": "valid_token" }
+        )
+        response = client.get("/metrics")
+        metrics = response.get_data(as_text=True)
+
+        assert response.status_code == 200, "Status code is not 200"
+        assert 'chess_votes_total{result="accepted"}' in metrics, "Vote was not counted"
+        assert (
+            'chess_http_request_duration_seconds_count{method="POST",route="/game/vote",status="200"}'
+            in metrics
+        ), "Request latency was not observed"
+        assert "chess_games 1.0" in metrics, "Games gauge is missing"
+        assert "chess_voting_keys 1.0" in metrics, "Voting keys gauge is missing"
@@ -0,0 +1,39 @@
+import pytest
+from app import check_config, prepare_storage
+from app.utils import config
+from app.utils.games import LocalGameManager
+
+
+class TestReady:
+    def test_ready_after_startup (self, client):
+        response = client.get("/ready")
+        status = response.get_json()
+
+        assert response.status_code == 200, "Worker is not ready"
+        assert status["ready"] and status["error"] is None
+        assert { "config", "storage", "games", "background" } <= set(status["phases"]), (
+            "Missing phases"
+        )
+
+@pytest.mark.usefixtures("redis_client")
+class TestStartup:
+    def test_restart_keeps_games (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        prepare_storage(chess_games)
+        chess_games.vote("Daily", "e2e4")
+        chess_games.update_game("Daily", "e2e4", [ [ "e2e4", 1 ] ])
+
+        # Another worker booting, or this one restarting
+        prepare_storage(chess_games)
+
+        assert chess_games.get_game("Daily").last_moves == [ "e2e4" ], "Daily game was reset"
+
+    def test_missing_recaptcha_secret (self, monkeypatch):
+        with pytest.raises(ValueError):
+            check_config("")
+
+        check_config("secret")
+
+        # Nothing to verify with
+        monkeypatch.setattr(config, "RECAPTCHA_BACKEND", "allow")
+        check_config("")
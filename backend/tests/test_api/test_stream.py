@@ -0,0 +1,117 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from app.utils import codec, config
+from app.utils.stream import EventBroadcaster
+
+
+def open_stream (client, game: str):
+    response = client.get(f"/game/stream/{game}", buffered=False)
+    return response, iter(response.response)
+
+def read_event (chunks) -> tuple[str, dict]:
+    chunk = next(chunks)
+    chunk = chunk.decode("utf8") if isinstance(chunk, bytes) else chunk
+    event_line, data_line = chunk.strip().split("\n")
+
+    return event_line.removeprefix("event: "), codec.loads(data_line.removeprefix("data: "))
+
+def wait_for_listener (redis_client, timeout: float = 2) -> None:
+    # Events published before the listener subscribed are lost
+    end = time.time() + timeout
+    while redis_client.execute_command("PUBSUB", "NUMPAT") == 0:
+        assert time.time() < end, "Events listener did not subscribe"
+        time.sleep(0.01)
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestStream:
+    def test_starts_with_tally (self, client):
+        chess_games = client.application.extensions["chess_games"]
+        chess_games.vote("Daily", "e2e4")
+
+        response, chunks = open_stream(client, "Daily")
+
+        assert response.status_code == 200, "Status code is not 200"
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert read_event(chunks) == ( "tally", { "voting": [ [ "e2e4", 1 ] ] } )
+        response.close()
+
+    def test_pushes_moves_and_tallies (self, client, redis_client):
+        chess_games = client.application.extensions["chess_games"]
+        response, chunks = open_stream(client, "Daily")
+        read_event(chunks)
+        wait_for_listener(redis_client)
+
+        chess_games.vote("Daily", "e2e4")
+        chess_games.vote("Daily", "e2e4")
+
+        # Tallies are coalesced, at most one event per flush interval
+        tallies = [ read_event(chunks) ]
+        while tallies[-1][1]["voting"] != [ [ "e2e4", 2 ] ]:
+            tallies.append(read_event(chunks))
+
+        assert len(tallies) <= 2, "Tally events were not coalesced"
+
+        chess_games.update_game("Daily", "e2e4", [ [ "e2e4", 2 ] ])
+        event_type, data = read_event(chunks)
+
+        assert event_type == "move"
+        assert ( data["move"], data["ply"], data["finished"] ) == ( "e2e4", 1, False )
+        response.close()
+
+    def test_malformed_event_is_skipped (self, client, redis_client):
+        chess_games = client.application.extensions["chess_games"]
+        response, chunks = open_stream(client, "Daily")
+        read_event(chunks)
+        wait_for_listener(redis_client)
+
+        for payload in ( b"not json", b'{ "move": "e2e4" }', b"[ 1 ]" ):
+            redis_client.publish(chess_games.events.channel("Daily"), payload)
+        chess_games.update_game("Daily", "e2e4", [])
+
+        assert read_event(chunks)[0] == "move", "Listener stopped on a malformed event"
+        response.close()
+
+    def test_restarted_listener_keeps_viewers (self, redis_client):
+        events = EventBroadcaster(redis_client, lambda name: [])
+        events.subscribe("Daily")
+
+        # Died on an unexpected error
+        listener = threading.Thread(target=lambda: None)
+        listener.start()
+        listener.join()
+        events._listener = listener
+        events.subscribe("Other")
+
+        assert events._listener is not listener, "Listener was not restarted"
+        assert events.viewers() == 2, "Viewers were dropped on restart"
+
+    def test_keep_alive (self, client):
+        with patch.object(config, "STREAM_HEARTBEAT", 0.01):
+            response, chunks = open_stream(client, "Daily")
+            read_event(chunks)
+
+            assert next(chunks) in ( ": keep-alive\n\n", b": keep-alive\n\n" )
+            response.close()
+
+    def test_viewer_unsubscribed_on_close (self, client):
+        events = client.application.extensions["chess_games"].events
+        viewers = events.viewers()
+        response, chunks = open_stream(client, "Daily")
+        read_event(chunks)
+
+        assert events.viewers() == viewers + 1
+        response.close()
+        assert events.viewers() == viewers, "Closed stream is still a viewer"
+
+    def test_unknown_game (self, client):
+        response = client.get("/game/stream/Unknown")
+
+        assert response.status_code == 400
+        assert response.get_json()["status"]["message"] == (
+            "ValueError Error: Game 'Unknown' not found"
+        )
@@ -2,10 +2,11 @@ import json
 import pytest
 from unittest.mock import patch
 import chess
+from app.utils import config
 
 @pytest.mark.usefixtures("redis_client")
 class TestOk:
-    @patch("app.services.game.methods.requests.post")
+    @patch("app.utils.recaptcha.requests.Session.post")
     def test_valid_vote(self, mock_post, client, redis_client):
         mock_post.return_value.json.return_value = { "success": True }
 
@@ -31,7 +32,7 @@ class TestOk:
 
 @pytest.mark.usefixtures("redis_client")
 class TestError:
-    @patch('app.services.game.methods.requests.post')
+    @patch('app.utils.recaptcha.requests.Session.post')
     def test_vote_invalid_recaptcha (self, mock_post, client):
         mock_post.return_value.json.return_value = { "success": False }
 
@@ -49,7 +50,7 @@ class TestError:
             }
         ), "Wrong reCAPTCHA status message"
 
-    @patch("app.services.game.methods.requests.post")
+    @patch("app.utils.recaptcha.requests.Session.post")
     def test_vote_with_invalid_move (self, mock_post, client):
         mock_post.return_value.json.return_value = { "success": True }
 
@@ -63,6 +64,45 @@ class TestError:
             "status": "error", "message": f"Error! Invalid Move: 'invalid'"
         }), "Wrong status message"
 
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_vote_on_ai_turn (self, mock_post, client):
+        mock_post.return_value.json.return_value = { "success": True }
+        client.application.extensions["chess_games"].update_game("Daily", "e2e4", [])
+
+        response = client.post(
+            "/game/vote", json={ "game": "Daily", "move": "e7e5", "recaptchaToken": "valid_token" }
+        )
+
+        assert response.status_code == 400
+        assert response.get_json()["status"]["message"] == "Error! Invalid Move: 'e7e5'"
+
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_vote_unknown_game (self, mock_post, client):
+        mock_post.return_value.json.return_value = { "success": True }
+
+        response = client.post(
+            "/game/vote", json={ "game": "Unknown", "move": "e2e4", "recaptchaToken": "valid_token" }
+        )
+
+        assert response.status_code == 400
+        assert response.get_json()["status"]["message"] == (
+            "ValueError Error: Game 'Unknown' not found"
+        )
+
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_duplicate_vote (self, mock_post, client):
+        mock_post.return_value.json.return_value = { "success": True }
+        vote = { "game": "Daily", "move": "e2e4", "recaptchaToken": "valid_token" }
+
+        with patch.object(config, "VOTE_ONCE_PER_ROUND", True):
+            assert client.post("/game/vote", json=vote).status_code == 200
+            response = client.post("/game/vote", json=vote)
+
+        assert response.status_code == 409
+        assert response.get_json()["status"] == {
+            "status": "error", "message": "Error! Already voted in this round of game 'Daily'"
+        }
+
     def test_vote_with_missing_parameters (self, client):
         response = client.post(
             "/game/vote", json={ "game": "Daily", "recaptchaToken": "valid_token" }
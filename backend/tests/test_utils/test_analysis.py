@@ -0,0 +1,105 @@
+import os
+import sys
+
+import pytest
+from app.utils import record
+from app.utils.analysis import (
+    BLUNDER_LOSS, MAX_LOSS, ArchiveAnalyzer, analyse_game, game_boards, move_accuracy
+)
+
+FAKE_ENGINE = [
+    sys.executable, os.path.join(os.path.dirname(__file__), "..", "fixtures", "fake_uci_engine.py")
+]
+
+
+class TestAnalyseGame:
+    def test_scores_by_side (self):
+        moves = [ "e2e4", "e7e5", "d1h5" ]
+        # White point of view: black throws a pawn, white gives a bit back
+        evaluations = [
+            { "eval": 30, "best_move": "e2e4" }, { "eval": 30, "best_move": "c7c5" },
+            { "eval": 500, "best_move": "g1f3" }, { "eval": 400, "best_move": None }
+        ]
+
+        analysis = analyse_game(moves, "black", evaluations)
+
+        assert [ ply["cpl"] for ply in analysis["plies"] ] == [ 0, 470, 100 ]
+        assert analysis["plies"][1]["best_move"] == "c7c5", "Best move of the position before"
+
+        humanity, ai = analysis["summary"]["humanity"], analysis["summary"]["ai"]
+        assert ( humanity["moves"], humanity["acpl"], humanity["blunders"] ) == ( 1, 470, 1 )
+        assert ( ai["moves"], ai["acpl"], ai["mistakes"] ) == ( 2, 50, 1 )
+        assert humanity["accuracy"] < ai["accuracy"] <= 100
+
+    def test_missed_mate_is_bounded (self):
+        evaluations = [ { "eval": 10000, "best_move": "d8h4" }, { "eval": 0, "best_move": None } ]
+
+        analysis = analyse_game([ "e2e4" ], "white", evaluations)
+
+        assert analysis["plies"][0]["cpl"] == MAX_LOSS
+        assert analysis["summary"]["humanity"]["blunders"] == 1
+        assert analysis["summary"]["ai"]["acpl"] is None, "No moves, no average"
+
+    def test_move_accuracy (self):
+        assert move_accuracy(50, 50) == pytest.approx(100, abs=0.01)
+        assert move_accuracy(50, 50 - BLUNDER_LOSS) < move_accuracy(50, 0) < 100
+        assert move_accuracy(0, 100) == pytest.approx(100, abs=0.01), "Gains are not losses"
+
+
+class TestArchiveAnalyzer:
+    @pytest.fixture
+    def chess_db (self):
+        mongomock = pytest.importorskip("mongomock")
+        chess_db = mongomock.MongoClient()["chess"]
+
+        moves = [ "f2f3", "e7e5", "g2g4", "d8h4" ]
+        chess_db["games"].insert_many([
+            { "name": "Daily", "player_color": "white", "last_moves": moves },
+            # Packed games are analysed too
+            {
+                "name": "Daily", "player_color": "black",
+                "last_moves": record.pack_moves(moves[:2]), "ply": 2
+            },
+            { "name": "Daily", "player_color": "white", "last_moves": [ "e2e5" ] }
+        ])
+
+        return chess_db
+
+    def test_analyses_pending_games_once (self, chess_db):
+        analyzer = ArchiveAnalyzer(chess_db, FAKE_ENGINE, { "Threads": 1 }, depth=1)
+
+        first = analyzer.run(batch=2)
+
+        # Shared opening positions are searched once
+        assert first == { "games": 2, "failed": 1, "searched": 5, "cached": 0 }
+        assert analyzer.pending() == 0
+
+        games = list(chess_db["games"].find().sort("_id", 1))
+        assert len(games[0]["analysis"]["plies"]) == 4
+        assert games[0]["analysis"]["plies"][-1]["eval"] == -10000, "Mate not scored"
+        assert games[1]["analysis"]["summary"]["humanity"]["moves"] == 1
+        assert "error" in games[2]["analysis"], "Illegal game not marked"
+
+        progress = chess_db["analysis_progress"].find_one({ "_id": "archive" })
+        assert ( progress["games"], progress["failed"], progress["searched"] ) == ( 2, 1, 5 )
+
+        # Nothing pending, and a deeper run reuses nothing but the games
+        assert analyzer.run() == { "games": 0, "failed": 0, "searched": 0, "cached": 0 }
+        deeper = ArchiveAnalyzer(chess_db, FAKE_ENGINE, depth=2).run(max_games=1)
+        assert ( deeper["games"], deeper["cached"] ) == ( 1, 0 )
+
+    def test_resumes_from_position_cache (self, chess_db):
+        chess_db["games"].delete_many({ "player_color": "white" })
+        analyzer = ArchiveAnalyzer(chess_db, FAKE_ENGINE, depth=1)
+        analyzer.run()
+
+        # Analysis lost after the positions were stored
+        chess_db["games"].update_many({}, { "$unset": { "analysis": "" } })
+
+        assert analyzer.run() == { "games": 1, "failed": 0, "searched": 0, "cached": 3 }
+
+    def test_game_boards (self):
+        boards = game_boards([ "e2e4", "e7e5" ])
+
+        assert len(boards) == 3
+        assert boards[-1].fullmove_number == 2
@@ -0,0 +1,101 @@
+import os
+
+import bson
+import chess
+import pytest
+from app.services.game.models import ChessGame
+from app.utils.errors import NotFoundError
+from app.utils.games import LocalGameManager
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def finished_game (name: str, ctime: int, moves: list[str]) -> ChessGame:
+    return ChessGame(
+        name=name, base_update=60, player_color="white", board=chess.Board().fen(),
+        last_moves=moves, ply_votes=[ [ [ move, 2 ] ] for move in moves ], finished=True,
+        winner="humanity", bot_limit=60, ctime=ctime, mtime=ctime
+    )
+
+
+class TestArchive:
+    @pytest.fixture
+    def chess_games (self, monkeypatch):
+        chess_games = LocalGameManager(cache_games=False)
+        monkeypatch.setattr(chess_games, "_mongo_client", mongomock.MongoClient())
+        monkeypatch.setattr(chess_games, "_mongo_pid", os.getpid())
+
+        return chess_games
+
+    def test_pages_across_equal_ctimes (self, chess_games):
+        # Archived in the same ms, only the id orders them
+        for ctime in ( 1000, 2000, 2000, 2000, 3000 ):
+            chess_games.save_finished_game(finished_game("Daily", ctime, [ "e2e4" ]))
+        chess_games.save_finished_game(finished_game("Blitz", 2000, [ "e2e4" ]))
+
+        pages, cursor = [], None
+        while True:
+            page = chess_games.get_old_matches(2, "Daily", cursor)
+            pages.append(page["games"])
+            cursor = page["next_cursor"]
+
+            if cursor is None:
+                break
+
+        games = [ game for page in pages for game in page ]
+        expected = sorted(
+            chess_games.games_collection.find({ "name": "Daily" }),
+            key=lambda game: ( game["ctime"], game["_id"] ), reverse=True
+        )
+
+        assert [ len(page) for page in pages ] == [ 2, 2, 1 ]
+        assert [ game["_id"] for game in games ] == [ str(game["_id"]) for game in expected ], (
+            "Games repeated or skipped between pages"
+        )
+
+    @pytest.mark.parametrize("cursor", [ "garbage", "2000", "2000:not-an-id", "x:" + "0" * 24 ])
+    def test_invalid_cursor (self, chess_games, cursor):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            chess_games.get_old_matches(2, "Daily", cursor)
+
+    def test_summaries_leave_payloads_out (self, chess_games):
+        chess_games.save_finished_game(finished_game("Daily", 1000, [ "e2e4", "e7e5" ]))
+
+        summary = chess_games.get_old_matches(3, "Daily")["games"][0]
+
+        assert summary["moves"] == 2, "Wrong number of moves"
+        assert summary["winner"] == "humanity"
+        assert not { "last_moves", "ply_votes", "fen_to_votes", "ply" } & summary.keys(), (
+            "Moves or votes were sent in the summary"
+        )
+
+    def test_legacy_summary_counts_moves (self, chess_games):
+        chess_games.games_collection.insert_one({
+            "name": "Daily", "ctime": 1000, "last_moves": [ "e2e4", "e7e5", "g1f3" ]
+        })
+
+        assert chess_games.get_old_matches(3, "Daily")["games"][0]["moves"] == 3
+
+    def test_get_old_match_decodes_record (self, chess_games):
+        chess_games.save_finished_game(finished_game("Daily", 1000, [ "e2e4", "e7e5" ]))
+        match_id = chess_games.get_old_matches(1, "Daily")["games"][0]["_id"]
+
+        game = chess_games.get_old_match(match_id)
+
+        assert game["_id"] == match_id
+        assert game["last_moves"] == [ "e2e4", "e7e5" ], "Moves were not unpacked"
+        assert game["fen_to_votes"][chess.Board().fen()] == [ [ "e2e4", 2 ] ], (
+            "Votes were not unpacked by position"
+        )
+        assert "ply_votes" not in game and "ply" not in game
+
+    @pytest.mark.parametrize("match_id", [ str(bson.ObjectId()), "not-an-id" ])
+    def test_unknown_match (self, chess_games, match_id):
+        with pytest.raises(NotFoundError):
+            chess_games.get_old_match(match_id)
+
+    def test_ensure_indexes (self, chess_games):
+        chess_games.ensure_indexes()
+
+        index = chess_games.games_collection.index_information()["name_ctime_id"]
+        assert index["key"] == [ ( "name", 1 ), ( "ctime", -1 ), ( "_id", -1 ) ]
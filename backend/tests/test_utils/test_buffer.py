@@ -0,0 +1,145 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+import redis
+from app.utils import codec
+from app.utils.buffer import VoteBuffer
+
+
+def wait_for (condition, timeout: float = 2) -> bool:
+    end = time.time() + timeout
+    while not condition():
+        if time.time() > end:
+            return False
+
+        time.sleep(0.01)
+
+    return True
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestVoteBuffer:
+    def test_votes_are_buffered (self, redis_client):
+        vote_buffer = VoteBuffer(redis_client, flush_interval=60)
+        vote_buffer.add("Buffered", "voting", "e2e4")
+        vote_buffer.add("Buffered", "voting", "e2e4")
+        vote_buffer.add("Buffered", "voting", "d2d4")
+
+        assert vote_buffer.pending() == 3
+        assert redis_client.zscore("voting", "e2e4") is None, "Vote written before a flush"
+
+        assert vote_buffer.flush() == 3
+        assert vote_buffer.pending() == 0
+        assert redis_client.zrange("voting", 0, -1, withscores=True) == [
+            ( b"d2d4", 1.0 ), ( b"e2e4", 2.0 )
+        ]
+        vote_buffer.close()
+
+    def test_flush_on_threshold (self, redis_client):
+        vote_buffer = VoteBuffer(redis_client, flush_interval=60, max_pending=2)
+        vote_buffer.add("Buffered", "voting", "e2e4")
+
+        assert redis_client.zscore("voting", "e2e4") is None
+
+        vote_buffer.add("Buffered", "voting", "e2e4")
+
+        assert vote_buffer.pending() == 0
+        assert redis_client.zscore("voting", "e2e4") == 2, "Full buffer was not flushed"
+        vote_buffer.close()
+
+    def test_flush_on_interval (self, redis_client):
+        vote_buffer = VoteBuffer(redis_client, flush_interval=0.05)
+        vote_buffer.add("Buffered", "voting", "e2e4")
+
+        assert wait_for(lambda: redis_client.zscore("voting", "e2e4") == 1), (
+            "Buffer was not flushed after its interval"
+        )
+        vote_buffer.close()
+
+    def test_voters_expiry_and_events (self, redis_client):
+        expire_at = int(time.time() * 1000) + 60000
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe("chess:events:Buffered")
+        pubsub.get_message(timeout=1)
+
+        vote_buffer = VoteBuffer(redis_client, flush_interval=60)
+        vote_buffer.add("Buffered", "voting", "e2e4", expire_at)
+        vote_buffer.add_voter("voters", "voting", "voter", expire_at)
+        vote_buffer.flush()
+
+        assert 0 < redis_client.pttl("voting") <= 60000, "Round tally expiry not set"
+        assert 0 < redis_client.pttl("voting:voters") <= 60000, "Round voters expiry not set"
+        assert redis_client.pfcount("voters") == 1
+        assert codec.loads(pubsub.get_message(timeout=1)["data"]) == { "type": "tally" }
+
+        pubsub.close()
+        vote_buffer.close()
+
+    def test_failed_flush_keeps_votes (self, redis_client):
+        vote_buffer = VoteBuffer(redis_client, flush_interval=60)
+        vote_buffer.add("Buffered", "voting", "e2e4")
+        vote_buffer.redis_client = Mock(
+            get=Mock(return_value=None),
+            pipeline=Mock(side_effect=redis.ConnectionError("Connection refused"))
+        )
+
+        assert vote_buffer.flush() == 0
+        assert vote_buffer.pending() == 1, "Votes of a failed flush were dropped"
+
+        vote_buffer.redis_client = redis_client
+
+        assert vote_buffer.flush() == 1
+        assert redis_client.zscore("voting", "e2e4") == 1
+        vote_buffer.close()
+
+    def test_close_drains (self, redis_client):
+        vote_buffer = VoteBuffer(redis_client, flush_interval=60)
+        vote_buffer.add("Buffered", "voting", "e2e4")
+        flusher = vote_buffer._flusher
+
+        vote_buffer.close()
+
+        assert redis_client.zscore("voting", "e2e4") == 1, "Pending votes lost on shutdown"
+        assert wait_for(lambda: not flusher.is_alive()), "Flusher still running"
+
+    def test_drain_waits_for_other_buffers (self, redis_client):
+        # Two web workers with buffered votes, the commit runs in a third process
+        workers = [ VoteBuffer(redis_client, flush_interval=0.2) for _ in range(2) ]
+        for worker in workers:
+            worker.add("Buffered", "voting", "e2e4")
+        committer = VoteBuffer(redis_client, flush_interval=60)
+
+        assert committer.drain(2), "Drain timed out"
+        assert redis_client.zscore("voting", "e2e4") == 2, "Drain returned before the flushes"
+
+        for worker in workers:
+            worker.close()
+
+    def test_drain_times_out (self, redis_client):
+        committer = VoteBuffer(redis_client, flush_interval=0.01)
+        # Live buffer stuck before its flush
+        redis_client.sadd(committer.buffers_key, "stuck")
+        redis_client.set(committer.marker_key("stuck"), 0, px=60000)
+
+        start = time.monotonic()
+        assert not committer.drain(0.1), "Drain did not time out"
+        assert time.monotonic() - start < 1
+
+    def test_drain_forgets_dead_buffers (self, redis_client):
+        committer = VoteBuffer(redis_client, flush_interval=60)
+        # Crashed worker, its marker expired
+        redis_client.sadd(committer.buffers_key, "crashed")
+
+        assert committer.drain(1), "Drain waited for a dead buffer"
+        assert not redis_client.sismember(committer.buffers_key, "crashed")
+
+    def test_close_unregisters (self, redis_client):
+        vote_buffer = VoteBuffer(redis_client, flush_interval=60)
+        vote_buffer.add("Buffered", "voting", "e2e4")
+
+        assert redis_client.scard(vote_buffer.buffers_key) == 1, "Buffer was not registered"
+        vote_buffer.close()
+
+        assert redis_client.scard(vote_buffer.buffers_key) == 0, "Closed buffer is waited for"
+        assert VoteBuffer(redis_client).drain(0), "Drain waited for a closed buffer"
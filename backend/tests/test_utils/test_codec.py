@@ -0,0 +1,28 @@
+import bson
+import chess
+from app.services.game.models import ChessGame
+from app.services.game.structs import CreateChessGame
+from app.utils import codec
+
+
+class TestCodec:
+    def test_dumps_string_fallback (self):
+        object_id = bson.ObjectId()
+
+        assert codec.loads(codec.dumps({ "_id": object_id, 1: None })) == {
+            "_id": str(object_id), "1": None
+        }, "Wrong encoded values"
+
+    def test_slotted_models (self):
+        game = CreateChessGame("Codec", 60, 0).to_object()
+
+        assert not hasattr(game, "__dict__"), "Game model is not slotted"
+        assert codec.to_dict(game, exclude=( "_id", ))["board"] == chess.Board.starting_fen
+        assert ChessGame(**codec.to_dict(game)) == game, "Wrong game from its fields"
+
+    def test_to_insert_keeps_game (self):
+        game = CreateChessGame("Codec", 60, 0).to_object()
+        game._id = bson.ObjectId()
+
+        assert "_id" not in game.to_insert(), "Inserted document has an id"
+        assert game._id is not None, "Game was mutated"
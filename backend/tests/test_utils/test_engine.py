@@ -0,0 +1,33 @@
+import chess
+import chess.engine
+
+
+class TestEnginePool:
+    def test_engine_is_reused (self, engine_pool):
+        board = chess.Board()
+
+        result = engine_pool.play(board, chess.engine.Limit(time=0.1))
+        engine_pool.play(board, chess.engine.Limit(time=0.1))
+
+        assert result.move in board.legal_moves, "Engine returned an illegal move"
+        assert engine_pool.stats()["running"] == 1, "Engine was not reused"
+
+    def test_warm_up_starts_engines (self, engine_pool):
+        assert engine_pool.stats()["running"] == 0, "Engine started before use"
+        assert engine_pool.warm_up() == 1, "Engine was not started"
+        assert engine_pool.stats() == { "size": 1, "running": 1, "idle": 1 }, "Engine not returned"
+
+    def test_engine_restarted_after_crash (self, engine_pool):
+        with engine_pool.borrow() as engine:
+            engine.transport.kill()
+
+        result = engine_pool.play(chess.Board(), chess.engine.Limit(time=0.1))
+
+        assert result.move is not None, "Crashed engine was not restarted"
+        assert engine_pool.stats()["running"] == 1, "Crashed engine was not discarded"
+
+    def test_close_quits_engines (self, engine_pool):
+        engine_pool.play(chess.Board(), chess.engine.Limit(time=0.1))
+        engine_pool.close()
+
+        assert engine_pool.stats()["running"] == 0, "Engines are still running"
@@ -0,0 +1,51 @@
+import chess
+import pytest
+from app.utils.engine_cache import EngineCache
+from app.utils.games import LocalGameManager
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestEngineCache:
+    def test_cached_by_position_and_settings (self, redis_client):
+        engine_cache = EngineCache(redis_client)
+        board = chess.Board()
+
+        engine_cache.put(board, 60, 20, chess.Move.from_uci("e2e4"), 60)
+
+        assert engine_cache.get(board, 60, 20) == chess.Move.from_uci("e2e4"), "Move not cached"
+        assert engine_cache.get(board, 30, 20) is None, "Other search time was a hit"
+        assert engine_cache.get(board, 60, 5) is None, "Other skill level was a hit"
+
+        stats = engine_cache.stats()
+        assert ( stats["hits"], stats["misses"], stats["seconds_saved"] ) == ( 1, 2, 60 )
+
+    def test_least_recently_used_evicted (self, redis_client):
+        engine_cache = EngineCache(redis_client, max_entries=2)
+        boards = [ chess.Board(), chess.Board(), chess.Board() ]
+        boards[1].push_uci("e2e4")
+        boards[2].push_uci("d2d4")
+
+        engine_cache.put(boards[0], 60, 20, chess.Move.from_uci("e2e4"), 1)
+        engine_cache.put(boards[1], 60, 20, chess.Move.from_uci("e7e5"), 1)
+        # Used, so the second position is the least recently used
+        engine_cache.get(boards[0], 60, 20)
+        engine_cache.put(boards[2], 60, 20, chess.Move.from_uci("d7d5"), 1)
+
+        assert engine_cache.stats()["positions"] == 2, "Cache is not bounded"
+        assert engine_cache.contains(boards[0], 60, 20), "Recently used position was evicted"
+        assert not engine_cache.contains(boards[1], 60, 20), "Least recently used was kept"
+
+    def test_commit_uses_cache (self, redis_client, engine_pool):
+        chess_games = LocalGameManager(cache_games=False, engine_pool=engine_pool)
+        chess_games.ponder_cache = None
+        chess_games.add_game("Cached", 60, bot_limit=1)
+
+        board = chess.Board()
+        board.push_uci("e2e4")
+        chess_games.engine_cache.put(board, 1, 20, chess.Move.from_uci("c7c5"), 1)
+
+        chess_games.vote("Cached", "e2e4")
+        chess_games.register_moves("Cached")
+
+        assert chess_games.get_game("Cached").last_moves == [ "e2e4", "c7c5" ], "Cache was not used"
+        assert chess_games.engine_cache_stats()["hits"] == 1, "Hit was not counted"
@@ -0,0 +1,204 @@
+import time
+from unittest.mock import Mock
+
+import chess
+import chess.engine
+import pytest
+from app.utils.games import LocalGameManager
+from app.utils.jobs import CommitJob, CommitQueue
+from app.worker import CommitWorker
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestCommitQueue:
+    def test_enqueue_once_per_ply (self, redis_client):
+        commit_queue = CommitQueue(redis_client)
+
+        assert commit_queue.enqueue("Jobs", 2), "Job was not enqueued"
+        assert not commit_queue.enqueue("Jobs", 2), "Same ply was enqueued twice"
+        assert commit_queue.enqueue("Jobs", 3), "Next ply was not enqueued"
+        assert commit_queue.stats()["queued"] == 2, "Wrong queue size"
+
+    def test_reserve_and_complete (self, redis_client):
+        commit_queue = CommitQueue(redis_client)
+        commit_queue.enqueue("Jobs", 0)
+
+        raw_job, job = commit_queue.reserve()
+        assert job == CommitJob("Jobs", 0), "Wrong reserved job"
+        assert commit_queue.reserve() is None, "Reserved job was delivered twice"
+        assert commit_queue.stats()["processing"] == 1, "Reserved job is not processing"
+
+        commit_queue.complete(raw_job, job)
+        assert commit_queue.stats() == { "queued": 0, "processing": 0, "delayed": 0, "failed": 0 }
+        assert not commit_queue.enqueue("Jobs", 0), "Completed job was enqueued again"
+
+    def test_expired_job_is_recovered (self, redis_client):
+        commit_queue = CommitQueue(redis_client, job_timeout=0.05)
+        commit_queue.enqueue("Jobs", 0)
+        commit_queue.reserve()
+
+        assert commit_queue.recover() == 0, "Running job was recovered"
+        time.sleep(0.1)
+
+        assert commit_queue.recover() == 1, "Job of a crashed worker was not recovered"
+        assert commit_queue.reserve()[1] == CommitJob("Jobs", 0), "Recovered job was not queued"
+
+    def test_retry_until_failed (self, redis_client):
+        commit_queue = CommitQueue(redis_client, max_attempts=2, retry_delay=0)
+        commit_queue.enqueue("Jobs", 0)
+
+        raw_job, job = commit_queue.reserve()
+        assert commit_queue.retry(raw_job, job), "First failure was not retried"
+        assert commit_queue.recover() == 1, "Retry was not queued after its delay"
+
+        raw_job, job = commit_queue.reserve()
+        assert job.attempts == 1, "Attempts were not counted"
+        assert not commit_queue.retry(raw_job, job), "Job was retried after 'max_attempts'"
+        assert commit_queue.stats()["failed"] == 1, "Job was not moved to the failed list"
+
+    def test_lock (self, redis_client):
+        commit_queue = CommitQueue(redis_client)
+
+        with commit_queue.lock("Jobs") as is_locked:
+            assert is_locked, "Free lock was not acquired"
+
+            with commit_queue.lock("Jobs") as is_locked_twice:
+                assert not is_locked_twice, "Lock was acquired twice"
+
+        with commit_queue.lock("Jobs") as is_locked:
+            assert is_locked, "Lock was not released"
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestCommitWorker:
+    @pytest.fixture
+    def worker (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False, engine_pool=Mock())
+        chess_games.leader = None
+        chess_games.ponder_cache = None
+        chess_games.engine_cache = None
+        chess_games.add_game("Worker", 60)
+        chess_games.vote("Worker", "e2e4")
+
+        return CommitWorker(chess_games, CommitQueue(redis_client, retry_delay=0), 1)
+
+    def run_next_job (self, worker: CommitWorker) -> None:
+        worker.commit_queue.recover()
+        worker._slots.acquire()
+        worker._run_job(*worker.commit_queue.reserve())
+
+    def test_engine_failure_resumes_ai_reply (self, worker):
+        chess_games = worker.chess_games
+        chess_games.engine_pool.play.side_effect = [
+            TimeoutError("Engine did not answer"),
+            chess.engine.PlayResult(chess.Move.from_uci("e7e5"), None)
+        ]
+        worker.commit_queue.enqueue("Worker", 0)
+
+        # Fails between the voted move and the AI reply
+        self.run_next_job(worker)
+        assert chess_games.get_game("Worker").last_moves == [ "e2e4" ]
+        assert worker.commit_queue.stats()["delayed"] == 1, "Failed job was not retried"
+
+        self.run_next_job(worker)
+        game = chess_games.get_game("Worker")
+        assert game.last_moves == [ "e2e4", "e7e5" ], "Retry did not play the AI reply only"
+        assert game.is_player_turn, "Sides were swapped"
+        assert worker.commit_queue.stats() == {
+            "queued": 0, "processing": 0, "delayed": 0, "failed": 0
+        }
+
+    def test_locked_game_is_requeued (self, worker):
+        worker.commit_queue.max_attempts = 1
+        worker.chess_games.engine_pool.play.return_value = chess.engine.PlayResult(
+            chess.Move.from_uci("e7e5"), None
+        )
+        worker.commit_queue.enqueue("Worker", 0)
+
+        # The other delivery of the job is running
+        with worker.commit_queue.lock("Worker"):
+            self.run_next_job(worker)
+
+        assert worker.commit_queue.stats()["delayed"] == 1, "Locked job was not requeued"
+        assert worker.commit_queue.stats()["failed"] == 0, "Locked job counted as a failure"
+        assert worker.chess_games.get_game("Worker").last_moves == [], "Ran without the lock"
+
+        self.run_next_job(worker)
+
+        assert worker.chess_games.get_game("Worker").last_moves == [ "e2e4", "e7e5" ]
+        assert worker.commit_queue.stats() == {
+            "queued": 0, "processing": 0, "delayed": 0, "failed": 0
+        }
+
+    def test_committed_round_is_skipped (self, worker):
+        chess_games = worker.chess_games
+        chess_games.engine_pool.play.return_value = chess.engine.PlayResult(
+            chess.Move.from_uci("e7e5"), None
+        )
+        chess_games.commit_game("Worker")
+
+        # Delivered after the leader committed it (crash, late recovery)
+        worker.commit_queue.enqueue("Worker", 0)
+        self.run_next_job(worker)
+
+        assert chess_games.get_game("Worker").last_moves == [ "e2e4", "e7e5" ], "Committed twice"
+        assert chess_games.engine_pool.play.call_count == 1
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestEnqueueDueGames:
+    @pytest.fixture
+    def chess_games (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False, engine_pool=Mock())
+        chess_games.leader = None
+        chess_games.ponder_cache = None
+        chess_games.engine_cache = None
+        chess_games.commit_queue = CommitQueue(redis_client, job_timeout=30, retry_delay=0)
+        chess_games.add_game("Due", 600, bot_limit=60)
+        chess_games.add_game("Later", 600, bot_limit=60)
+        chess_games.postpone_game("Due", -1)
+
+        return chess_games
+
+    def test_enqueue_due_only (self, chess_games):
+        chess_games.enqueue_due_games()
+
+        assert chess_games.commit_queue.reserve()[1] == CommitJob("Due", 0), "Due game not queued"
+        assert chess_games.commit_queue.reserve() is None, "Game not due was queued"
+
+    def test_no_double_enqueue (self, chess_games):
+        chess_games.enqueue_due_games()
+
+        # Postponed while its job runs, then due again before the job committed it
+        assert chess_games.get_due_games() == [], "Queued game is still due"
+        chess_games.enqueue_due_games()
+        chess_games.postpone_game("Due", -1)
+        chess_games.enqueue_due_games()
+
+        assert chess_games.commit_queue.stats()["queued"] == 1, "Same round was queued twice"
+
+    def test_rescheduled_after_commit (self, chess_games):
+        chess_games.engine_pool.play.return_value = chess.engine.PlayResult(
+            chess.Move.from_uci("e7e5"), None
+        )
+        chess_games.vote("Due", "e2e4")
+        chess_games.enqueue_due_games()
+
+        worker = CommitWorker(chess_games, chess_games.commit_queue, 1)
+        worker._slots.acquire()
+        worker._run_job(*chess_games.commit_queue.reserve())
+
+        # The next round is due after a full 'base_update'
+        assert chess_games.get_due_games() == []
+        assert chess_games.next_deadline() == pytest.approx(time.time() + 540, abs=5)
+
+        chess_games.postpone_game("Due", -1)
+        chess_games.enqueue_due_games()
+        assert chess_games.commit_queue.reserve()[1] == CommitJob("Due", 2), "Next round not queued"
+
+    def test_follower_does_not_enqueue (self, chess_games):
+        chess_games.leader = Mock(is_leader=False)
+
+        chess_games.enqueue_due_games()
+
+        assert chess_games.commit_queue.stats()["queued"] == 0, "Follower enqueued a commit"
@@ -0,0 +1,86 @@
+from unittest.mock import Mock
+
+import chess
+import chess.engine
+import pytest
+from app.utils.errors import FencingError
+from app.utils.games import LocalGameManager
+from app.utils.leader import LeaderElection
+
+
+def fenced_games (name: str) -> LocalGameManager:
+    chess_games = LocalGameManager(cache_games=False, engine_pool=Mock())
+    chess_games.ponder_cache = None
+    chess_games.engine_cache = None
+    chess_games.add_game(name, 60)
+    chess_games.vote(name, "e2e4")
+
+    return chess_games
+
+def take_over (redis_client, leader: LeaderElection) -> LeaderElection:
+    # The lease expired (paused or partitioned leader) and another process won it
+    redis_client.delete(leader.lease_key)
+    new_leader = LeaderElection(redis_client)
+    assert new_leader.campaign(), "Free lease was not acquired"
+
+    return new_leader
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestLeader:
+    def test_single_leader (self, redis_client):
+        leader, follower = LeaderElection(redis_client), LeaderElection(redis_client)
+
+        assert leader.campaign(), "Free lease was not acquired"
+        assert not follower.campaign(), "Held lease was acquired"
+        assert leader.campaign(), "Lease was not renewed"
+
+        leader.resign()
+        assert follower.campaign(), "Released lease was not acquired"
+        assert follower.token > 1, "Fencing token did not increase"
+        assert leader.current()["token"] == follower.token, "Wrong current leader"
+
+    def test_commit_needs_lease (self, redis_client):
+        chess_games = fenced_games("Fenced")
+
+        with pytest.raises(FencingError):
+            chess_games.commit_game("Fenced")
+
+        assert chess_games.get_game("Fenced").last_moves == [], "Follower committed"
+
+    def test_stale_token_rejected (self, redis_client):
+        chess_games = fenced_games("Fenced")
+        chess_games.leader.campaign()
+        stale_token = chess_games.leader.token
+
+        take_over(redis_client, chess_games.leader)
+
+        with pytest.raises(FencingError):
+            chess_games.update_game("Fenced", "e2e4", [], fencing_token=stale_token)
+
+        assert chess_games.get_game("Fenced").last_moves == [], "Stale leader wrote"
+
+    @pytest.mark.parametrize("new_leader", [ True, False ], ids=[ "taken_over", "expired" ])
+    def test_lease_lost_mid_commit (self, redis_client, new_leader):
+        chess_games = fenced_games("Fenced")
+        chess_games.leader.campaign()
+
+        def lose_lease (*args, **kwargs):
+            # Paused past the lease, another process may have won it meanwhile
+            if new_leader:
+                take_over(redis_client, chess_games.leader)
+
+            else:
+                redis_client.delete(chess_games.leader.lease_key)
+
+            # The renewal job runs during the search, it drops (or renews) the token
+            chess_games.leader.campaign()
+            return chess.engine.PlayResult(chess.Move.from_uci("e7e5"), None)
+
+        chess_games.engine_pool.play.side_effect = lose_lease
+
+        with pytest.raises(FencingError):
+            chess_games.commit_game("Fenced")
+
+        # The voted move was written while leading, the AI move is not
+        assert chess_games.get_game("Fenced").last_moves == [ "e2e4" ], "Deposed leader wrote"
@@ -0,0 +1,45 @@
+from app.utils.lifecycle import Lifecycle
+
+
+class TestLifecycle:
+    def test_phases_run_once (self):
+        calls = []
+        lifecycle = Lifecycle()
+        lifecycle.add_phase("first", lambda: calls.append("first"))
+        lifecycle.add_phase("second", lambda: calls.append("second"))
+
+        assert not lifecycle.is_ready, "Ready before start"
+
+        lifecycle.start()
+        lifecycle.start()
+
+        assert calls == [ "first", "second" ], "Phases did not run once and in order"
+        assert lifecycle.is_ready and set(lifecycle.status()["phases"]) == { "first", "second" }
+
+    def test_failed_phase_retried (self):
+        attempts = []
+        lifecycle = Lifecycle(retry_seconds=0.01)
+
+        def flaky ():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("redis is down")
+
+        lifecycle.add_phase("storage", flaky)
+        lifecycle.start()
+
+        assert not lifecycle.is_ready, "Ready after a failed phase"
+        assert lifecycle.status()["error"] == "storage: ConnectionError: redis is down"
+        assert lifecycle.wait(5), "Failed phase was not retried"
+        assert len(attempts) == 2 and lifecycle.status()["error"] is None
+
+    def test_stop_in_reverse_order (self):
+        stopped = []
+        lifecycle = Lifecycle()
+        lifecycle.add_shutdown(lambda: stopped.append("engines"))
+        lifecycle.add_shutdown(lambda: stopped.append("scheduler"))
+
+        lifecycle.start()
+        lifecycle.stop()
+
+        assert stopped == [ "scheduler", "engines" ], "Wrong shutdown order"
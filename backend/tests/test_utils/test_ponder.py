@@ -0,0 +1,93 @@
+import time
+import types
+from unittest.mock import Mock
+
+import chess
+import chess.engine
+import pytest
+from app.utils import ponder
+from app.utils.games import LocalGameManager
+from app.utils.ponder import PonderCache
+
+
+def play_result (move: str) -> chess.engine.PlayResult:
+    return chess.engine.PlayResult(chess.Move.from_uci(move), None)
+
+def ponder_games (name: str, base_update: int, bot_limit: int) -> LocalGameManager:
+    chess_games = LocalGameManager(cache_games=False, engine_pool=Mock())
+    chess_games.engine_pool.play.return_value = play_result("e7e5")
+    chess_games.ponder_cache = PonderCache(chess_games.redis_client, chess_games.engine_pool)
+    chess_games.engine_cache = None
+    chess_games.leader.campaign()
+    chess_games.add_game(name, base_update, bot_limit=bot_limit)
+    chess_games.vote(name, "e2e4")
+
+    return chess_games
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestPonderCache:
+    def test_pop_pondered_reply (self, redis_client):
+        engine_pool = Mock()
+        engine_pool.play.return_value = play_result("e7e5")
+        ponder_cache = PonderCache(redis_client, engine_pool)
+        board = chess.Board()
+
+        assert ponder_cache.ponder("Ponder", board, [ "e2e4", "d2d4" ], chess.engine.Limit(1)) == 2
+        assert ponder_cache.ponder("Ponder", board, [ "e2e4" ], chess.engine.Limit(1)) == 0, (
+            "Pondered position was searched again"
+        )
+
+        board.push_uci("e2e4")
+        assert ponder_cache.pop("Ponder", board.fen()) == chess.Move.from_uci("e7e5")
+        # Replies of the other candidates are dropped with the committed move
+        assert ponder_cache.pop("Ponder", board.fen()) is None
+
+        stats = ponder_cache.stats()
+        assert ( stats["hits"], stats["misses"], stats["hit_rate"] ) == ( 1, 1, 0.5 )
+
+    def test_stops_before_deadline (self, redis_client, monkeypatch):
+        clock = [ 1000.0 ]
+
+        def search (*args):
+            clock[0] += 1
+            return play_result("e7e5")
+
+        # Only the ponder clock, redis expiries use the real one
+        monkeypatch.setattr(ponder, "time", types.SimpleNamespace(
+            time=lambda: clock[0], perf_counter=time.perf_counter
+        ))
+        engine_pool = Mock()
+        engine_pool.play.side_effect = search
+        ponder_cache = PonderCache(redis_client, engine_pool)
+
+        pondered = ponder_cache.ponder(
+            "Ponder", chess.Board(), [ "e2e4", "d2d4", "c2c4" ], chess.engine.Limit(1),
+            deadline=1002.5
+        )
+
+        assert pondered == 2, "Search ending after the deadline was started"
+        assert engine_pool.play.call_count == 2
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestPonderGames:
+    def test_commit_uses_pondered_reply (self, redis_client):
+        chess_games = ponder_games("Ponder", 600, 60)
+
+        chess_games.ponder_games()
+        assert chess_games.engine_pool.play.call_count == 1, "Leading candidate not pondered"
+
+        chess_games.commit_game("Ponder")
+
+        assert chess_games.get_game("Ponder").last_moves == [ "e2e4", "e7e5" ]
+        assert chess_games.engine_pool.play.call_count == 1, "Pondered reply was searched again"
+        assert chess_games.ponder_stats()["hits"] == 1, "Hit was not counted"
+
+    def test_no_ponder_near_commit (self, redis_client):
+        # The commit starts in 40s, a 60s search would still hold the engine
+        chess_games = ponder_games("Ponder", 100, 60)
+
+        chess_games.ponder_games()
+
+        assert chess_games.engine_pool.play.call_count == 0, "Pondered past the commit start"
@@ -0,0 +1,72 @@
+import os
+import types
+from unittest.mock import Mock
+
+import pytest
+import redis
+from app.utils import games
+from app.utils.games import LocalGameManager
+from app.utils.pools import MongoPoolStats, redis_pool_stats
+
+
+class TestPools:
+    def test_redis_pool_stats (self):
+        pool = redis.ConnectionPool(max_connections=4)
+        connection = pool.get_connection("PING")
+
+        assert redis_pool_stats(pool) == { "open": 1, "in_use": 1, "max": 4 }
+
+        pool.release(connection)
+        assert redis_pool_stats(pool) == { "open": 1, "in_use": 0, "max": 4 }
+        pool.disconnect()
+
+    def test_redis_pool_without_usage (self):
+        # Pool classes (or redis-py versions) without the private counters
+        pool = types.SimpleNamespace(max_connections=4)
+
+        assert redis_pool_stats(pool) == { "open": None, "in_use": None, "max": 4 }
+
+    def test_mongo_pool_stats (self):
+        pool_stats = MongoPoolStats()
+        for _ in range(2):
+            pool_stats.connection_created(Mock())
+            pool_stats.connection_checked_out(Mock())
+        pool_stats.connection_checked_in(Mock())
+        pool_stats.connection_closed(Mock())
+
+        assert pool_stats.stats() == { "open": 1, "in_use": 1 }
+
+        pool_stats.reset()
+        assert pool_stats.stats() == { "open": 0, "in_use": 0 }
+
+    def test_mongo_client_per_process (self, monkeypatch):
+        chess_games = LocalGameManager(cache_games=False)
+        parent_client = chess_games.mongo_client
+        chess_games.mongo_pool_stats.connection_created(Mock())
+
+        assert chess_games.mongo_client is parent_client, "Client was not reused"
+
+        # Forked worker (gunicorn --preload), the parent client is not fork-safe
+        child_pid = os.getpid() + 1
+        monkeypatch.setattr(games.os, "getpid", lambda: child_pid)
+        child_client = chess_games.mongo_client
+
+        assert child_client is not parent_client, "Forked process reused the parent client"
+        assert chess_games.mongo_pool_stats.stats()["open"] == 0, "Parent stats were kept"
+        assert chess_games.mongo_client is child_client
+
+        parent_client.close()
+        child_client.close()
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestPoolsEndpoint:
+    def test_pool_stats (self, client):
+        response = client.get("/game/status/pools")
+        result = response.get_json()["result"]
+
+        assert response.status_code == 200, "Status code is not 200"
+        assert result["pid"] == os.getpid()
+        assert result["pools"]["redis"].keys() == { "open", "in_use", "max" }
+        assert result["pools"]["mongo"].keys() == { "open", "in_use", "max" }
+        assert "engine" in result["pools"]
@@ -0,0 +1,75 @@
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+from app.utils.errors import RecaptchaError
+from app.utils.recaptcha import RecaptchaVerifier, SiteVerifyBackend, create_verifier
+
+
+class TestRecaptchaVerifier:
+    def test_tokens_are_not_cached (self):
+        backend = Mock()
+        backend.verify.side_effect = [ True, False ]
+        verifier = RecaptchaVerifier(backend)
+
+        assert verifier.verify("token"), "Valid token was rejected"
+        # Reused tokens are duplicates for the backend, a cached answer would accept them
+        assert not verifier.verify("token"), "Reused token was accepted"
+        assert backend.verify.call_count == 2, "Reused token was not verified again"
+        assert verifier.stats() == { "valid": 1, "invalid": 1, "error": 0 }
+
+    def test_backend_failure (self):
+        backend = Mock()
+        backend.verify.side_effect = [ RecaptchaError("Could not verify token"), True ]
+        verifier = RecaptchaVerifier(backend)
+
+        with pytest.raises(RecaptchaError):
+            verifier.verify("token")
+
+        assert verifier.verify("token"), "Token was not verified after a failure"
+        assert verifier.stats() == { "valid": 1, "invalid": 0, "error": 1 }
+
+    def test_submit (self):
+        backend = Mock()
+        backend.verify.side_effect = lambda token: token == "valid"
+        verifier = RecaptchaVerifier(backend, async_workers=1)
+        on_valid = Mock()
+
+        assert verifier.is_async
+        assert verifier.submit("valid", on_valid).result(timeout=5)
+        assert not verifier.submit("invalid", on_valid).result(timeout=5)
+        assert on_valid.call_count == 1, "Callback ran for an invalid token"
+
+    def test_unknown_backend (self):
+        with pytest.raises(ValueError):
+            create_verifier("other", "", "secret", 1, 1, 0)
+
+
+class TestSiteVerifyBackend:
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_answer (self, mock_post):
+        mock_post.return_value.json.return_value = { "success": False }
+        backend = SiteVerifyBackend("http://verify.test", "secret", timeout=0.5)
+
+        assert not backend.verify("token"), "Rejected token was accepted"
+        assert mock_post.call_args.kwargs["data"] == { "secret": "secret", "response": "token" }
+        assert mock_post.call_args.kwargs["timeout"] == ( 0.5, 0.5 ), "Timeout was not set"
+
+    @pytest.mark.parametrize("error", [
+        requests.Timeout("Read timed out"), requests.ConnectionError("Refused")
+    ])
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_unreachable (self, mock_post, error):
+        mock_post.side_effect = error
+        backend = SiteVerifyBackend("http://verify.test", "secret")
+
+        with pytest.raises(RecaptchaError):
+            backend.verify("token")
+
+    @patch("app.utils.recaptcha.requests.Session.post")
+    def test_invalid_answer (self, mock_post):
+        mock_post.return_value.json.side_effect = ValueError("Not json")
+        backend = SiteVerifyBackend("http://verify.test", "secret")
+
+        with pytest.raises(RecaptchaError):
+            backend.verify("token")
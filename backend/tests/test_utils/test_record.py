@@ -0,0 +1,59 @@
+import json
+
+import chess
+import pytest
+from app.utils import record
+from app.utils.games import LocalGameManager
+
+MOVES = [ "e2e4", "d7d5", "e4d5", "g8f6", "0000", "a7a8q", "h2h1n" ]
+
+
+class TestRecord:
+    def test_moves_round_trip (self):
+        packed = record.pack_moves(MOVES)
+
+        assert len(packed) == 2 * len(MOVES), "Moves are not packed in 16 bits"
+        assert record.unpack_moves(packed) == MOVES, "Wrong unpacked moves"
+
+    def test_votes_round_trip (self):
+        ply_votes = [ [ [ "e2e4", 3 ], [ "d2d4", 1 ] ], [], [ [ "e4d5", 70000 ] ] ]
+
+        assert record.unpack_votes(record.pack_votes(ply_votes)) == ply_votes, "Wrong unpacked votes"
+
+    def test_votes_by_fen (self):
+        moves = [ "e2e4", "e7e5" ]
+        ply_votes = [ [ [ "e2e4", 2 ] ], [] ]
+        fen_to_votes = { chess.Board().fen(): [ [ "e2e4", 2 ] ], "stale fen": [ [ "a2a3", 1 ] ] }
+
+        assert record.votes_by_ply(moves, fen_to_votes) == ply_votes, "Wrong votes by ply"
+        assert record.votes_by_fen(moves, ply_votes) == {
+            chess.Board().fen(): [ [ "e2e4", 2 ] ],
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1": []
+        }, "Wrong votes by fen"
+
+@pytest.mark.usefixtures("redis_client")
+class TestRecordStorage:
+    def test_legacy_hash_is_upgraded (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Record", 60)
+        # Hash as written before the compact record
+        redis_client.hdel(chess_games.game_key("Record"), "ply_votes")
+        redis_client.hset(chess_games.game_key("Record"), mapping={
+            "last_moves": json.dumps([ "e2e4" ]),
+            "fen_to_votes": json.dumps({ chess.Board().fen(): [ [ "e2e4", 5 ] ] })
+        })
+
+        game = chess_games.get_game("Record")
+        assert game.ply_votes == [ [ [ "e2e4", 5 ] ] ], "Legacy votes were not read by ply"
+
+        chess_games.update_game("Record", "e7e5", [])
+        raw_game = redis_client.hgetall(chess_games.game_key("Record"))
+
+        assert b"fen_to_votes" not in raw_game, "Legacy votes were kept"
+        assert raw_game[b"last_moves"] == record.RECORD_VERSION + record.pack_moves(
+            [ "e2e4", "e7e5" ]
+        ), "Moves were not packed"
+        assert chess_games.get_game("Record").to_response()["fen_to_votes"] == {
+            chess.Board().fen(): [ [ "e2e4", 5 ] ],
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1": []
+        }, "Wrong votes in the api"
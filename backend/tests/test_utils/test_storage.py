@@ -0,0 +1,188 @@
+import json
+
+import chess
+import pytest
+from app.utils.errors import FencingError
+from app.utils.games import LocalGameManager
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestStorage:
+    def test_migrate_games_blob (self, redis_client):
+        chess_games = LocalGameManager()
+        redis_client.set(chess_games.games_key, json.dumps({
+            "Legacy": {
+                "name": "Legacy", "base_update": 60, "next_update": 0, "player_color": "white",
+                "board": chess.Board.starting_fen, "last_moves": [], "fen_to_votes": {},
+                "finished": False, "winner": None, "bot_limit": 60, "ctime": 0, "mtime": 0
+            }
+        }))
+
+        assert chess_games.migrate_games_blob() == 1, "Game was not migrated"
+        assert redis_client.get(chess_games.games_key) is None, "Legacy blob was not removed"
+        assert chess_games.get_games() == [ "Legacy" ], "Game was not indexed"
+        assert chess_games.get_game("Legacy").base_update == 60, "Wrong migrated game"
+
+    def test_update_game_fields (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Storage", 60)
+
+        chess_games.update_game("Storage", "e2e4", [ ( "e2e4", 1 ) ])
+        game = chess_games.get_game("Storage", ( "board", "last_moves" ))
+
+        assert game.last_moves == [ "e2e4" ], "Move was not saved"
+        assert game.board == chess.Board(
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+        ).fen(), "Board was not saved"
+        assert game.ply_votes is None, "Unrequested field was loaded"
+
+    def test_cached_game_outdated_by_update (self, redis_client):
+        chess_games = LocalGameManager()
+        chess_games.add_game("Cached", 60)
+
+        assert chess_games.get_game("Cached").board == chess.Board.starting_fen
+        assert chess_games.get_game("Cached").board == chess.Board.starting_fen
+        assert chess_games.game_cache.hits >= 1, "Second read was not cached"
+
+        chess_games.update_game("Cached", "e2e4", [])
+
+        assert chess_games.get_game("Cached").last_moves == [ "e2e4" ], "Cache was not outdated"
+
+    def test_failed_reset_keeps_cached_game (self, redis_client):
+        chess_games = LocalGameManager()
+        chess_games.add_game("Cached", 60)
+        chess_games.update_game("Cached", "e2e4", [])
+        cached_game = chess_games.get_game("Cached")
+        chess_games.leader.campaign()
+        stale_token = chess_games.leader.token
+        chess_games.leader.resign()
+        chess_games.leader.campaign()
+
+        with pytest.raises(FencingError):
+            chess_games.reset_game(cached_game, fencing_token=stale_token)
+
+        assert cached_game.last_moves == [ "e2e4" ], "Cached game was mutated"
+        assert chess_games.get_game("Cached").last_moves == [ "e2e4" ], "Cache serves a reset"
+
+        game = chess_games.reset_game(cached_game, fencing_token=chess_games.leader.token)
+
+        assert game.last_moves == [] and game is not cached_game
+        assert chess_games.get_game("Cached").last_moves == [], "Cache was not outdated"
+
+    def test_reset_retries_concurrent_write (self, redis_client, monkeypatch):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Reset", 60)
+        chess_games.update_game("Reset", "e2e4", [])
+        load_game, loads = chess_games._load_game, []
+
+        def concurrent_load (name, *args):
+            loads.append(name)
+            if len(loads) == 1:
+                # Written by another process after the reset read the game
+                redis_client.hset(chess_games.game_key(name), "mtime", 0)
+
+            return load_game(name, *args)
+
+        monkeypatch.setattr(chess_games, "_load_game", concurrent_load)
+        chess_games.reset_game(chess_games.get_game("Reset"))
+
+        assert len(loads) == 2, "Concurrent write did not restart the reset"
+        assert chess_games.get_game("Reset").last_moves == []
+
+    def test_paginate_games (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        for name in ( "C", "A", "B" ):
+            chess_games.add_game(name, 60)
+
+        assert chess_games.get_games() == [ "A", "B", "C" ], "Games are not sorted by name"
+        assert chess_games.get_games(2) == [ "A", "B" ], "Wrong first page"
+        assert chess_games.get_games(2, "B") == [ "C" ], "Wrong page after cursor"
+
+    def test_add_game_without_replace (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Room", 60)
+        chess_games.update_game("Room", "e2e4", [])
+
+        with pytest.raises(ValueError):
+            chess_games.add_game("Room", 60, replace=False)
+
+        assert chess_games.get_game("Room").last_moves == [ "e2e4" ], "Game was replaced"
+
+    def test_due_games (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Due", 120, bot_limit=60)
+        chess_games.add_game("Later", 600, bot_limit=60)
+
+        game = chess_games.get_game("Due")
+        # The commit starts 'bot_limit' seconds before 'next_update'
+        assert chess_games.get_due_games(game.next_update - 61 * 1000) == [], "Game due too soon"
+        assert chess_games.get_due_games(game.next_update - 60 * 1000) == [ "Due" ], "Game not due"
+        assert chess_games.next_deadline() == ( game.next_update - 60 * 1000 ) / 1000
+
+    def test_history_since_ply (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("History", 60)
+        chess_games.update_game("History", "e2e4", [ [ "e2e4", 3 ] ])
+        chess_games.update_game("History", "e7e5", [])
+
+        history = chess_games.get_history("History", 1)
+
+        assert history["ply"] == 2, "Wrong game ply"
+        assert history["history"] == [ {
+            "ply": 2, "move": "e7e5", "votes": [],
+            "fen": "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+        } ], "Wrong entries after ply 1"
+        assert chess_games.get_history("History", 0, 1)["history"][0]["votes"] == [ [ "e2e4", 3 ] ]
+
+        chess_games.reset_game(chess_games.get_game("History"))
+
+        assert chess_games.get_history("History") == { "history": [], "ply": 0 }, "Not cleared"
+
+    def test_history_rebuilt_for_old_games (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Old", 60)
+        chess_games.update_game("Old", "e2e4", [ [ "e2e4", 1 ] ])
+        chess_games.update_game("Old", "e7e5", [])
+        # Played before the history list existed
+        redis_client.delete(chess_games.history_key("Old"))
+
+        history = chess_games.get_history("Old", 1)
+
+        assert history["ply"] == 2, "History was not rebuilt"
+        assert [ entry["move"] for entry in history["history"] ] == [ "e7e5" ]
+        assert redis_client.llen(chess_games.history_key("Old")) == 2, "Rebuild was not stored"
+
+    def test_round_keys_expire_and_unlinked_on_commit (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Rounds", 60)
+        voting_key = chess_games.get_game("Rounds").voting_key
+
+        chess_games.vote("Rounds", "e2e4", "voter-1")
+
+        assert redis_client.pttl(voting_key) > 0, "Round tally does not expire"
+
+        chess_games.update_game("Rounds", "e2e4", [ [ "e2e4", 1 ] ])
+
+        assert redis_client.exists(*chess_games.round_keys(voting_key)) == 0, "Round keys left"
+        assert chess_games.get_game("Rounds").ply_votes == [ [ [ "e2e4", 1 ] ] ], "Not archived"
+
+    def test_sweep_voting_keys (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Sweep", 60)
+        chess_games.leader.campaign()
+        current_key = chess_games.get_game("Sweep").voting_key
+
+        # Left by a crash: a past position and a game that no longer exists
+        past_fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+        orphans = [ f"Sweep:{past_fen}", f"Gone:{chess.Board.starting_fen}:voters" ]
+        for key in orphans:
+            redis_client.zincrby(key, 1, "e2e4")
+        # Current round written before round keys expired
+        redis_client.zincrby(current_key, 1, "e2e4")
+
+        assert chess_games.sweep_voting_keys(batch=2) == {
+            "scanned": 3, "kept": 0, "expiring": 1, "reclaimed": 2
+        }, "Wrong sweep result"
+        assert redis_client.exists(*orphans) == 0, "Orphaned keys were not reclaimed"
+        assert redis_client.pttl(current_key) > 0, "Current round was not given an expiry"
+        assert chess_games.sweep_voting_keys()["kept"] == 1, "Current round was not kept"
@@ -0,0 +1,80 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from app.utils.timer import DeadlineScheduler
+
+
+def deadline_scheduler (
+    redis_client, deadline: float | None, **kwargs
+) -> tuple[DeadlineScheduler, dict, Mock]:
+    state = { "deadline": deadline, "ran": threading.Event() }
+
+    def done ():
+        # Every due work ran, no deadline left
+        state["deadline"] = None
+        state["ran"].set()
+
+    run_due = Mock(side_effect=done)
+    scheduler = DeadlineScheduler(
+        redis_client, "chess:test:wake", lambda: state["deadline"], run_due, **kwargs
+    )
+
+    return scheduler, state, run_due
+
+def wait_for_listener (redis_client, channel: str, timeout: float = 2) -> None:
+    end = time.time() + timeout
+    while redis_client.pubsub_numsub(channel)[0][1] == 0:
+        assert time.time() < end, "Wake listener did not subscribe"
+        time.sleep(0.01)
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestDeadlineScheduler:
+    def test_runs_due_work (self, redis_client):
+        scheduler, state, run_due = deadline_scheduler(redis_client, time.time() - 1, max_sleep=10)
+        scheduler.start()
+
+        assert state["ran"].wait(2), "Due work did not run"
+        scheduler.stop()
+        assert run_due.call_count == 1
+
+    def test_sleeps_until_deadline (self, redis_client):
+        scheduler, state, _ = deadline_scheduler(redis_client, time.time() + 0.2, max_sleep=10)
+        scheduler.start()
+
+        assert not state["ran"].wait(0.1), "Work ran before its deadline"
+        assert state["ran"].wait(2), "Work did not run at its deadline"
+        scheduler.stop()
+
+    def test_wakes_on_publish (self, redis_client):
+        scheduler, state, _ = deadline_scheduler(redis_client, None, max_sleep=10)
+        scheduler.start()
+        wait_for_listener(redis_client, scheduler.wake_channel)
+
+        # A game was created or committed with an earlier deadline
+        state["deadline"] = time.time()
+        redis_client.publish(scheduler.wake_channel, "Game")
+
+        assert state["ran"].wait(2), "Changed deadlines did not wake the scheduler"
+        scheduler.stop()
+
+    def test_inactive_does_not_run (self, redis_client):
+        scheduler, state, _ = deadline_scheduler(
+            redis_client, time.time() - 1, is_active=lambda: False, max_sleep=0.05
+        )
+        scheduler.start()
+
+        assert not state["ran"].wait(0.2), "Inactive process ran due work"
+        scheduler.stop()
+
+    def test_no_spin_when_nothing_done (self, redis_client):
+        scheduler, state, run_due = deadline_scheduler(redis_client, time.time() - 1, max_sleep=10)
+        # Leadership lost or store failing, the deadline does not move
+        run_due.side_effect = None
+        scheduler.start()
+
+        time.sleep(0.2)
+        scheduler.stop()
+        assert run_due.call_count == 1, "Unchanged deadline was retried in a loop"
@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+import chess
+import pytest
+from app.utils import config
+from app.utils.errors import DuplicateVoteError
+from app.utils.games import (
+    VOTE_ACCEPTED, VOTE_DUPLICATE, VOTE_ILLEGAL, VOTE_NO_ROUND, VOTE_NOT_TURN, LocalGameManager
+)
+from app.utils.voters import filter_offsets
+
+
+def run_vote_script (chess_games: LocalGameManager, game: str, move: str, voter: str = "") -> int:
+    offsets = filter_offsets(voter, config.VOTER_FILTER_BITS, config.VOTER_FILTER_HASHES)
+
+    return chess_games.vote_script(
+        keys=[
+            chess_games.round_key(game), chess_games.legal_moves_key(game),
+            chess_games.voters_key(game)
+        ],
+        args=[ move, chess_games.events.channel(game), voter, 60000, *(offsets if voter else []) ]
+    )
+
+
+@pytest.mark.usefixtures("redis_client")
+class TestVoteScript:
+    @pytest.fixture
+    def chess_games (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Script", 60)
+
+        return chess_games
+
+    def test_accepted_and_illegal (self, chess_games):
+        assert run_vote_script(chess_games, "Script", "e2e4") == VOTE_ACCEPTED
+        assert run_vote_script(chess_games, "Script", "e2e5") == VOTE_ILLEGAL
+        assert chess_games.get_top_n("Script") == [ ( "e2e4", 1 ) ]
+
+    def test_not_players_turn (self, chess_games):
+        # The AI reply was not played yet (failed commit)
+        chess_games.update_game("Script", "e2e4", [])
+
+        assert run_vote_script(chess_games, "Script", "e7e5") == VOTE_NOT_TURN
+        assert chess_games.get_top_n("Script") == [], "Vote on the AI turn was counted"
+
+    def test_missing_game (self, chess_games):
+        assert run_vote_script(chess_games, "Unknown", "e2e4") == VOTE_NO_ROUND
+
+    def test_duplicate_voter (self, chess_games):
+        assert run_vote_script(chess_games, "Script", "e2e4", "voter-1") == VOTE_ACCEPTED
+        assert run_vote_script(chess_games, "Script", "d2d4", "voter-1") == VOTE_DUPLICATE
+        assert run_vote_script(chess_games, "Script", "d2d4", "voter-2") == VOTE_ACCEPTED
+        assert sorted(chess_games.get_top_n("Script")) == [ ( "d2d4", 1 ), ( "e2e4", 1 ) ]
+
+    def test_vote_errors (self, chess_games):
+        chess_games.update_game("Script", "e2e4", [])
+
+        with pytest.raises(chess.InvalidMoveError):
+            chess_games.vote("Script", "e7e5")
+
+        with pytest.raises(ValueError, match="not found"):
+            chess_games.vote("Unknown", "e2e4")
+
+        chess_games.update_game("Script", "e7e5", [])
+
+        with patch.object(config, "VOTE_ONCE_PER_ROUND", True):
+            chess_games.vote("Script", "d2d4", "voter-1")
+
+            with pytest.raises(DuplicateVoteError):
+                chess_games.vote("Script", "g1f3", "voter-1")
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+import chess
+import pytest
+from app.utils import config
+from app.utils.errors import DuplicateVoteError
+from app.utils.games import LocalGameManager
+from app.utils.voters import filter_offsets
+
+
+class TestFilterOffsets:
+    def test_offsets (self):
+        offsets = filter_offsets("203.0.113.7", 1 << 18, 4)
+
+        assert offsets == filter_offsets("203.0.113.7", 1 << 18, 4), "Offsets are not stable"
+        assert len(set(offsets)) == 4, "Offsets repeat"
+        assert all(0 <= offset < 1 << 18 for offset in offsets), "Offset out of the filter"
+
+@pytest.mark.usefixtures("redis_client")
+class TestUniqueVoters:
+    def test_vote_once_per_round (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Voters", 60)
+
+        with patch.object(config, "VOTE_ONCE_PER_ROUND", True):
+            chess_games.vote("Voters", "e2e4", "voter-1")
+            chess_games.vote("Voters", "d2d4", "voter-2")
+
+            with pytest.raises(DuplicateVoteError):
+                chess_games.vote("Voters", "d2d4", "voter-1")
+
+        assert sorted(chess_games.get_top_n("Voters")) == [ ( "d2d4", 1 ), ( "e2e4", 1 ) ], (
+            "Duplicate vote was counted"
+        )
+        assert chess_games.count_voters("Voters") == { "game": 2, "round": 2 }, "Wrong voters"
+
+        filter_key = f"Voters:{chess.Board.starting_fen}:filter"
+        assert redis_client.pttl(filter_key) > 0, "Round filter does not expire"
+
+    def test_new_round_counts_voters_again (self, redis_client):
+        chess_games = LocalGameManager(cache_games=False)
+        chess_games.add_game("Voters", 60)
+
+        chess_games.vote("Voters", "e2e4", "voter-1")
+        chess_games.update_game("Voters", "e2e4", [ ( "e2e4", 1 ) ])
+        chess_games.update_game("Voters", "e7e5", [])
+        chess_games.vote("Voters", "d2d4", "voter-1")
+        chess_games.vote("Voters", "d2d4", "voter-2")
+
+        assert chess_games.count_voters("Voters") == { "game": 2, "round": 2 }, "Wrong voters"
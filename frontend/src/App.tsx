@@ -42,7 +42,7 @@ function App() {
   const {
     game, highlightedSquares, isLoading, timeRemaining, boardWidth,
     moveList, move, gameData, onDrop, handleMoveClick, fetchGames,
-    handlePromotion, fetchBoard, fetchFinishedGames, setFinishedGame
+    handlePromotion, fetchBoard, fetchFinishedGames, fetchFinishedGame, setFinishedGame
   } = useChessGame(setVote, fetchVoting);
 
   const recaptchaRef = useRef<ReCAPTCHA>(null);
@@ -75,13 +75,26 @@ function App() {
     }
   }, [i18n]);
 
+  // Latest handlers for the event stream, reconnecting on each render would drop events
+  const streamHandlers = useRef({ fetchBoard, setVote });
+  streamHandlers.current = { fetchBoard, setVote };
+
   useEffect(() => {
-    const timer = setInterval(() => {
-      fetchVoting(gameData?.name);
-    }, 10000);
+    /* Receive vote tallies and committed moves from the game event stream */
+    const gameName = gameData?.name;
+    if (gameName === undefined || gameName.startsWith("Old")) return;
+
+    const events = new EventSource(`${process.env.REACT_APP_URI_BACKEND}/game/stream/${gameName}`);
+    const refreshBoard = () => streamHandlers.current.fetchBoard(gameName);
+
+    events.addEventListener("tally", (event) => {
+      streamHandlers.current.setVote(JSON.parse((event as MessageEvent).data).voting);
+    });
+    events.addEventListener("move", refreshBoard);
+    events.addEventListener("reset", refreshBoard);
 
-    return () => clearInterval(timer);
-  }, [gameData?.name, fetchVoting]);
+    return () => events.close();
+  }, [gameData?.name]);
 
   // Highlight squares
   const customSquareStyles: { [key: string]: React.CSSProperties } = {};
@@ -145,6 +158,7 @@ function App() {
         show={showMatchesModal}
         onHide={() => setShowMatchesModal(false)}
         fetchFinishedGames={fetchFinishedGames}
+        fetchFinishedGame={fetchFinishedGame}
         setFinishedGame={setFinishedGame}
       />
       <AboutModal show={showAboutModal} onHide={() => setShowAboutModal(false)} />
@@ -8,15 +8,24 @@ interface MatchesModalProps {
     show: boolean;
     onHide: () => void;
     fetchFinishedGames: () => Promise<any[]>;
+    fetchFinishedGame: (gameId: string) => Promise<any>;
     setFinishedGame: (gameData: any) => void;
 }
 
 const MatchesModal: FC<MatchesModalProps> = (
-    { show, onHide, fetchFinishedGames, setFinishedGame }
+    { show, onHide, fetchFinishedGames, fetchFinishedGame, setFinishedGame }
 ) => {
     const { t } = useTranslation();
     const [matches, setMatches] = useState<any[]>([]);
 
+    const viewMatch = async (matchId: string) => {
+        /* List shows summaries, load the full match only when viewed */
+        const match = await fetchFinishedGame(matchId);
+        if (match) {
+            setFinishedGame(keysToCamelCase(match));
+        }
+    };
+
     useEffect(() => {
         const fetchMatches = async () => {
             const fetchedMatches = await fetchFinishedGames();
@@ -39,7 +48,7 @@ const MatchesModal: FC<MatchesModalProps> = (
                                 <div className="w-auto">
                                     <h5>{match.name}</h5>
                                     <Card.Text className="w-auto mb-0">
-                                        {t('matchesModal.moves')}: {match.last_moves.length || 0}
+                                        {t('matchesModal.moves')}: {match.moves || 0}
                                     </Card.Text>
                                     <Card.Text className="w-auto mb-0">
                                         {t('matchesModal.winner')}: {match.winner}
@@ -47,7 +56,7 @@ const MatchesModal: FC<MatchesModalProps> = (
                                 </div>
                                 <div className="d-flex w-auto align-items-center">
                                     <Button
-                                        onClick={() => setFinishedGame(keysToCamelCase(match))}
+                                        onClick={() => viewMatch(match._id)}
                                         variant="primary">{t('matchesModal.viewMatch')}
                                     </Button>
                                 </div>
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Chess, Square } from 'chess.js';
 import { PromotionPieceOption } from "react-chessboard/dist/chessboard/types";
 import axios from 'axios';
@@ -9,6 +9,8 @@ const backendUri = process.env.REACT_APP_URI_BACKEND;
 
 type ObjectId = string;
 
+type MoveEntry = { move: string, fen: string, votes: Array<[string, number]> };
+
 interface Game {
     Id: ObjectId | string;
     name: string;
@@ -16,8 +18,9 @@ interface Game {
     nextUpdate: number;
     playerColor: "white" | "black";
     board: string;
-    lastMoves: string[];
-    fenToVotes: { [key: string]: [string, number][] };
+    lastMoves?: string[];
+    fenToVotes?: { [key: string]: [string, number][] };
+    ply: number;
     finished: boolean;
     winner: "humanity" | "ai";
     botLimit: number;
@@ -34,7 +37,9 @@ const useChessGame = (
     const [highlightedSquares, setHighlightedSquares] = useState<Square[]>([]);
     const [isLoading, setIsLoading] = useState(true);
     const [nextUpdate, setNextUpdate] = useState(0);
-    const [moveList, setMoveList] = useState<Array<{ move: string, fen: string }>>([]);
+    const [moveList, setMoveList] = useState<MoveEntry[]>([]);
+    // Moves already fetched, only later plies are requested
+    const history = useRef<{ gameName?: string, moves: MoveEntry[] }>({ moves: [] });
     const [move, setMove] = useState<[string, string, string] | null>(null);
     const [timeRemaining, setTimeRemaining] = useState("00:00:00");
     const [boardWidth, setBoardWidth] = useState(600);
@@ -56,7 +61,9 @@ const useChessGame = (
     if (gameName === undefined) return;
 
         try {
-            const response = await axios.get(`${backendUri}/game/status/game/${gameName}`);
+            const response = await axios.get(
+                `${backendUri}/game/status/game/${gameName}`, { params: { moves: false } }
+            );
             if (response.status === 200) {
                 // Convert FEN to Chess object
                 const gameData: any = keysToCamelCase(response.data.result.game)
@@ -72,10 +79,8 @@ const useChessGame = (
                 setIsLoading(false);
                 setNextUpdate(gameData.nextUpdate);
 
-                // Calculate move list with FENs
-                setMoveList(
-                    calculateMoveListWithFensAndVotes(gameData.lastMoves, gameData.fenToVotes)
-                );
+                // Fetch moves played since the last poll
+                await syncMoveList(gameName, gameData.ply);
 
                 // Fetch votes
                 fetchVoting(gameName);
@@ -88,6 +93,33 @@ const useChessGame = (
         return game.fen();
     };
 
+    const syncMoveList = async (gameName: string, ply: number) => {
+        /* Append the plies after the last known one, from the start after a reset */
+        let moves = history.current.moves;
+        if (history.current.gameName !== gameName || moves.length > ply) {
+            moves = [];
+        }
+
+        while (moves.length < ply) {
+            const response = await axios.get(
+                `${backendUri}/game/history/${gameName}`, { params: { since: moves.length } }
+            );
+            const entries: MoveEntry[] = response.data.result.history.map(
+                ({ move, fen, votes }: MoveEntry) => ({ move, fen, votes })
+            );
+
+            if (entries.length === 0) break;
+            moves = moves.concat(entries);
+        }
+
+        history.current = { gameName, moves };
+        // History entries hold the votes of the round that chose their move, show each
+        // position with the votes cast on it (the next round) like finished games do
+        setMoveList(moves.map((entry, index) => ({
+            ...entry, votes: moves[index + 1]?.votes || []
+        })));
+    };
+
     const fetchFinishedGames = async () => {
         try {
             const response = await axios.get(`${backendUri}/game/finished-games`);
@@ -101,10 +133,25 @@ const useChessGame = (
         return [];
     };
 
+    const fetchFinishedGame = async (gameId: string) => {
+        /* Get a finished game with its moves and votes */
+        try {
+            const response = await axios.get(`${backendUri}/game/finished-games/${gameId}`);
+            if (response.status === 200) {
+                return response.data.result.game;
+            }
+        } catch (error) {
+            console.error("Failed to fetch finished game:", error);
+        }
+
+        return null;
+    };
+
     const setFinishedGame = async (gameData: any) => {
         gameData.name = `Old ${gameData.name}`
         setGameData(gameData);
         setGame(new Chess(gameData.board));
+        history.current = { moves: [] };
 
         // Calculate move list with FENs
         setMoveList(
@@ -234,10 +281,17 @@ const useChessGame = (
         setHighlightedSquares(savedHighlightedSquares);
 
         setGame(new Chess(fen));
-        if (gameData !== undefined) {
-            let votes = gameData.fenToVotes[gameData.board] || [];
-            setVote(votes);
+        if (gameData === undefined) return;
+
+        if (!gameData.name.startsWith("Old") && fen === gameData.board) {
+            // Current position of a live game, its round is still voting
+            fetchVoting(gameData.name);
+            return;
         }
+
+        // Votes cast on the clicked position, live and finished games alike
+        let votes = moveList.find(entry => entry.fen === fen)?.votes || [];
+        setVote(votes);
     };
 
     const saveHighlightedSquares = (
@@ -294,7 +348,7 @@ const useChessGame = (
     return {
         game, highlightedSquares, isLoading, timeRemaining, boardWidth,
         moveList, move, gameData, onDrop, handleMoveClick, fetchGames,
-        handlePromotion, fetchBoard, fetchFinishedGames, setFinishedGame
+        handlePromotion, fetchBoard, fetchFinishedGames, fetchFinishedGame, setFinishedGame
     };
 };
 